@@ -2,7 +2,91 @@
 __author__ = """Sebastian Porras"""
 __version__ = "1.0"
 
-from .g_requests import *
-from .pog_graph import *
-from .parsers import *
-from .sequence import *
+# The public API is loaded on first use through __getattr__ so that
+# "import GRASPy" stays cheap, e.g. a script that only calls JobStatus()
+# never imports NumPy or pandas.
+
+import importlib
+
+# public name -> submodule that defines it
+_EXPORTS = {
+    # g_requests
+    "send_and_recieve": "g_requests", "setRouter": "g_requests",
+    "setPreflight": "g_requests",
+    "dispatch": "g_requests", "JobOutput": "g_requests",
+    "PlaceInQueue": "g_requests", "CancelJob": "g_requests",
+    "ViewQueue": "g_requests", "JobStatus": "g_requests",
+    "ExtantPOGTree": "g_requests", "JointReconstruction": "g_requests",
+    "CladeReconstruction": "g_requests", "ShardedReconstruction": "g_requests",
+    "LearnLatentDistributions": "g_requests",
+    "MarginaliseDistOnAncestor": "g_requests",
+    "MarginaliseDistOnAncestors": "g_requests",
+    # pog_graph
+    "Edge": "pog_graph", "SymNode": "pog_graph", "POGraph": "pog_graph",
+    # parsers
+    "find_p": "parsers", "find_comma": "parsers", "make_label": "parsers",
+    "nwk_split": "parsers", "nwkToJSON": "parsers", "seqToJSON": "parsers",
+    "alnToJSON": "parsers", "make_anc_label": "parsers",
+    "record_children": "parsers", "TreeFromJSON": "parsers",
+    "makeEdges": "parsers", "locateEdgeIndex": "parsers",
+    "removeDuplicateEdges": "parsers", "addAncestralEdges": "parsers",
+    "POGraphFromJSON": "parsers", "POGTreeFromJointReconstruction": "parsers",
+    "CSV_CHUNK_SIZE": "parsers", "readCsvData": "parsers",
+    "arrayToJSON": "parsers", "iterArrayJSON": "parsers",
+    "jsonDefault": "parsers", "csvDataToJSON": "parsers",
+    # sequence
+    "Sequence": "sequence", "readFasta": "sequence", "parseDefline": "sequence",
+    "iterFastaFile": "sequence", "readFastaFile": "sequence",
+    "writeFastaFile": "sequence",
+    # inputs
+    "openInput": "inputs", "detectCompression": "inputs",
+    "readNwkFile": "inputs",
+    # pruning
+    "Reduction": "pruning", "pruneTree": "pruning",
+    "reduceAlignment": "pruning", "reduceInputs": "pruning",
+    "findDuplicates": "pruning",
+    "cladeTree": "pruning", "cladeAlignment": "pruning", "cladeInputs": "pruning",
+    # sharding
+    "Shard": "sharding", "planShards": "sharding", "shardInputs": "sharding",
+    "stitch": "sharding",
+    # preflight
+    "check": "preflight", "Report": "preflight",
+    "checkTree": "preflight", "checkAlignment": "preflight",
+    # shared
+    "SharedArrays": "shared", "publish": "shared", "attach": "shared",
+    "publishInputs": "shared", "alignmentArrays": "shared", "treeArrays": "shared",
+    # fasta_index
+    "FastaIndex": "fasta_index", "readFastaRecords": "fasta_index",
+    # optimised data structures
+    "FitchReconstruction": "parsimony",
+    "POGDag": "pog_dag",
+    "POGAutomaton": "pog_automaton",
+    "POGSampler": "pog_sampler",
+    "treeTables": "export", "writeTreeTables": "export",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+
+    if name not in _EXPORTS:
+
+        # submodules can also be reached as attributes, e.g. GRASPy.codec
+        try:
+            return importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as err:
+            if err.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+
+    # later lookups skip __getattr__
+    globals()[name] = value
+
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
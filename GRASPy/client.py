@@ -5,11 +5,53 @@
 # JSON strings.
 ###############################################################################
 
+import contextlib
+import logging
 import socket
+import threading
 import time
 import sys
+from typing import Iterable, Optional, Union
+from . import instrument
 
+logger = logging.getLogger(__name__)
 
+# the server used when no other endpoint is selected
+HOST = '10.139.1.21'
+PORT = 4072
+
+# endpoint selected by the current thread, see endpoint()
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def endpoint(host: str, port: int):
+    """Sends every request made by the current thread within the
+    with block to host:port instead of the default server.
+
+    Parameters:
+        host(str): address of the server
+
+        port(int): port of the server
+    """
+
+    previous = getattr(_local, "endpoint", None)
+    _local.endpoint = (host, port)
+
+    try:
+        yield
+    finally:
+        _local.endpoint = previous
+
+
+def currentEndpoint() -> Optional[tuple[str, int]]:
+    """The endpoint selected by the current thread, None if the
+    default server is in use"""
+
+    return getattr(_local, "endpoint", None)
+
+
+@instrument.timed("receive")
 def receive_message(socket, timeout=2) -> str:
     """Recieves chunks of data from the server 
     and decodes this from bytes back into a 
@@ -41,14 +83,16 @@ def receive_message(socket, timeout=2) -> str:
             # read in the data and record it
             chunk = socket.recv(8192)
             if chunk:
+                instrument.count("bytes_received", len(chunk))
                 toStr = chunk.decode()
                 message.append(toStr)
 
                 # reset the timeout
                 start = time.time()
 
+            # the server has closed the connection
             else:
-                time.sleep(0.1)
+                break
 
         # if no data, continue and re-test conditions
         except:
@@ -57,43 +101,58 @@ def receive_message(socket, timeout=2) -> str:
     return ''.join(message)
 
 
-def sendRequest(message: str) -> str:
+def sendRequest(message: Union[str, bytes, Iterable[bytes]],
+                host: Optional[str] = None, port: Optional[int] = None) -> str:
     """User enters their message which is 
     converted into bytes before being sent to 
     the server. Also recieves the response and 
     returns this to the user. 
+
+    The message can also be an iterable of byte chunks, such as
+    streaming.iterRequest(), which are sent as they are produced.
+
+    The request goes to host:port if given, otherwise to the endpoint
+    selected with endpoint() or the default HOST and PORT.
     """
 
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     except socket.error:
 
-        print("Socket failed to be created")
+        logger.error("Socket failed to be created")
         sys.exit()
 
-    #print("Socket created...\n")
-
-    HOST = '10.139.1.21'
-    PORT = 4072
+    if host is None:
+        host, port = currentEndpoint() or (HOST, PORT)
 
-    print("Connecting to server...\n")
+    logger.info("Connecting to server...")
 
-    s.connect((HOST, PORT))
+    with instrument.span("connect", host=host, port=port):
+        s.connect((host, port))
 
-    print(f"Socket connected to {HOST} on IP {PORT}\n")
+    logger.info(f"Socket connected to {host} on IP {port}")
 
     try:
-        s.sendall(message.encode())
+        if isinstance(message, str):
+            message = [message.encode()]
+
+        elif isinstance(message, bytes):
+            message = [message]
+
+        # chunks of a streamed request are encoded while this span is open
+        with instrument.span("send"):
+            for chunk in message:
+                s.sendall(chunk)
+                instrument.count("bytes_sent", len(chunk))
+                instrument.count("chunks_sent")
 
     except socket.error:
 
-        print("Send failed\n")
+        logger.error("Send failed")
         sys.exit()
 
     response = receive_message(s)
 
-    #print("Closing socket...\n")
-
     s.close()
 
     return response
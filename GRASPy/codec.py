@@ -0,0 +1,205 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: A single place to encode and decode JSON for requests, results and
+# saved outputs. A faster library (orjson or ujson) is used when one is
+# installed, otherwise the standard json module. The backend can be chosen
+# for the whole session or for a single call. Numeric arrays in POGraph
+# JSON can also be decoded straight into NumPy arrays.
+###############################################################################
+
+import json
+import sys
+from typing import Optional
+from . import inputs
+from . import instrument
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# backends in order of preference
+BACKENDS = [name for name, lib in (("orjson", orjson), ("ujson", ujson),
+                                   ("json", json)) if lib is not None]
+
+# rectangular integer fields of a POGraph, "Adjacent" is ragged and is
+# left as lists
+ARRAY_KEYS = ("Indices", "Starts", "Ends", "Edgeindices")
+
+# rows of a matrix written together by iterArrayJSON()
+ROW_CHUNK_SIZE = 100000
+
+_backend = BACKENDS[0]
+
+
+def setBackend(name: str) -> None:
+    """Selects the JSON library used when no backend is given to a call.
+
+    Parameters:
+        name(str): "orjson", "ujson" or "json"
+    """
+
+    global _backend
+
+    _backend = _checkBackend(name)
+
+
+def getBackend() -> str:
+    """Name of the JSON library currently in use"""
+
+    return _backend
+
+
+def _checkBackend(name: Optional[str]) -> str:
+    '''Resolves a backend name, None gives the current backend'''
+
+    if name is None:
+        return _backend
+
+    if name not in BACKENDS:
+        raise RuntimeError(f"JSON backend {name} is not available, use one of {BACKENDS}")
+
+    return name
+
+
+def arrayToJSON(data) -> list:
+    """Converts a matrix into nested lists with None in place of NaN"""
+
+    import numpy as np
+
+    data = np.asarray(data, dtype=np.float64)
+
+    return np.where(np.isnan(data), None, data).tolist()
+
+
+def iterArrayJSON(data, chunk_size: int = ROW_CHUNK_SIZE):
+    """Yields the rows of a matrix as JSON text a chunk at a time, so that
+    a large "Data" array can be written out without building every row
+    as a list first. NaN is written as null and chunks are joined by
+    commas, the caller adds the enclosing brackets.
+    """
+
+    for start in range(0, len(data), chunk_size):
+
+        text = json.dumps(arrayToJSON(data[start: start + chunk_size]))
+
+        yield ("," if start > 0 else "") + text[1:-1]
+
+
+def isArray(obj) -> bool:
+    """True for NumPy arrays, without importing NumPy when nothing has
+    loaded it yet (in which case obj cannot be an array)"""
+
+    np = sys.modules.get("numpy")
+
+    return np is not None and isinstance(obj, np.ndarray)
+
+
+def jsonDefault(obj):
+    """Passed to json.dumps() as default= so that NumPy values in a
+    request are serialised, with NaN written as null."""
+
+    np = sys.modules.get("numpy")
+
+    if np is not None and isinstance(obj, np.ndarray):
+        return arrayToJSON(obj) if obj.dtype.kind == 'f' else obj.tolist()
+
+    if np is not None and isinstance(obj, np.generic):
+        return obj.item()
+
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+@instrument.timed("encode")
+def dumps(obj, backend: Optional[str] = None) -> str:
+    """Encodes obj as JSON text. NumPy arrays and scalars are accepted,
+    NaN is written as null.
+
+    Parameters:
+        obj: value to encode
+
+        backend(str): JSON library for this call only
+
+    Returns:
+        str: JSON text
+    """
+
+    backend = _checkBackend(backend)
+
+    if backend == "orjson":
+        return orjson.dumps(obj, default=jsonDefault).decode()
+
+    if backend == "ujson":
+        return ujson.dumps(obj, default=jsonDefault)
+
+    return json.dumps(obj, default=jsonDefault)
+
+
+@instrument.timed("decode")
+def loads(text, backend: Optional[str] = None, arrays: bool = False):
+    """Decodes JSON text.
+
+    Parameters:
+        text(str or bytes): JSON text
+
+        backend(str): JSON library for this call only
+
+        arrays(bool): convert the ARRAY_KEYS fields of every POGraph
+        into int64 NumPy arrays
+
+    Returns:
+        the decoded value
+    """
+
+    backend = _checkBackend(backend)
+
+    if backend == "orjson":
+        obj = orjson.loads(text)
+    elif backend == "ujson":
+        obj = ujson.loads(text)
+    else:
+        obj = json.loads(text)
+
+    if arrays:
+        _toArrays(obj)
+
+    return obj
+
+
+def load(file_name: str, backend: Optional[str] = None, arrays: bool = False):
+    """Decodes a JSON file such as a saved job output, see loads()"""
+
+    with inputs.openInput(file_name, 'rb') as f:
+        return loads(f.read(), backend=backend, arrays=arrays)
+
+
+def _toArrays(obj) -> None:
+    '''Replaces the ARRAY_KEYS lists found anywhere in obj, in place'''
+
+    import numpy as np
+
+    stack = [obj]
+
+    while stack:
+
+        item = stack.pop()
+
+        if isinstance(item, dict) and "Indices" in item:
+
+            # a POGraph, its nodes and edges hold nothing to convert
+            for key in ARRAY_KEYS:
+                if isinstance(item.get(key), list):
+                    item[key] = np.array(item[key], dtype=np.int64)
+
+        elif isinstance(item, dict):
+            stack.extend(v for v in item.values() if isinstance(v, (dict, list)))
+
+        # lists of numbers or strings hold nothing to convert
+        elif item and isinstance(item[0], (dict, list)):
+            stack.extend(item)
@@ -0,0 +1,153 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Converts sequences and the sequences stored on a POGTree into compact
+# NumPy matrices. Each symbol is stored as its single byte (ASCII) code so
+# that every alphabet can share one encoding and whole alignments can be
+# compared column by column without Python loops.
+###############################################################################
+
+import numpy as np
+from numpy.typing import NDArray
+from . import sequence
+
+# byte used to represent a gap or a position missing from a POGraph
+GAP = ord('-')
+
+
+def encodeSequence(seq) -> NDArray[np.uint8]:
+    """Encodes a single sequence as an array of byte codes.
+
+    Parameters:
+        seq(Sequence or str): the sequence to encode
+
+    Returns:
+        np.array: uint8 code for each symbol in the sequence
+    """
+
+    if isinstance(seq, sequence.Sequence):
+        seq = ''.join(seq.sequence)
+
+    return np.frombuffer(seq.encode('ascii'), dtype=np.uint8)
+
+
+def encodeSequences(seqs: list) -> NDArray[np.uint8]:
+    """Encodes aligned sequences into a sequence x column matrix.
+
+    Parameters:
+        seqs(list): Sequence objects or strings of equal length
+
+    Returns:
+        np.array: uint8 matrix with one row per sequence
+    """
+
+    if len(seqs) == 0:
+        return np.empty((0, 0), dtype=np.uint8)
+
+    rows = [encodeSequence(s) for s in seqs]
+
+    width = len(rows[0])
+
+    for s, row in zip(seqs, rows):
+        if len(row) != width:
+            name = s.name if isinstance(s, sequence.Sequence) else s
+            raise RuntimeError(
+                f"Sequence {name} has length {len(row)} but alignment has width {width}")
+
+    return np.vstack(rows)
+
+
+def encodePadded(seqs: list, fill: int = 0) -> tuple[NDArray[np.uint8], NDArray[np.int64]]:
+    """Encodes sequences of different lengths into one matrix, padding
+    the end of shorter rows.
+
+    Parameters:
+        seqs(list): Sequence objects or strings
+
+        fill(int): byte used for padding
+
+    Returns:
+        np.array: uint8 matrix with one row per sequence
+
+        np.array: length of each sequence
+    """
+
+    strs = [''.join(s.sequence) if isinstance(s, sequence.Sequence) else s
+            for s in seqs]
+
+    lengths = np.array([len(s) for s in strs], dtype=np.int64)
+
+    width = int(lengths.max()) if len(strs) > 0 else 0
+
+    matrix = np.full((len(strs), width), fill, dtype=np.uint8)
+
+    flat = np.frombuffer(''.join(strs).encode('ascii'), dtype=np.uint8)
+
+    # row and column of every byte in the joined string
+    rows = np.repeat(np.arange(len(strs)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    cols = np.arange(len(flat)) - np.repeat(starts, lengths)
+
+    matrix[rows, cols] = flat
+
+    return matrix, lengths
+
+
+def decodeSequence(codes: NDArray[np.uint8]) -> str:
+    """Converts an array of byte codes back into a string"""
+
+    return np.ascontiguousarray(codes, dtype=np.uint8).tobytes().decode('ascii')
+
+
+def encodeAlignment(file_name: str) -> tuple[list[str], NDArray[np.uint8]]:
+    """Reads an aligned FASTA file and encodes it.
+
+    Parameters:
+        file_name(str): path to aln file
+
+    Returns:
+        list: names of each sequence in file order
+
+        np.array: uint8 matrix with one row per sequence
+    """
+
+    seqs = sequence.readFastaFile(file_name, gappy=True)
+
+    return [s.name for s in seqs], encodeSequences(seqs)
+
+
+def encodeTree(tree) -> tuple[NDArray[np.uint8], NDArray[np.bool_]]:
+    """Encodes the POGraph of every branchpoint on a POGTree into a
+    branchpoint x column matrix. Rows follow the tree indices and
+    columns are alignment positions taken from POGraph.indices, so
+    positions that are not part of a graph are stored as gaps.
+
+    Parameters:
+        tree(POGTree): tree with POGraphs for some or all branchpoints
+
+    Returns:
+        np.array: uint8 matrix of shape (nBranches, alignment width)
+
+        np.array: True for rows that have a POGraph
+    """
+
+    width = max([g.size for g in tree.graphs.values()], default=0)
+
+    for g in tree.graphs.values():
+        if len(g.indices) > 0:
+            width = max(width, int(np.max(g.indices)) + 1)
+
+    matrix = np.full((tree.nBranches, width), GAP, dtype=np.uint8)
+    has_graph = np.zeros(tree.nBranches, dtype=bool)
+
+    for name, g in tree.graphs.items():
+
+        row = tree.indices[name]
+
+        symbols = ''.join([n.symbol for n in g.nodes])
+
+        matrix[row, np.asarray(g.indices, dtype=np.int64)] = \
+            encodeSequence(symbols)
+        has_graph[row] = True
+
+    return matrix, has_graph
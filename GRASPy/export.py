@@ -0,0 +1,182 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Flattens the POGraphs of a POGTree into tidy tables with one row per
+# edge and one row per node. Each attribute is gathered as a whole column in
+# a single pass over the graphs so that tree-wide edge statistics become a
+# single groupby. Large trees can be written out in chunks of graphs as CSV
+# or .npz files.
+###############################################################################
+
+import numpy as np
+import pandas as pd
+from typing import Iterator, Optional
+from . import pog_tree
+
+# number of POGraphs flattened per chunk
+CHUNK_SIZE = 1000
+
+EDGE_COLUMNS = ["Graph", "Start", "End", "Weight", "Recip", "Forward",
+                "Backward", "Ancestral"]
+
+NODE_COLUMNS = ["Graph", "Column", "Symbol"]
+
+# one record per edge, flags are -1 when missing
+_EDGE_RECORD = np.dtype([("start", np.int64), ("end", np.int64), ("weight", np.float64),
+                         ("recip", np.int8), ("forward", np.int8), ("backward", np.int8),
+                         ("ancestral", np.bool_)])
+
+
+def _flag(codes: np.ndarray) -> pd.array:
+    '''Booleans that may be missing, as for adjacent edges of extants'''
+
+    return pd.arrays.BooleanArray(codes == 1, codes < 0)
+
+
+def graphTables(graphs: list, names: Optional[list[str]] = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Builds the edge and node tables for a list of POGraphs.
+
+    Parameters:
+        graphs(list[POGraph]): graphs to flatten
+
+        names(list[str]): label of each graph in the Graph column,
+        defaults to the name of the graph. Extants of a deduplicated
+        tree share one graph, so trees are labelled by their keys.
+
+    Returns:
+        pd.DataFrame: one row per edge with the columns in EDGE_COLUMNS.
+        Ancestral is True for edges added from the joint reconstruction
+        rather than the adjacency of the sequence.
+
+        pd.DataFrame: one row per node with the columns in NODE_COLUMNS
+    """
+
+    if names is None:
+        names = [g.name for g in graphs]
+
+    names = np.array(names, dtype=object)
+
+    nodes = [n for g in graphs for n in g.nodes]
+
+    node_counts = np.array([len(g.nodes) for g in graphs], dtype=np.int64)
+    edge_counts = np.array([sum(len(n.edges) for n in g.nodes) for g in graphs],
+                           dtype=np.int64)
+
+    # every attribute of an edge is read in the same pass
+    edges = np.fromiter(((e.start, e.end, np.nan if e.weight is None else e.weight,
+                          -1 if e.recip is None else e.recip,
+                          -1 if e.forward is None else e.forward,
+                          -1 if e.backward is None else e.backward,
+                          e.edgeType is not None)
+                         for n in nodes for e in n.edges),
+                        dtype=_EDGE_RECORD, count=int(edge_counts.sum()))
+
+    edge_table = pd.DataFrame({
+        "Graph": pd.Categorical(np.repeat(names, edge_counts), categories=names),
+        "Start": edges["start"],
+        "End": edges["end"],
+        "Weight": edges["weight"],
+        "Recip": _flag(edges["recip"]),
+        "Forward": _flag(edges["forward"]),
+        "Backward": _flag(edges["backward"]),
+        "Ancestral": edges["ancestral"]},
+        columns=EDGE_COLUMNS)
+
+    node_table = pd.DataFrame({
+        "Graph": pd.Categorical(np.repeat(names, node_counts), categories=names),
+        "Column": np.array([n.name for n in nodes], dtype=np.int64),
+        "Symbol": np.array([n.symbol for n in nodes], dtype=object)},
+        columns=NODE_COLUMNS)
+
+    return edge_table, node_table
+
+
+def iterTreeTables(tree: pog_tree.POGTree,
+                   chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[pd.DataFrame, pd.DataFrame]]:
+    """Yields the edge and node tables of a tree a chunk of graphs at a time,
+    see graphTables().
+    """
+
+    names = list(tree.graphs.keys())
+    graphs = list(tree.graphs.values())
+
+    for start in range(0, len(graphs), chunk_size):
+        yield graphTables(graphs[start: start + chunk_size], names[start: start + chunk_size])
+
+
+def treeTables(tree: pog_tree.POGTree) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Edge and node tables for every POGraph on the tree.
+
+    Parameters:
+        tree(POGTree): tree annotated with POGraphs
+
+    Returns:
+        pd.DataFrame: one row per edge
+
+        pd.DataFrame: one row per node
+    """
+
+    return graphTables(list(tree.graphs.values()), list(tree.graphs.keys()))
+
+
+def writeTreeTables(tree: pog_tree.POGTree, prefix: str, fmt: str = "csv",
+                    chunk_size: int = CHUNK_SIZE) -> list[str]:
+    """Writes the edge and node tables of a tree to file without holding
+    all of them in memory at once.
+
+    CSV output is written to <prefix>_edges.csv and <prefix>_nodes.csv,
+    appending one chunk of graphs at a time. npz output writes one
+    <prefix>_edges_<chunk>.npz and <prefix>_nodes_<chunk>.npz per chunk
+    with one array per column.
+
+    Parameters:
+        tree(POGTree): tree annotated with POGraphs
+
+        prefix(str): path and start of the file names
+
+        fmt(str): "csv" or "npz"
+
+        chunk_size(int): number of POGraphs per chunk
+
+    Returns:
+        list[str]: names of the files written
+    """
+
+    if fmt not in ("csv", "npz"):
+        raise RuntimeError(f"Unsupported format {fmt}, use csv or npz")
+
+    files = []
+
+    for i, (edges, nodes) in enumerate(iterTreeTables(tree, chunk_size)):
+
+        for kind, table in (("edges", edges), ("nodes", nodes)):
+
+            if fmt == "csv":
+
+                name = f"{prefix}_{kind}.csv"
+                table.to_csv(name, mode='w' if i == 0 else 'a',
+                             header=(i == 0), index=False)
+
+                if i == 0:
+                    files.append(name)
+
+            else:
+
+                name = f"{prefix}_{kind}_{i}.npz"
+                columns = {}
+
+                for col in table.columns:
+
+                    values = table[col]
+
+                    if isinstance(values.dtype, pd.BooleanDtype):
+                        # missing flags are stored as -1
+                        values = values.astype("Int8").fillna(-1)
+
+                    columns[col] = values.to_numpy(dtype=str if col in ("Graph", "Symbol")
+                                                   else None)
+
+                np.savez_compressed(name, **columns)
+                files.append(name)
+
+    return files
@@ -0,0 +1,277 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Random access to the records of a large FASTA file. A faidx style
+# index (name, length, byte offset, line layout) is built in one streaming
+# pass and stored next to the file. Records, or a range of columns within
+# them, are then read through a memory map with a single seek each. The
+# index is rebuilt whenever the size or modification time of the FASTA
+# file no longer matches the one it was built from.
+###############################################################################
+
+import mmap
+import os
+from typing import Optional
+from . import inputs
+from . import sequence
+
+# appended to the FASTA file name to give the index file name
+INDEX_SUFFIX = ".gfai"
+
+_HEADER = "# GRASPy fasta index"
+
+COLUMNS = ["name", "length", "offset", "linebases", "linewidth", "bytes"]
+
+
+def indexPath(file_name: str) -> str:
+    """Name of the index file stored next to a FASTA file"""
+
+    return file_name + INDEX_SUFFIX
+
+
+class FastaIndex(object):
+    """Index of an uncompressed FASTA file. For each record it stores the
+    number of residues, the byte offset of the first residue, the
+    residues and bytes per full line and the number of bytes up to the
+    next record. Records whose lines are not all the same length (or
+    contain spaces or '*') are flagged with linebases = 0 and are read
+    whole.
+    """
+
+    def __init__(self, file_name: str, rebuild: bool = False,
+                 save: bool = True) -> None:
+        """Loads the index of a FASTA file, building it if it is
+        missing or out of date.
+
+        Parameters:
+            file_name(str): path to the FASTA file
+
+            rebuild(bool): build the index even if a valid one exists
+
+            save(bool): write a newly built index next to the file
+        """
+
+        if inputs.detectCompression(file_name) is not None:
+            raise RuntimeError(f"{file_name} is compressed and cannot be indexed")
+
+        self.file_name = file_name
+
+        stat = os.stat(file_name)
+        self.stamp = (stat.st_size, stat.st_mtime_ns)
+
+        if rebuild or not self._load():
+
+            self._build()
+
+            if save:
+                try:
+                    self._save()
+                except OSError:
+                    # a read only directory only means the index is not kept
+                    pass
+
+        self.lookup = {name: i for i, name in enumerate(self.names)}
+
+        self._file = open(file_name, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if self.stamp[0] > 0 else b''
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.lookup
+
+    def __str__(self) -> str:
+        return (f"File: {self.file_name}\nRecords: {len(self)}")
+
+    def __enter__(self) -> "FastaIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Releases the memory map and the file"""
+
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+        self._file.close()
+
+    def _build(self) -> None:
+        '''Indexes every record in one pass over the file'''
+
+        self.names, self.length, self.offset = [], [], []
+        self.linebases, self.linewidth, self.nbytes = [], [], []
+
+        # layout of the current record
+        length = linebases = linewidth = 0
+        regular = ended = False
+
+        pos = 0
+
+        with open(self.file_name, 'rb') as f:
+
+            for line in f:
+
+                n = len(line)
+
+                if line.startswith(b'>'):
+
+                    if self.names:
+                        self.length.append(length)
+                        self.linebases.append(linebases if regular else 0)
+                        self.linewidth.append(linewidth if regular else 0)
+                        self.nbytes.append(pos - self.offset[-1])
+
+                    words = line[1:].decode().split()
+                    self.names.append(sequence.parseDefline(words[0])[0] if words else '')
+                    self.offset.append(pos + n)
+
+                    length = linebases = linewidth = 0
+                    regular, ended = True, False
+
+                    pos += n
+                    continue
+
+                pos += n
+
+                data = line.rstrip(b'\r\n')
+
+                if not self.names:
+                    continue
+
+                # a blank or short line must be the last of the record
+                if len(data) == 0:
+                    ended = True
+                    continue
+
+                if b' ' in data or b'\t' in data or b'*' in data:
+                    regular = False
+                    length += len(b''.join(data.split()).replace(b'*', b''))
+                    continue
+
+                if linebases == 0:
+                    linebases, linewidth = len(data), n
+
+                elif ended or len(data) > linebases or n - len(data) != linewidth - linebases:
+                    regular = False
+
+                ended = ended or len(data) < linebases
+                length += len(data)
+
+            if self.names:
+                self.length.append(length)
+                self.linebases.append(linebases if regular else 0)
+                self.linewidth.append(linewidth if regular else 0)
+                self.nbytes.append(pos - self.offset[-1])
+
+        if len(set(self.names)) != len(self.names):
+            raise RuntimeError(f"{self.file_name} has records with the same name")
+
+    def _save(self) -> None:
+        '''Writes the index next to the FASTA file'''
+
+        with open(indexPath(self.file_name), 'w') as f:
+
+            f.write(f"{_HEADER}\t{self.stamp[0]}\t{self.stamp[1]}\n")
+
+            for row in zip(self.names, self.length, self.offset, self.linebases,
+                           self.linewidth, self.nbytes):
+                f.write('\t'.join(map(str, row)) + '\n')
+
+    def _load(self) -> bool:
+        '''Reads a stored index, False if it is missing or out of date'''
+
+        path = indexPath(self.file_name)
+
+        if not os.path.exists(path):
+            return False
+
+        with open(path) as f:
+
+            header = f.readline().rstrip('\n').split('\t')
+
+            if header[0] != _HEADER or tuple(map(int, header[1:])) != self.stamp:
+                return False
+
+            rows = [line.rstrip('\n').split('\t') for line in f]
+
+        self.names = [r[0] for r in rows]
+        self.length, self.offset, self.linebases, self.linewidth, self.nbytes = \
+            ([int(r[c]) for r in rows] for c in range(1, 6))
+
+        return True
+
+    def fetch(self, name: str, start: int = 0, end: Optional[int] = None) -> str:
+        """Reads the residues of one record, or the columns start:end of
+        it, without parsing the rest of the file.
+
+        Parameters:
+            name(str): name of the record
+
+            start(int): first column
+
+            end(int): column after the last, defaults to the end
+
+        Returns:
+            str: the (gapped) sequence
+        """
+
+        if name not in self.lookup:
+            raise RuntimeError(f"{name} is not in {self.file_name}")
+
+        i = self.lookup[name]
+
+        length = self.length[i]
+        start, end, _ = slice(start, end).indices(length)
+
+        if end <= start:
+            return ''
+
+        offset, lb, lw = self.offset[i], self.linebases[i], self.linewidth[i]
+
+        # irregular records are read whole and cleaned like readFasta()
+        if lb == 0:
+            raw = self._map[offset: offset + self.nbytes[i]]
+            return b''.join(raw.split()).replace(b'*', b'')[start:end].decode()
+
+        first = offset + (start // lb) * lw + start % lb
+        last = offset + ((end - 1) // lb) * lw + (end - 1) % lb + 1
+
+        raw = self._map[first: last]
+
+        if lw - lb > 0:
+            raw = raw.replace(b'\n', b'').replace(b'\r', b'')
+
+        return raw.decode()
+
+    def fetchSequences(self, names: list[str], start: int = 0,
+                       end: Optional[int] = None) -> list[sequence.Sequence]:
+        """Reads several records as Sequence objects, see fetch()"""
+
+        return [sequence.Sequence(list(self.fetch(name, start, end)), name=name,
+                                  gappy=True) for name in names]
+
+
+def readFastaRecords(file_name: str, names: list[str], start: int = 0,
+                     end: Optional[int] = None) -> list[sequence.Sequence]:
+    """Reads some records of a FASTA file through its index, building
+    the index first if needed.
+
+    Parameters:
+        file_name(str): path to the FASTA file
+
+        names(list[str]): records to read, in the order returned
+
+        start(int): first column
+
+        end(int): column after the last, defaults to the end
+
+    Returns:
+        list[Sequence]: the records
+    """
+
+    with FastaIndex(file_name) as index:
+        return index.fetchSequences(names, start, end)
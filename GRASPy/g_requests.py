@@ -7,33 +7,104 @@
 # that the user can ask of the server.
 ###############################################################################
 
-import json
+import contextlib
+import logging
+import time
 from . import client
-from . import parsers
-from typing import Optional
+from . import codec
+from . import inputs
+from . import instrument
+from . import streaming
+from typing import Optional, TYPE_CHECKING
+
+# parsers, tree_index and pandas are imported by the commands that use
+# them, so that status requests do not load NumPy or pandas
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# requests are passed through this router when one is set
+_router = None
+
+# job -> pruning.Reduction for jobs submitted with a reduced alignment
+_reductions = {}
+
+# inputs are checked with preflight.check() before they are submitted
+_preflight = True
+
+# job states that will never produce an output
+FAILED = ("cancelled", "failed", "error")
+
+
+def setRouter(router) -> Optional[object]:
+    """Sends every following request through a router.Router, or
+    straight to the server again if router is None.
+
+    Returns:
+        the router that was previously set
+    """
+
+    global _router
+
+    previous, _router = _router, router
+
+    return previous
+
+
+def setPreflight(enabled: bool) -> bool:
+    """Turns the checks made on the tree and alignment of every job
+    before it is submitted (see preflight.check()) on or off.
+
+    Returns:
+        bool: whether the checks were on before
+    """
+
+    global _preflight
+
+    previous, _preflight = _preflight, enabled
+
+    return previous
+
+
+def dispatch(request: dict, message) -> str:
+    '''Sends an encoded request through the router if one is set'''
+
+    if _router is None:
+        return client.sendRequest(message)
+
+    return _router.send(request, message)
 
 
 ###### REQUESTS######
 
 def send_and_recieve(request: dict) -> dict:
 
-    j_request = json.dumps(request) + '\n'
+    with instrument.span("request", command=request.get("Command")):
 
-    j_response = client.sendRequest(j_request)
+        # encoded piece by piece as it is sent
+        j_response = dispatch(request, streaming.iterRequest(request))
 
-    response = json.loads(j_response)
+        response = codec.loads(j_response)
 
-    print(response)
+    logger.info(response)
 
     return response
 
 
-def JobOutput(job_id: int) -> dict:
+def JobOutput(job_id: int, backend: Optional[str] = None,
+              arrays: bool = False) -> dict:
     """Requests the output of a submitted job. Request will be
     denied if the job is not complete.
 
     Parameters:
         job_id(int): The ID of the job
+        backend(str): JSON library used to decode the output,
+        see codec.setBackend()
+        arrays(bool): decode POGraph indices into NumPy arrays
+
+    The result of a job submitted with a reduced alignment is put back
+    into the original coordinates the first time it is returned.
 
     Returns:
         str: {"Job":<job-number>, "Result":{<result-JSON>}}
@@ -44,12 +115,23 @@ def JobOutput(job_id: int) -> dict:
     request["Command"] = "Output"
     request["Job"] = job_id
 
-    # won't use function so entire output is not printed
-    j_request = json.dumps(request) + '\n'
+    # won't use function so entire output is not logged
+    with instrument.span("request", command="Output"):
+
+        j_request = codec.dumps(request, backend) + '\n'
+
+        j_response = dispatch(request, j_request)
+
+        response = codec.loads(j_response, backend, arrays)
 
-    j_response = client.sendRequest(j_request)
+    # results of reduced jobs are put back into original coordinates, the
+    # Reduction is let go once the result has been collected
+    if isinstance(response.get("Result"), dict):
 
-    response = json.loads(j_response)
+        reduction = _reductions.pop(job_id, None)
+
+        if reduction is not None:
+            reduction.remapResult(response["Result"])
 
     return response
 
@@ -124,7 +206,126 @@ def JobStatus(job_id: int) -> dict:
 ###### COMMANDS######
 
 
-def ExtantPOGTree(aln: str, nwk: str, auth: str = "Guest") -> dict:
+def _checkInputs(aln: Optional[str] = None, nwk: Optional[str] = None,
+                 alphabet: Optional[str] = None) -> None:
+    '''Stops a job before it is submitted if its inputs fail the
+    preflight checks'''
+
+    if not _preflight:
+        return
+
+    from . import preflight
+
+    report = preflight.check(aln, nwk, alphabet)
+
+    logger.info(report)
+
+    report.raiseIfFailed()
+
+
+def _reducedInputs(aln: str, nwk: str, alphabet: Optional[str],
+                   max_gap_fraction: Optional[float], min_occupancy: Optional[float],
+                   column_mask, deduplicate: bool) -> tuple[dict, dict, Optional[object]]:
+    '''Tree and alignment in JSON format, reduced when any threshold
+    or mask is given or duplicates are removed, see pruning.reduceInputs()'''
+
+    _checkInputs(aln, nwk, alphabet)
+
+    if max_gap_fraction is None and min_occupancy is None and column_mask is None \
+            and not deduplicate:
+
+        from . import parsers
+
+        return (parsers.nwkToJSON(inputs.readNwkFile(nwk)),
+                parsers.alnToJSON(aln, alphabet, lazy=True), None)
+
+    from . import pruning
+
+    return pruning.reduceInputs(aln, nwk, max_gap_fraction, min_occupancy,
+                                column_mask, alphabet, lazy=True,
+                                deduplicate=deduplicate)
+
+
+def _selectEndpoint(selected):
+    '''Selects, in a worker thread, the endpoint that was selected in the
+    thread that started it'''
+
+    if selected is None:
+        return contextlib.nullcontext()
+
+    return client.endpoint(*selected)
+
+
+def _failure(response: dict) -> Optional[str]:
+    '''Why a job will never produce an output, None if it still might'''
+
+    if "Error" in response:
+        return str(response["Error"])
+
+    status = str(response.get("Status", ""))
+
+    if status.lower() in FAILED:
+        return status
+
+    return None
+
+
+def _collect(response: dict, poll: float, timeout: Optional[float] = None) -> dict:
+    '''Waits for a queued job and adds its output to the response.
+    Raises a RuntimeError if the job failed, was cancelled or is unknown
+    to the server, or once timeout seconds have passed'''
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    while "Result" not in response:
+
+        failure = _failure(response)
+
+        if "Job" not in response or failure is not None:
+            raise RuntimeError(f"Job was not completed: {failure or response}")
+
+        job = response["Job"]
+
+        output = JobOutput(job)
+
+        if "Result" in output:
+            response.update(output)
+            break
+
+        failure = _failure(output) or _failure(JobStatus(job))
+
+        if failure is not None:
+            raise RuntimeError(f"Job {job} was not completed: {failure}")
+
+        if deadline is not None and time.monotonic() >= deadline:
+            raise RuntimeError(f"Job {job} did not finish within {timeout} seconds")
+
+        time.sleep(poll)
+
+    return response
+
+
+def _submit(request: dict, reduction) -> dict:
+    '''Sends a job, remembering how to remap its output if reduced'''
+
+    response = send_and_recieve(request)
+
+    if reduction is not None:
+
+        if "Job" in response:
+            _reductions[response["Job"]] = reduction
+
+        if isinstance(response.get("Result"), dict):
+            reduction.remapResult(response["Result"])
+
+    return response
+
+
+def ExtantPOGTree(aln: str, nwk: str, auth: str = "Guest",
+                  max_gap_fraction: Optional[float] = None,
+                  min_occupancy: Optional[float] = None,
+                  column_mask=None,
+                  deduplicate: bool = False) -> dict:
     """Queries the server to turn an alignment
     and a nwk file into the POGTree format with POGraphs for extants.
 
@@ -134,6 +335,11 @@ def ExtantPOGTree(aln: str, nwk: str, auth: str = "Guest") -> dict:
     Parameters:
         aln(str) = path to file name of aln 
         nwk(str) = path to or file name of nwk 
+        max_gap_fraction(float) = drop columns with more gaps than this
+        min_occupancy(float) = drop sequences with fewer residues than this
+        column_mask(list) = drop columns that are False, indices in the
+                            output always refer to the original alignment
+        deduplicate(bool) = send each clade of identical sequences once
 
     Returns:
         dict: Will complete the job and provide a POG graph of the
@@ -147,25 +353,24 @@ def ExtantPOGTree(aln: str, nwk: str, auth: str = "Guest") -> dict:
 
     params = dict()
 
-    with open(nwk, 'r') as f:
-        tree = ""
-        for line in f:
-            tree += line.strip()
-
-    params["Tree"] = parsers.nwkToJSON(tree)
-
-    params["Alignment"] = parsers.alnToJSON(aln, "Protein")
+    params["Tree"], params["Alignment"], reduction = _reducedInputs(
+        aln, nwk, "Protein", max_gap_fraction, min_occupancy, column_mask,
+        deduplicate)
 
     request["Params"] = params
 
-    return send_and_recieve(request)
+    return _submit(request, reduction)
 
 
 def JointReconstruction(aln: str, nwk: str,
                         auth: str = "Guest",
                         indels: str = "BEP",
                         model: str = "JTT",
-                        alphabet: Optional[str] = None) -> dict:
+                        alphabet: Optional[str] = None,
+                        max_gap_fraction: Optional[float] = None,
+                        min_occupancy: Optional[float] = None,
+                        column_mask=None,
+                        deduplicate: bool = False) -> dict:
     """Queries the bnkit server for a joint reconstruction.
     Will default to standard bnkit reconstruction parameters which
     use BEP for indels and JTT for the substitution model.
@@ -181,6 +386,19 @@ def JointReconstruction(aln: str, nwk: str,
         alphabet(str) = Sequence type. e.g. DNA or Protein. 
                         If user does not specify, it will guess
                         based on sequence content. 
+        max_gap_fraction(float) = drop columns where a larger fraction
+                                  of sequences have a gap
+        min_occupancy(float) = drop sequences where a smaller fraction
+                               of columns have a residue, the tree is
+                               pruned to match
+        column_mask(list) = drop columns that are False
+        deduplicate(bool) = send each clade of identical sequences as
+                            one sequence, the others share its POGraph
+                            in POGTreeFromJointReconstruction()
+
+    When columns or sequences are dropped, JobOutput() returns POGraphs
+    in the coordinates of the original alignment, named after the
+    ancestors of the original tree.
 
     Returns:
         str: {"Message":"Queued","Job":<job-number>}
@@ -193,13 +411,59 @@ def JointReconstruction(aln: str, nwk: str,
 
     params = dict()
 
-    with open(nwk, 'r') as f:
-        tree = ""
-        for line in f:
-            tree += line.strip()
+    params["Tree"], params["Alignment"], reduction = _reducedInputs(
+        aln, nwk, alphabet, max_gap_fraction, min_occupancy, column_mask,
+        deduplicate)
 
-    params["Tree"] = parsers.nwkToJSON(tree)
-    params["Alignment"] = parsers.alnToJSON(aln, alphabet)
+    params["Inference"] = "Joint"
+    params["Indels"] = indels
+    params["Model"] = model
+
+    request["Params"] = params
+
+    return _submit(request, reduction)
+
+
+def CladeReconstruction(aln: str, tree, clade,
+                        auth: str = "Guest",
+                        indels: str = "BEP",
+                        model: str = "JTT",
+                        alphabet: Optional[str] = None) -> dict:
+    """Queries the bnkit server for a joint reconstruction of a single
+    clade, see JointReconstruction(). Only the subtree and the rows of
+    the alignment below the clade are sent, and columns that are gaps
+    in every one of those rows are left out.
+
+    JobOutput() returns POGraphs in the coordinates of the whole
+    alignment, named after the ancestors of the whole tree.
+
+    Parameters:
+        aln(str) = path to file name of aln 
+        tree(str or POGTree) = path to file name of nwk or a POGTree
+        clade(str or list) = ID of the root of the clade e.g. "N5" or
+                             a list of extants whose MRCA is the root
+        auth(str) = Authentication token, defaults to Guest
+        indels(str) = Indel mode, defaults to BEP
+        model(str) = Substitution model, defaults to JTT
+        alphabet(str) = Sequence type. e.g. DNA or Protein. 
+
+    Returns:
+        str: {"Message":"Queued","Job":<job-number>}
+    """
+
+    from . import pruning
+
+    _checkInputs(aln, tree if isinstance(tree, str) else None, alphabet)
+
+    request = dict()
+
+    request["Command"] = "Recon"
+    request["Auth"] = auth
+
+    params = dict()
+
+    params["Tree"], params["Alignment"], reduction = pruning.cladeInputs(
+        aln, tree, clade, alphabet)
 
     params["Inference"] = "Joint"
     params["Indels"] = indels
@@ -207,7 +471,97 @@ def JointReconstruction(aln: str, nwk: str,
 
     request["Params"] = params
 
-    return send_and_recieve(request)
+    return _submit(request, reduction)
+
+
+def ShardedReconstruction(aln: str, nwk: str,
+                          max_leaves: int = 1000,
+                          overlap: int = 1,
+                          auth: str = "Guest",
+                          indels: str = "BEP",
+                          model: str = "JTT",
+                          alphabet: Optional[str] = None,
+                          max_workers: int = 4,
+                          poll: float = 5.0,
+                          timeout: Optional[float] = None):
+    """Joint reconstruction of a tree too large for a single job, see
+    JointReconstruction(). The tree is cut into clades of at most
+    max_leaves extants (see sharding.planShards()) which are submitted
+    as separate jobs at the same time, through the router if one is
+    set, and the results are stitched into one POGTree once every job
+    has finished. Ancestors keep the labels of the whole tree.
+
+    Parameters:
+        aln(str) = path to file name of aln 
+        nwk(str) = path to file name of nwk 
+        max_leaves(int) = largest number of extants in one job
+        overlap(int) = extants each job borrows from every clade cut 
+                       off below it, as context for its ancestors
+        auth(str) = Authentication token, defaults to Guest
+        indels(str) = Indel mode, defaults to BEP
+        model(str) = Substitution model, defaults to JTT
+        alphabet(str) = Sequence type. e.g. DNA or Protein. 
+        max_workers(int) = number of jobs submitted and waited on at once
+        poll(float) = seconds between checks on a waiting job
+        timeout(float) = seconds to wait for each job, no limit if None
+
+    Returns:
+        POGTree: the whole tree with every ancestor reconstructed
+    """
+
+    import concurrent.futures
+    from . import parsers
+    from . import sharding
+
+    _checkInputs(aln, nwk, alphabet)
+
+    j_tree = parsers.nwkToJSON(inputs.readNwkFile(nwk))
+
+    shards = sharding.planShards(j_tree, max_leaves, overlap)
+
+    # the JSON alignment of each shard is built when it is sent, so only
+    # the shards being sent are held at once
+    width, data_type, rows = sharding.readShardRows(aln, shards, alphabet)
+
+    logger.info(f"Reconstructing {len(shards)} shards")
+
+    selected = client.currentEndpoint()
+
+    def submit(shard) -> dict:
+
+        s_tree, s_aln, reduction = sharding.shardInput(j_tree, shard, rows, width, data_type)
+
+        request = dict()
+
+        request["Command"] = "Recon"
+        request["Auth"] = auth
+
+        params = dict()
+
+        params["Tree"] = s_tree
+        params["Alignment"] = s_aln
+        params["Inference"] = "Joint"
+        params["Indels"] = indels
+        params["Model"] = model
+
+        request["Params"] = params
+
+        with _selectEndpoint(selected):
+
+            response = _submit(request, reduction)
+
+            # the alignment is not kept while the job is waited on
+            del request, params, s_aln
+
+            response = _collect(response, poll, timeout)
+
+        return response["Result"]
+
+    with instrument.span("shards", count=len(shards)):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(submit, shards))
+
+    return sharding.stitch(j_tree, shards, results)
 
 
 def LearnLatentDistributions(nwk: str,
@@ -231,6 +585,10 @@ def LearnLatentDistributions(nwk: str,
         str: {"Message":"Queued","Job":<job-number>}
     """
 
+    from . import parsers
+
+    _checkInputs(nwk=nwk)
+
     request = dict()
 
     request["Command"] = "Train"
@@ -241,14 +599,11 @@ def LearnLatentDistributions(nwk: str,
     params["States"] = states
 
     # format tree
-    with open(nwk, 'r') as f:
-        tree = ""
-        for line in f:
-            tree += line.strip()
+    tree = inputs.readNwkFile(nwk)
 
     params["Tree"] = parsers.nwkToJSON(tree)
 
-    params["Dataset"] = parsers.csvDataToJSON(csv_data)
+    params["Dataset"] = parsers.csvDataToJSON(csv_data, as_array=True)
 
     # load all parameters
     request["Params"] = params
@@ -286,6 +641,10 @@ def MarginaliseDistOnAncestor(nwk: str,
         str: {"Message":"Queued","Job":<job-number>}
     """
 
+    from . import parsers
+
+    _checkInputs(nwk=nwk)
+
     request = dict()
 
     request["Command"] = "Infer"
@@ -300,15 +659,127 @@ def MarginaliseDistOnAncestor(nwk: str,
     params["Distrib"] = distrib
 
     # format tree
-    with open(nwk, 'r') as f:
-        tree = ""
-        for line in f:
-            tree += line.strip()
+    tree = inputs.readNwkFile(nwk)
 
     params["Tree"] = parsers.nwkToJSON(tree)
 
-    params["Dataset"] = parsers.csvDataToJSON(csv_data)
+    params["Dataset"] = parsers.csvDataToJSON(csv_data, as_array=True)
 
     request["Params"] = params
 
     return send_and_recieve(request)
+
+
+def _cladeAncestors(j_tree: dict, clade) -> list[int]:
+    '''Numbers of the ancestors in a clade, given as the ID of its root
+    or a list of IDs whose MRCA is the root. None selects the whole tree'''
+
+    from . import tree_index
+
+    index = tree_index.indexFromJSON(j_tree)
+
+    if clade is None:
+        root = index.root
+    elif isinstance(clade, (str, int)):
+        root = clade
+    else:
+        root = index.mrca(clade)
+
+    nodes = index.cladeNodes(root)
+
+    return [int(label[1:]) for label in index.labelsOf(nodes[~index.isLeaf[nodes]])]
+
+
+def MarginaliseDistOnAncestors(nwk: str,
+                               states: list[str],
+                               csv_data: str,
+                               distrib: dict,
+                               ancestors: Optional[list[int]] = None,
+                               clade=None,
+                               leaves_only: bool = True,
+                               auth: str = "Guest",
+                               max_workers: int = 4,
+                               wait: bool = False,
+                               poll: float = 5.0,
+                               timeout: Optional[float] = None) -> "pd.DataFrame":
+    """Marginalises on many ancestral nodes, see 
+    MarginaliseDistOnAncestor(). The tree, dataset and distribution
+    are read and encoded once and the same bytes are reused for the
+    request of every ancestor. Requests are submitted concurrently.
+
+    Parameters:
+        nwk(str) = path to file name of nwk 
+        states(list) = a list of names for states
+        csv_data(str) = path to csv with data
+        distrib(dict) = a previously trained distribution from data 
+        ancestors(list) = numbers of the ancestors to marginalise on
+        clade(str or list) = instead of ancestors, every ancestor in the
+                             clade rooted at this ID (e.g. "N3") or at 
+                             the MRCA of a list of IDs. If neither is 
+                             given every ancestor is used.
+        leaves_only(bool) = ...
+        auth(str) = Authentication token, defaults to Guest
+        max_workers(int) = number of requests sent at once
+        wait(bool) = wait for each job and collect its output
+        poll(float) = seconds between checks on a waiting job
+        timeout(float) = seconds to wait for each job, no limit if None
+
+    Returns:
+        pd.DataFrame: the response for each ancestor, indexed by 
+        ancestor, with a "Result" column once outputs are collected
+    """
+
+    import concurrent.futures
+    import pandas as pd
+    from . import parsers
+
+    _checkInputs(nwk=nwk)
+
+    # format tree
+    tree = inputs.readNwkFile(nwk)
+
+    j_tree = parsers.nwkToJSON(tree)
+
+    if ancestors is None:
+        ancestors = _cladeAncestors(j_tree, clade)
+
+    params = dict()
+
+    params["States"] = states
+    params["Inference"] = "Marginal"
+    params["Leaves-only"] = leaves_only
+    params["Distrib"] = distrib
+    params["Tree"] = j_tree
+    params["Dataset"] = parsers.csvDataToJSON(csv_data, as_array=True)
+
+    request = dict()
+
+    request["Command"] = "Infer"
+    request["Auth"] = auth
+
+    # everything but the ancestor is encoded once, the params object is
+    # reopened to put the ancestor first
+    head = ''.join(streaming.iterEncode(request))[:-1].encode() + b', "Params": {"Ancestor": '
+    shared = b', ' + b''.join(s.encode() for s in streaming.iterEncode(params))[1:] + b'}\n'
+
+    # worker threads do not see the endpoint selected by this thread
+    selected = client.currentEndpoint()
+
+    def submit(ancestor: int) -> dict:
+
+        with _selectEndpoint(selected):
+
+            message = head + str(int(ancestor)).encode() + shared
+            response = codec.loads(dispatch(request, message))
+
+            if wait:
+                response = _collect(response, poll, timeout)
+
+        return response
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        responses = list(pool.map(submit, ancestors))
+
+    table = pd.DataFrame.from_records(responses, index=pd.Index(ancestors, name="Ancestor"))
+
+    return table
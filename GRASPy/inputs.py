@@ -0,0 +1,150 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: One place to open input files (alignments, nwk trees, trait data and
+# saved outputs). Files compressed with gzip, bz2, xz or zstd are recognised
+# by their first bytes rather than their extension and are decompressed as
+# they are read, so a decompressed copy is never written to disk.
+###############################################################################
+
+import bz2
+import gzip
+import io
+import lzma
+from typing import Optional
+
+# bytes read from the file at a time
+BUFFER_SIZE = 1 << 20
+
+# leading bytes of each compressed format
+MAGIC = {
+    "gzip": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+
+def detectCompression(file_name: str) -> Optional[str]:
+    """Checks the first bytes of a file for a known compression format.
+
+    Parameters:
+        file_name(str): path to the file
+
+    Returns:
+        str: "gzip", "bz2", "xz" or "zstd", None for an uncompressed file
+    """
+
+    with open(file_name, 'rb') as f:
+        head = f.read(max(len(m) for m in MAGIC.values()))
+
+    for name, magic in MAGIC.items():
+        if head.startswith(magic):
+            return name
+
+    return None
+
+
+def _zstdReader(raw):
+    '''Decompressing reader for zstd, from zstandard if it is installed'''
+
+    try:
+        import zstandard
+    except ImportError:
+        try:
+            from compression import zstd
+        except ImportError:
+            raise RuntimeError("Reading zstd files needs the zstandard package") from None
+
+        return zstd.ZstdFile(raw)
+
+    return zstandard.ZstdDecompressor().stream_reader(raw, read_size=BUFFER_SIZE)
+
+
+def openInput(file_name: str, mode: str = 'r', encoding: Optional[str] = None):
+    """Opens a file for reading, decompressing it on the fly if needed.
+
+    Parameters:
+        file_name(str): path to the file
+
+        mode(str): 'r' (or 'rt') for text, 'rb' for bytes
+
+        encoding(str): text encoding, defaults to the platform default
+
+    Returns:
+        a file object that can be used in a with statement
+    """
+
+    if mode not in ('r', 'rt', 'rb'):
+        raise RuntimeError(f"Inputs can only be opened for reading, not with mode {mode}")
+
+    kind = detectCompression(file_name)
+
+    # plain files keep the default buffering, a large buffer only pays
+    # for itself in front of a decompressor
+    if kind is None:
+        return open(file_name, 'rb' if mode == 'rb' else 'r', encoding=encoding)
+
+    f = open(file_name, 'rb', buffering=BUFFER_SIZE)
+
+    if kind == "gzip":
+        stream = gzip.GzipFile(fileobj=f)
+    elif kind == "bz2":
+        stream = bz2.BZ2File(f)
+    elif kind == "xz":
+        stream = lzma.LZMAFile(f)
+    else:
+        stream = _zstdReader(f)
+
+    raw = io.BufferedReader(_Closing(stream, f), buffer_size=BUFFER_SIZE)
+
+    if mode == 'rb':
+        return raw
+
+    return io.TextIOWrapper(raw, encoding=encoding)
+
+
+class _Closing(io.RawIOBase):
+    '''Reads from a decompressing stream and closes the compressed file
+    underneath it as well'''
+
+    def __init__(self, stream, file) -> None:
+
+        self.stream = stream
+        self.file = file
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+
+        if hasattr(self.stream, "readinto"):
+            return self.stream.readinto(buffer)
+
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+
+        return len(data)
+
+    def close(self) -> None:
+
+        if not self.closed:
+            self.stream.close()
+            self.file.close()
+
+        super().close()
+
+
+def readNwkFile(file_name: str) -> str:
+    """Reads a nwk file into a single string with line breaks and
+    surrounding whitespace removed.
+
+    Parameters:
+        file_name(str): path to the nwk file, optionally compressed
+
+    Returns:
+        str: the nwk string
+    """
+
+    with openInput(file_name) as f:
+        return ''.join(line.strip() for line in f)
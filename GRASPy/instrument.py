@@ -0,0 +1,289 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Lightweight instrumentation of the request pipeline. Named timing
+# spans and counters (bytes sent, chunks, graphs built, ...) are passed to
+# pluggable sinks that log them, keep them in memory or write them as JSON
+# lines. Peak memory of each span can also be captured with tracemalloc.
+# While disabled every hook returns straight away.
+###############################################################################
+
+import functools
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_enabled = False
+_memory = False
+_sinks = []
+
+# tracemalloc was started by enable(), so disable() stops it
+_tracing = False
+
+# open spans of each thread, innermost last
+_local = threading.local()
+
+
+class LogSink(object):
+    """Writes each record to a logger"""
+
+    def __init__(self, log: Optional[logging.Logger] = None,
+                 level: int = logging.INFO) -> None:
+        """Constructs instance of LogSink.
+
+        Parameters:
+            log(Logger): defaults to the GRASPy.instrument logger
+
+            level(int): logging level of the records
+        """
+
+        self.log = logger if log is None else log
+        self.level = level
+
+    def emit(self, record: dict) -> None:
+        self.log.log(self.level, "%s", record)
+
+
+class MemorySink(object):
+    """Keeps every record in a list"""
+
+    def __init__(self) -> None:
+        """Constructs instance of MemorySink."""
+
+        self.records = []
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def spans(self, name: Optional[str] = None) -> list[dict]:
+        """Span records, only those called name if given"""
+
+        return [r for r in self.records if r["type"] == "span"
+                and (name is None or r["name"] == name)]
+
+
+class JsonLinesSink(object):
+    """Appends each record to a file as one line of JSON"""
+
+    def __init__(self, file_name: str) -> None:
+        """Constructs instance of JsonLinesSink.
+
+        Parameters:
+            file_name(str): file the records are appended to
+        """
+
+        self.file_name = file_name
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict) -> None:
+
+        line = json.dumps(record, default=str) + '\n'
+
+        with self._lock:
+            with open(self.file_name, 'a') as f:
+                f.write(line)
+
+
+def enable(*sinks, memory: bool = False) -> None:
+    """Turns instrumentation on.
+
+    Parameters:
+        sinks: objects with an emit(record) method, defaults to a
+        LogSink
+
+        memory(bool): also record the peak memory of each span with
+        tracemalloc, which slows everything down while it traces
+    """
+
+    global _enabled, _memory, _sinks, _tracing
+
+    _sinks = list(sinks) if sinks else [LogSink()]
+    _memory = memory
+
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _tracing = True
+
+    _enabled = True
+
+
+def disable() -> None:
+    """Turns instrumentation off and removes the sinks. tracemalloc
+    is only stopped if enable() started it."""
+
+    global _enabled, _memory, _sinks, _tracing
+
+    if _tracing and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+    _tracing = False
+
+    _enabled = False
+    _memory = False
+    _sinks = []
+
+
+def enabled() -> bool:
+    """True while instrumentation is on"""
+
+    return _enabled
+
+
+def _stack() -> list:
+    '''The open spans of the current thread'''
+
+    stack = getattr(_local, "stack", None)
+
+    if stack is None:
+        stack = _local.stack = []
+
+    return stack
+
+
+def _emit(record: dict) -> None:
+    '''Passes a record to every sink'''
+
+    for sink in _sinks:
+        sink.emit(record)
+
+
+class _Span(object):
+    '''A running span, see span()'''
+
+    __slots__ = ("name", "tags", "counters", "start", "mem_start", "peak")
+
+    def __init__(self, name: str, tags: dict) -> None:
+
+        self.name = name
+        self.tags = tags
+        self.counters = {}
+
+    def __enter__(self) -> "_Span":
+
+        stack = _stack()
+
+        if _memory:
+
+            # the peak so far belongs to the spans that are already open
+            current, peak = tracemalloc.get_traced_memory()
+            for s in stack:
+                s.peak = max(s.peak, peak)
+
+            tracemalloc.reset_peak()
+            self.mem_start = current
+            self.peak = current
+
+        stack.append(self)
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exc) -> None:
+
+        seconds = time.perf_counter() - self.start
+
+        stack = _stack()
+        stack.pop()
+
+        record = {"type": "span", "name": self.name, "seconds": seconds,
+                  "depth": len(stack)}
+
+        if _memory:
+
+            peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            for s in stack:
+                s.peak = max(s.peak, peak)
+
+            record["peak_bytes"] = peak - self.mem_start
+
+        if self.counters:
+            record["counters"] = self.counters
+
+        record.update(self.tags)
+
+        _emit(record)
+
+
+class _NullSpan(object):
+    '''Stands in for a span while instrumentation is off'''
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, **tags):
+    """Times a stage of the pipeline as a context manager, e.g.
+
+        with instrument.span("decode", command="Recon"):
+            ...
+
+    The record passed to the sinks has the span name, seconds taken,
+    nesting depth, any counters updated inside it and the tags.
+
+    Parameters:
+        name(str): name of the stage
+
+        tags: extra values added to the record
+    """
+
+    if not _enabled:
+        return _NULL_SPAN
+
+    return _Span(name, tags)
+
+
+def timed(name: str):
+    """Decorator that wraps every call of a function in a span"""
+
+    def decorator(func):
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, value: int = 1) -> None:
+    """Adds value to a counter of every open span in this thread.
+    Counters updated outside any span are emitted as their own record.
+
+    Parameters:
+        name(str): e.g. "bytes_sent"
+
+        value(int): amount to add
+    """
+
+    if not _enabled:
+        return
+
+    stack = _stack()
+
+    if not stack:
+        _emit({"type": "counter", "name": name, "value": value})
+        return
+
+    for s in stack:
+        s.counters[name] = s.counters.get(name, 0) + value
@@ -0,0 +1,203 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Reports the substitutions, insertions and deletions that occur along
+# every branch of a POGTree. The sequences of all branchpoints are compared
+# in bulk using the encoded branchpoint x column matrix and the parents array
+# rather than diffing BranchPoint.seq one branch at a time.
+###############################################################################
+
+import numpy as np
+from numpy.typing import NDArray
+from typing import Optional, TYPE_CHECKING
+from . import encoding
+
+# pandas is only loaded when a report is turned into a table
+if TYPE_CHECKING:
+    import pandas as pd
+
+# one row per mutation, branch is the index of the child branchpoint
+MUTATION_DTYPE = np.dtype([('branch', np.int32), ('column', np.int32),
+                           ('from', 'S1'), ('to', 'S1')])
+
+# number of branches compared at once, bounds the temporary memory
+BLOCK_SIZE = 4096
+
+
+class MutationReport(object):
+    """Holds all mutations along the branches of a tree. Each type of
+    mutation is stored as a structured array with the fields
+    (branch, column, from, to) where branch is the index of the child
+    branchpoint of that branch.
+    """
+
+    def __init__(self, substitutions: NDArray, insertions: NDArray,
+                 deletions: NDArray, labels: list[str],
+                 parents: NDArray) -> None:
+        """Constructs instance of a MutationReport.
+
+        Parameters:
+            substitutions(np.array): residue changed along the branch
+
+            insertions(np.array): gap in the parent, residue in the child
+
+            deletions(np.array): residue in the parent, gap in the child
+
+            labels(list[str]): maps tree indices to branchpoint IDs
+
+            parents(np.array): maps the index of the child to the index
+            of the parent
+        """
+
+        self.substitutions = substitutions
+        self.insertions = insertions
+        self.deletions = deletions
+        self.labels = labels
+        self.parents = parents
+
+    def __str__(self) -> str:
+        return (f"Substitutions: {len(self.substitutions)}\nInsertions: {len(self.insertions)}\nDeletions: {len(self.deletions)}")
+
+    def counts(self) -> "pd.DataFrame":
+        """Number of each type of mutation per branch, indexed by the
+        ID of the child branchpoint.
+        """
+
+        import pandas as pd
+
+        n = len(self.labels)
+
+        table = pd.DataFrame({
+            "Substitutions": np.bincount(self.substitutions['branch'], minlength=n),
+            "Insertions": np.bincount(self.insertions['branch'], minlength=n),
+            "Deletions": np.bincount(self.deletions['branch'], minlength=n)},
+            index=pd.Index(self.labels, name="Child"))
+
+        # the root has no branch above it
+        return table[self.parents >= 0]
+
+    def toDataFrame(self) -> "pd.DataFrame":
+        """Converts the report into a single table with one row per
+        mutation and the IDs of the parent and child of each branch.
+        """
+
+        import pandas as pd
+
+        labels = np.array(self.labels, dtype=object)
+
+        frames = []
+
+        for kind, muts in (("Substitution", self.substitutions),
+                           ("Insertion", self.insertions),
+                           ("Deletion", self.deletions)):
+
+            frames.append(pd.DataFrame({
+                "Parent": labels[self.parents[muts['branch']]],
+                "Child": labels[muts['branch']],
+                "Column": muts['column'],
+                "From": muts['from'].astype('U1'),
+                "To": muts['to'].astype('U1'),
+                "Type": kind}))
+
+        return pd.concat(frames, ignore_index=True)
+
+
+def _toRecords(branches: NDArray, rows: NDArray, cols: NDArray,
+               parent_vals: NDArray, child_vals: NDArray,
+               col_offset: int) -> NDArray:
+    '''Packs the positions of a mutation mask into a structured array'''
+
+    records = np.empty(len(rows), dtype=MUTATION_DTYPE)
+    records['branch'] = branches[rows]
+    records['column'] = cols + col_offset
+    records['from'] = parent_vals.view('S1')
+    records['to'] = child_vals.view('S1')
+
+    return records
+
+
+def branchMutations(tree, clade: Optional[str] = None,
+                    columns: Optional[tuple[int, int]] = None,
+                    matrix: Optional[tuple[NDArray, NDArray]] = None) -> MutationReport:
+    """Finds every substitution, insertion and deletion along every
+    branch of the tree where both the parent and the child have
+    a POGraph.
+
+    Parameters:
+        tree(POGTree): tree annotated with POGraphs
+
+        clade(str): only report branches below this branchpoint
+
+        columns(tuple): only report alignment columns in [start, end)
+
+        matrix(tuple): output of encoding.encodeTree() if it has
+        already been computed for this tree
+
+    Returns:
+        MutationReport
+    """
+
+    if matrix is None:
+        matrix = encoding.encodeTree(tree)
+
+    encoded, has_graph = matrix
+
+    parents = np.asarray(tree.parents, dtype=np.int64)
+
+    # a branch is identified by its child, the root has no branch
+    is_branch = parents >= 0
+    is_branch[is_branch] &= has_graph[parents[is_branch]]
+    is_branch &= has_graph
+
+    if clade is not None:
+
+        if clade not in tree.indices:
+            raise RuntimeError(f"{clade} is not a branchpoint in the tree")
+
+        in_clade = np.zeros(tree.nBranches, dtype=bool)
+        in_clade[tree.treeIndex().cladeNodes(clade)] = True
+        in_clade[tree.indices[clade]] = False
+
+        is_branch &= in_clade
+
+    start, end = 0, encoded.shape[1]
+
+    if columns is not None:
+        start = max(columns[0], 0)
+        end = min(columns[1], encoded.shape[1])
+
+    branches = np.flatnonzero(is_branch)
+
+    subs, ins, dels = [], [], []
+
+    for b in range(0, len(branches), BLOCK_SIZE):
+
+        block = branches[b: b + BLOCK_SIZE]
+
+        child = encoded[block, start:end]
+        parent = encoded[parents[block], start:end]
+
+        p_gap = parent == encoding.GAP
+        c_gap = child == encoding.GAP
+
+        for store, mask in ((subs, (parent != child) & ~p_gap & ~c_gap),
+                            (ins, p_gap & ~c_gap),
+                            (dels, ~p_gap & c_gap)):
+
+            rows, cols = np.nonzero(mask)
+
+            store.append(_toRecords(block, rows, cols, parent[rows, cols],
+                                    child[rows, cols], start))
+
+    def join(store):
+        if len(store) == 0:
+            return np.empty(0, dtype=MUTATION_DTYPE)
+        return np.concatenate(store)
+
+    labels = [None] * tree.nBranches
+
+    for name, idx in tree.indices.items():
+        labels[idx] = name
+
+    return MutationReport(substitutions=join(subs), insertions=join(ins),
+                          deletions=join(dels), labels=labels, parents=parents)
@@ -6,12 +6,19 @@
 # and also any string formating functions.
 ###############################################################################
 
+import itertools
+import json
 from typing import Tuple, Union, Optional
 from . import pog_tree
 from . import pog_graph
 import numpy as np
-import pandas as pd
+from . import inputs
+from . import instrument
 from . import sequence
+from .codec import arrayToJSON, iterArrayJSON, jsonDefault
+
+# number of csv rows parsed at a time by readCsvData()
+CSV_CHUNK_SIZE = 100000
 
 
 def find_p(s: str) -> Tuple[int, int]:
@@ -157,6 +164,7 @@ def nwk_split(n: str, data=None) -> dict:
     return data
 
 
+@instrument.timed("nwkToJSON")
 def nwkToJSON(nwk: str) -> dict:
     """Parses a nwk string into a JSON format.
     This method assumes that a tree either has no names for internal
@@ -227,7 +235,22 @@ def nwkToJSON(nwk: str) -> dict:
     return json_idx
 
 
-def alnToJSON(file_name: str, data_type: Optional[str] = None) -> dict:
+def seqToJSON(seq: sequence.Sequence) -> dict:
+    '''JSON form of one aligned sequence, gaps become null'''
+
+    tmp = {}
+
+    tmp["Name"] = seq.name
+
+    # remove any gap characters
+    tmp["Seq"] = [None if s == "-" else s for s in seq.sequence]
+
+    return tmp
+
+
+@instrument.timed("alnToJSON")
+def alnToJSON(file_name: str, data_type: Optional[str] = None,
+              lazy: bool = False) -> dict:
     """
     Creates a dictionary where seq ids are the key
     and alignment is the value.
@@ -236,33 +259,29 @@ def alnToJSON(file_name: str, data_type: Optional[str] = None) -> dict:
         file_name(str): path to aln file
         data_type(str): user must specify what alignment letters are
         e.g DNA or Protein otherwise it will guess
+        lazy(bool): "Sequences" is a generator that reads the file
+        one sequence at a time, for use with streaming.iterRequest()
 
     Returns:
         list: alignment seqs in JSON format
 
     """
 
-    sequences = sequence.readFastaFile(file_name)
-
-    j_seqs = []
-
-    for seq in sequences:
+    sequences = sequence.iterFastaFile(file_name)
 
-        tmp = {}
+    # will guess based on the first sequence what the alphabet is
+    first = next(sequences, None)
 
-        tmp["Name"] = seq.name
+    if first is None:
+        raise RuntimeError(f"{file_name} has no sequences")
 
-        # remove any gap characters
-        tmp["Seq"] = [None if s == "-" else s for s in seq.sequence]
+    if data_type is None:
+        data_type = first.alphabet.name
 
-        j_seqs.append(tmp)
+    j_seqs = (seqToJSON(seq) for seq in itertools.chain([first], sequences))
 
     alignments = dict()
-    alignments["Sequences"] = j_seqs
-
-    # will guess based on sequence what the alphabet is
-    if data_type is None:
-        data_type = sequences[0].alphabet.name
+    alignments["Sequences"] = j_seqs if lazy else list(j_seqs)
 
     alignments["Datatype"] = {"Predef": data_type}
 
@@ -451,12 +470,16 @@ def POGraphFromJSON(jpog: dict, isAncestor: bool = False) -> pog_graph.POGraph:
     if name.isdigit():
         name = "N" + name
 
+    instrument.count("graphs_built")
+    instrument.count("nodes_built", len(nodes))
+
     return pog_graph.POGraph(version=jpog["GRASP_version"], indices=indices,
                              start=jpog["Starts"], end=jpog["Ends"], size=jpog["Size"],
                              terminated=jpog["Terminated"], directed=jpog["Directed"],
                              name=name, isAncestor=isAncestor, nodes=nodes)
 
 
+@instrument.timed("POGTreeFromJointReconstruction")
 def POGTreeFromJointReconstruction(nwk: Union[str, dict], POG_graphs: dict) -> pog_tree.POGTree:
     """Creates an instance of the POGTree data structure. A nwk
     file OR output from g_requests.requestPOGTree() can be used
@@ -480,12 +503,7 @@ def POGTreeFromJointReconstruction(nwk: Union[str, dict], POG_graphs: dict) -> p
     # case for using a nwk file for IdxTree
     if isinstance(nwk, str):
 
-        with open(nwk, 'r') as f:
-            tree_parts = ""
-            for line in f:
-                tree_parts += line.strip()
-
-            j_tree = nwkToJSON(tree_parts)
+        j_tree = nwkToJSON(inputs.readNwkFile(nwk))
 
         tree = TreeFromJSON(j_tree)
 
@@ -512,6 +530,17 @@ def POGTreeFromJointReconstruction(nwk: Union[str, dict], POG_graphs: dict) -> p
 
         graphs[g.name] = g
 
+    # extants that were sent once for a clade of identical sequences
+    # share the graph of the one that was sent
+    duplicates = dict(POG_graphs["Result"].get("Duplicates", {}))
+
+    if isinstance(nwk, dict):
+        duplicates.update(nwk["Result"].get("Duplicates", {}))
+
+    for name, sent in duplicates.items():
+        if sent in graphs:
+            graphs[name] = graphs[sent]
+
     return pog_tree.POGTree(nBranches=tree['nBranches'],
                             branchpoints=tree['branchpoints'],
                             parents=tree['parents'],
@@ -521,7 +550,64 @@ def POGTreeFromJointReconstruction(nwk: Union[str, dict], POG_graphs: dict) -> p
                             POGraphs=graphs)
 
 
-def csvDataToJSON(file_name: str) -> dict[str, list]:
+def readCsvData(file_name: str,
+                chunk_size: int = CSV_CHUNK_SIZE) -> Tuple[list, np.ndarray]:
+    """Reads a trait datafile a chunk of rows at a time. The observations
+    in each "Data" cell are split on whitespace for the whole chunk at
+    once and stored in a float64 matrix.
+
+    Parameters:
+        file_name(str): path to csv with "Headers" & "Data" columns
+
+        chunk_size(int): number of rows parsed together
+
+    Returns:
+        list: the headers, None where missing
+
+        np.array: one row per header, padded with NaN up to the largest
+        number of observations
+    """
+
+    import pandas as pd
+
+    headers = []
+    blocks = []
+
+    # compressed files are decompressed as pandas reads them
+    with inputs.openInput(file_name) as f:
+
+        for chunk in pd.read_csv(f, chunksize=chunk_size, dtype=str,
+                                 usecols=["Headers", "Data"]):
+
+            headers.extend(None if pd.isna(h) else h for h in chunk["Headers"])
+
+            obs = chunk["Data"].str.split(expand=True)
+            blocks.append(obs.to_numpy(dtype=np.float64, na_value=np.nan))
+
+    # types are inferred over the whole column, as pd.read_csv() would,
+    # rather than per chunk so e.g. numeric headers come back as numbers
+    try:
+        headers = pd.to_numeric(pd.Series(headers, dtype=object)).tolist()
+        headers = [None if pd.isna(h) else h for h in headers]
+    except (ValueError, TypeError):
+        pass
+
+    # a header without observations still holds one null
+    width = max([b.shape[1] for b in blocks] + [1])
+
+    data = np.full((len(headers), width), np.nan)
+
+    row = 0
+    for b in blocks:
+        data[row: row + len(b), :b.shape[1]] = b
+        row += len(b)
+
+    return headers, data
+
+
+@instrument.timed("csvDataToJSON")
+def csvDataToJSON(file_name: str, as_array: bool = False,
+                  chunk_size: int = CSV_CHUNK_SIZE) -> dict:
     """Reads in datafile and formats in the correct format for use
     in LearnLatentDistributions and MarginaliseDistOnAncestor.
 
@@ -537,30 +623,28 @@ def csvDataToJSON(file_name: str) -> dict[str, list]:
     If there are multiple observations for an annotation,
     separate the observations with whitespace within a cell
     e.g. "7.0 3.3"
-    """
 
-    # None get converted to null for JSON
-    raw = pd.read_csv(file_name).replace(pd.NA, None)
+    Parameters:
+        file_name(str): path to csv with data
 
-    j_data = dict()
+        as_array(bool): keep "Data" as a float64 matrix with NaN for
+        missing observations, which become null when the request is
+        serialised with jsonDefault()
 
-    # Headers represent names of sequences
-    j_data["Headers"] = raw["Headers"].tolist()
+        chunk_size(int): number of rows parsed together
 
-    # place observations within lists and convert multiple
-    # observations into floats
-    formatted = [[float(obs) for obs in annot.split()] if isinstance(annot, str)
-                 else [annot] for annot in raw["Data"]]
+    Returns:
+        dict: "Headers" and "Data" in JSON format
+    """
+
+    headers, data = readCsvData(file_name, chunk_size)
 
-    # find the largest list which represents the max number of datapoints
-    max_len = len(max(formatted, key=lambda x: len(x)))
+    j_data = dict()
 
-    # add null values to ensure that there is uniform length
-    for obs in formatted:
-        if len(obs) < max_len:
-            while len(obs) < max_len:
-                obs.append(None)
+    # Headers represent names of sequences
+    j_data["Headers"] = headers
 
-    j_data["Data"] = formatted
+    # None get converted to null for JSON
+    j_data["Data"] = data if as_array else arrayToJSON(data)
 
     return j_data
@@ -0,0 +1,255 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: A local Fitch parsimony reconstruction that can be used to preview
+# ancestors before submitting a joint reconstruction to the server. Every
+# column of the alignment is reconstructed at once by storing the set of
+# possible states at each branchpoint as a bitmask, with one pass up the tree
+# and one pass back down.
+###############################################################################
+
+import numpy as np
+from numpy.typing import NDArray
+from typing import Optional
+from . import encoding
+from . import inputs
+from . import parsers
+from . import pog_tree
+from . import seq_sym
+from . import sequence
+from . import tree_index
+
+FITCH_VERSION = "GRASPy-Fitch"
+
+
+def stateLookup(alphabet: seq_sym.Alphabet) -> tuple[NDArray[np.int64], NDArray[np.uint8]]:
+    """Assigns each symbol of the alphabet a state, with the gap as the
+    last state so that residues are preferred when a set is ambiguous.
+
+    Parameters:
+        alphabet(Alphabet): alphabet used for the alignment
+
+    Returns:
+        np.array: maps every byte to its state, -1 for bytes that are
+        not in the alphabet. Lower case letters share the state of
+        their upper case symbol.
+
+        np.array: byte code of the symbol of each state
+    """
+
+    symbols = [sym for sym in alphabet.symbols if sym != '-']
+
+    if '-' in alphabet.symbols:
+        symbols.append('-')
+
+    lookup = np.full(256, -1, dtype=np.int64)
+
+    for i, sym in enumerate(symbols):
+        lookup[ord(sym)] = i
+        lookup[ord(sym.lower())] = i
+
+    return lookup, encoding.encodeSequence(''.join(symbols))
+
+
+def fitchStateSets(index: tree_index.TreeIndex, leaf_sets: NDArray) -> NDArray:
+    """Postorder pass of the Fitch algorithm. The set of each ancestor is
+    the intersection of the sets of its children or, when they share no
+    state, their union. Polytomies use the intersection of all children
+    which is an approximation of the optimal (Hartigan) sets.
+
+    Parameters:
+        index(TreeIndex): topology of the tree
+
+        leaf_sets(np.array): branchpoint x column bitmasks with the
+        states of each extant, other rows are ignored
+
+    Returns:
+        np.array: branchpoint x column bitmasks of possible states
+    """
+
+    sets = leaf_sets.copy()
+    full = np.iinfo(sets.dtype).max
+
+    # children of every parent are all on the level below it
+    for nodes in index.levels(reverse=True):
+
+        nodes = nodes[nodes != index.root]
+
+        if len(nodes) == 0:
+            continue
+
+        targets, slot = np.unique(index.parents[nodes], return_inverse=True)
+
+        inter = np.full((len(targets),) + sets.shape[1:], full, dtype=sets.dtype)
+        union = np.zeros_like(inter)
+
+        np.bitwise_and.at(inter, slot, sets[nodes])
+        np.bitwise_or.at(union, slot, sets[nodes])
+
+        sets[targets] = np.where(inter != 0, inter, union)
+
+    return sets
+
+
+def fitchAssign(index: tree_index.TreeIndex, sets: NDArray) -> NDArray:
+    """Preorder pass of the Fitch algorithm. A branchpoint keeps the state
+    of its parent if possible, otherwise it takes its lowest possible state.
+
+    Parameters:
+        index(TreeIndex): topology of the tree
+
+        sets(np.array): output of fitchStateSets()
+
+    Returns:
+        np.array: branchpoint x column bitmask with a single state set
+    """
+
+    def lowest(x):
+        return x & (~x + 1)
+
+    states = np.zeros_like(sets)
+    states[index.root] = lowest(sets[index.root])
+
+    for nodes in index.levels():
+
+        nodes = nodes[nodes != index.root]
+
+        if len(nodes) == 0:
+            continue
+
+        inherited = states[index.parents[nodes]] & sets[nodes]
+
+        states[nodes] = np.where(inherited != 0, inherited, lowest(sets[nodes]))
+
+    return states
+
+
+def linearGraphJSON(name: str, codes: NDArray[np.uint8]) -> dict:
+    """Creates the JSON of an extant style POGraph, where each residue is
+    only joined to the next residue, for a gapped sequence.
+
+    Parameters:
+        name(str): Sequence ID
+
+        codes(np.array): encoded sequence including gaps
+
+    Returns:
+        dict: serialised JSON format of a POG
+    """
+
+    indices = np.flatnonzero(codes != encoding.GAP).tolist()
+    symbols = encoding.decodeSequence(codes[indices])
+
+    return {"Name": name,
+            "Indices": indices,
+            "Adjacent": [[j] for j in indices[1:]] + [[]] if indices else [],
+            "Nodes": [{"Value": s} for s in symbols],
+            "GRASP_version": FITCH_VERSION,
+            "Starts": indices[:1],
+            "Ends": indices[-1:],
+            "Size": len(codes),
+            "Terminated": True,
+            "Directed": True}
+
+
+def FitchReconstruction(aln: str, nwk: str,
+                        alphabet: Optional[str] = None) -> pog_tree.POGTree:
+    """Reconstructs ancestors locally with Fitch parsimony, treating the
+    gap as an extra state. This is much faster than a joint reconstruction
+    and is intended as a preview, the output can be used anywhere a POGTree
+    from POGTreeFromJointReconstruction() is expected but every POGraph
+    is linear.
+
+    Current accepted alphabets: 'DNA', 'RNA', 'Protein'
+
+    Parameters:
+        aln(str) = path to file name of aln
+        nwk(str) = path to file name of nwk
+        alphabet(str) = Sequence type. e.g. DNA or Protein.
+                        If user does not specify, it will guess
+                        based on sequence content.
+
+    Returns:
+        POGTree
+    """
+
+    tree = parsers.TreeFromJSON(parsers.nwkToJSON(inputs.readNwkFile(nwk)))
+
+    seqs = sequence.readFastaFile(aln, gappy=True)
+
+    if len(seqs) == 0:
+        raise RuntimeError(f"No sequences found in {aln}")
+
+    if alphabet is None:
+        alpha = seqs[0].alphabet
+    else:
+        alpha = seq_sym.predefAlphabets[alphabet]
+
+    if len(alpha) > 64:
+        raise RuntimeError(f"Alphabet {alpha.name} has too many symbols")
+
+    aligned = encoding.encodeSequences(seqs)
+    nBranches, width = tree['nBranches'], aligned.shape[1]
+
+    labels = [None] * nBranches
+
+    for name, idx in tree['indices'].items():
+        labels[idx] = name
+
+    index = tree_index.TreeIndex(tree['parents'], labels)
+
+    lookup, symbols = stateLookup(alpha)
+    states = lookup[aligned]
+
+    if (states < 0).any():
+        row, col = np.argwhere(states < 0)[0]
+        raise RuntimeError(
+            f"Invalid symbol: {chr(aligned[row, col])} in sequence {seqs[row].name}")
+
+    dtype = np.uint32 if len(alpha) <= 32 else np.uint64
+
+    leaf_sets = np.zeros((nBranches, width), dtype=dtype)
+
+    for s, row in zip(seqs, states):
+
+        if s.name not in tree['indices']:
+            raise RuntimeError(f"{s.name} is in the alignment but not the tree")
+
+        leaf_sets[tree['indices'][s.name]] = np.left_shift(
+            np.ones(width, dtype=dtype), row.astype(dtype))
+
+    missing = [labels[i] for i in index.leaves if not leaf_sets[i].any()]
+
+    if missing:
+        raise RuntimeError(f"Extants missing from the alignment: {missing}")
+
+    assigned = fitchAssign(index, fitchStateSets(index, leaf_sets))
+
+    # single bit masks back to positions in the alphabet
+    positions = np.log2(assigned.astype(np.float64)).astype(np.int64)
+
+    encoded = symbols[positions]
+
+    # extants keep their own symbols e.g. lower case letters
+    for s, row in zip(seqs, aligned):
+        encoded[tree['indices'][s.name]] = row
+
+    graphs = {}
+
+    for i, name in enumerate(labels):
+        graphs[name] = parsers.POGraphFromJSON(linearGraphJSON(name, encoded[i]),
+                                               isAncestor=False)
+
+    recon = pog_tree.POGTree(nBranches=nBranches,
+                             branchpoints=tree['branchpoints'],
+                             parents=tree['parents'],
+                             children=tree['children'],
+                             indices=tree['indices'],
+                             distances=tree['distances'],
+                             POGraphs=graphs)
+
+    # the encoded matrix is already known, saves rebuilding it from graphs
+    recon._encoded = (encoded, np.ones(nBranches, dtype=bool))
+    recon._index = index
+
+    return recon
@@ -0,0 +1,238 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Tests whether candidate sequences follow a valid path through a
+# POGraph. The POG is compiled once into a deterministic automaton whose
+# states are sets of POG nodes (stored as bitsets while compiling) and whose
+# transitions are labelled by symbols. A batch of encoded candidates is then
+# run through the transition table together, one column at a time, also
+# tracking the weight of the best matching path.
+###############################################################################
+
+import numpy as np
+from numpy.typing import NDArray
+from typing import Union
+from . import encoding
+from . import pog_dag
+from . import pog_graph
+
+# symbol id for padding and gaps, candidates stay in the same state
+SKIP = 0
+
+DEAD = 0
+
+# number of candidates advanced together
+BATCH_SIZE = 1 << 16
+
+
+def _members(bits: int) -> list[int]:
+    '''Positions of the set bits in a Python int, lowest first'''
+
+    out = []
+
+    while bits:
+        low = bits & -bits
+        out.append(low.bit_length() - 1)
+        bits ^= low
+
+    return out
+
+
+class POGAutomaton(object):
+    """A POGraph compiled for batch membership queries. State 0 is the
+    dead state reached by any candidate that leaves the graph.
+    """
+
+    def __init__(self, graph: Union[pog_graph.POGraph, pog_dag.POGDag],
+                 max_states: int = 1000000) -> None:
+        """Compiles a POGraph with the subset construction.
+
+        Parameters:
+            graph(POGraph or POGDag): the POG to compile
+
+            max_states(int): raise an error rather than building more
+            automaton states than this
+        """
+
+        dag = graph if isinstance(graph, pog_dag.POGDag) else pog_dag.POGDag(graph)
+
+        self.name = dag.name
+
+        # symbol ids start at 1, SKIP is reserved for padding and gaps
+        present = np.unique(dag.symbols[1:-1])
+        self.lookup = np.full(256, len(present) + 1, dtype=np.int64)
+        self.lookup[present] = np.arange(1, len(present) + 1)
+        self.lookup[0] = SKIP
+        self.lookup[encoding.GAP] = SKIP
+
+        nSyms = len(present) + 2
+
+        node_sym = self.lookup[dag.symbols]
+
+        # succ[u][s] is a bitset of the successors of u with symbol s
+        succ = [[0] * nSyms for _ in range(dag.nNodes)]
+        edge_w = {}
+        end_w = {}
+
+        for u, v, w in zip(dag.src.tolist(), dag.dst.tolist(), dag.weight.tolist()):
+
+            if v == dag.end:
+                end_w[u] = w
+                continue
+
+            succ[u][node_sym[v]] |= 1 << v
+            edge_w[(u, v)] = w
+
+        states = [0, 1 << dag.start]
+        members = [[], [dag.start]]
+        seen = {0: DEAD, 1 << dag.start: 1}
+        trans = [[DEAD] * nSyms, None]
+
+        # weight matrices are filled once the widest state is known
+        links = [[], None]
+
+        s = 1
+        while s < len(states):
+
+            row = [DEAD] * nSyms
+            row[SKIP] = s
+            link = []
+
+            for sym in range(1, nSyms):
+
+                bits = 0
+                for u in members[s]:
+                    bits |= succ[u][sym]
+
+                if bits not in seen:
+
+                    if len(states) >= max_states:
+                        raise RuntimeError(
+                            f"POGraph {self.name} needs more than {max_states} automaton states")
+
+                    seen[bits] = len(states)
+                    states.append(bits)
+                    members.append(_members(bits))
+                    trans.append(None)
+                    links.append(None)
+
+                row[sym] = seen[bits]
+                link.append((sym, seen[bits]))
+
+            trans[s] = row
+            links[s] = link
+            s += 1
+
+        self.nStates = len(states)
+        self.width = max(len(m) for m in members)
+        self.trans = np.array(trans, dtype=np.int32)
+
+        K = self.width
+
+        # weights[state, sym, i, j] is the weight of moving from the i-th
+        # member of state to the j-th member of the next state
+        self.weights = np.full((self.nStates, nSyms, K, K), -np.inf)
+        self.accept = np.full((self.nStates, K), -np.inf)
+
+        eye = np.full((K, K), -np.inf)
+        np.fill_diagonal(eye, 0.0)
+        self.weights[:, SKIP] = eye
+
+        for s in range(1, self.nStates):
+
+            for i, u in enumerate(members[s]):
+                if u in end_w:
+                    self.accept[s, i] = end_w[u]
+
+            for sym, nxt in links[s]:
+                for j, v in enumerate(members[nxt]):
+                    for i, u in enumerate(members[s]):
+                        if (u, v) in edge_w:
+                            self.weights[s, sym, i, j] = edge_w[(u, v)]
+
+        self.accepting = np.isfinite(self.accept).any(axis=1)
+
+    def __str__(self) -> str:
+        return (f"Sequence ID: {self.name}\nStates: {self.nStates}\nWidest state: {self.width}")
+
+    def run(self, candidates: Union[list, NDArray]) -> tuple[NDArray[np.bool_], NDArray[np.float64]]:
+        """Tests a batch of candidates against the POG.
+
+        Parameters:
+            candidates(list or np.array): strings, Sequence objects or a
+            matrix from encoding.encodePadded(). Gaps and zero padding
+            are skipped.
+
+        Returns:
+            np.array: True for candidates that spell a start to end path
+
+            np.array: weight of the best such path, -inf if rejected
+        """
+
+        if isinstance(candidates, np.ndarray):
+            codes = candidates
+        else:
+            codes, _ = encoding.encodePadded(candidates)
+
+        accepted = np.zeros(len(codes), dtype=bool)
+        score = np.full(len(codes), -np.inf)
+
+        for b in range(0, len(codes), BATCH_SIZE):
+
+            accepted[b: b + BATCH_SIZE], score[b: b + BATCH_SIZE] = \
+                self._runBatch(codes[b: b + BATCH_SIZE])
+
+        return accepted, score
+
+    def _runBatch(self, codes: NDArray[np.uint8]) -> tuple[NDArray[np.bool_], NDArray[np.float64]]:
+        '''Runs one batch of candidates through the transition table'''
+
+        nSyms = self.trans.shape[1]
+        K = self.width
+
+        # one contiguous row per column of the candidates
+        syms = np.ascontiguousarray(self.lookup[codes].T)
+
+        trans = self.trans.ravel()
+        weights = self.weights.reshape(-1, K * K)
+
+        state = np.ones(len(codes), dtype=np.int64)
+        step = np.empty_like(state)
+
+        if K == 1:
+            score = np.zeros(len(codes))
+            weights = weights[:, 0]
+
+            for sym in syms:
+                np.multiply(state, nSyms, out=step)
+                step += sym
+                score += np.take(weights, step)
+                state = np.take(trans, step)
+
+            score += self.accept[state, 0]
+
+        else:
+            # one contiguous row per member of the current state
+            score = np.full((K, len(codes)), -np.inf)
+            score[0] = 0.0
+            weights = np.ascontiguousarray(weights.T)
+
+            for sym in syms:
+                np.multiply(state, nSyms, out=step)
+                step += sym
+                nxt = np.full_like(score, -np.inf)
+
+                # max-plus product, one pair of members at a time
+                for i in range(K):
+                    for j in range(K):
+                        np.maximum(nxt[j], score[i] + np.take(weights[i * K + j], step),
+                                   out=nxt[j])
+
+                score = nxt
+                state = np.take(trans, step)
+
+            score = np.max(score + self.accept[state].T, axis=0)
+
+        accepted = self.accepting[state] & np.isfinite(score)
+
+        return accepted, np.where(accepted, score, -np.inf)
@@ -0,0 +1,245 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Compiles a POGraph into compact edge arrays so that the graph can be
+# treated as a directed acyclic graph (DAG) from a virtual start node to a
+# virtual end node. Dynamic programming over these arrays finds the most
+# supported path, counts the paths and ranks the k best paths, each in a
+# single pass over the nodes in alignment order.
+###############################################################################
+
+import heapq
+import math
+import numpy as np
+from numpy.typing import NDArray
+from . import encoding
+from . import pog_graph
+
+# the value used by makeEdges() to signify the end of a sequence
+END_EDGE = -999
+
+
+class POGDag(object):
+    """A POGraph stored as arrays. Nodes are numbered in alignment order
+    with 0 as the virtual start and nNodes - 1 as the virtual end, so
+    every edge goes from a lower to a higher node number.
+    """
+
+    def __init__(self, graph: pog_graph.POGraph) -> None:
+        """Constructs instance of POGDag.
+
+        Parameters:
+            graph(POGraph): the POG to compile
+        """
+
+        self.name = graph.name
+
+        # alignment index of every real node, in order
+        self.indices = np.sort(np.asarray(graph.indices, dtype=np.int64))
+
+        V = len(self.indices)
+
+        self.nNodes = V + 2
+        self.start = 0
+        self.end = V + 1
+
+        position = {int(idx): p + 1 for p, idx in enumerate(self.indices)}
+
+        symbols = np.zeros(self.nNodes, dtype=np.uint8)
+
+        src, dst, weight = [], [], []
+
+        for node in graph.nodes:
+
+            symbols[position[int(node.name)]] = ord(node.symbol)
+
+            for e in node.edges:
+
+                u = self.start if e.start == -1 else position.get(int(e.start))
+
+                if e.end in position:
+                    v = position[e.end]
+                elif e.end == END_EDGE or e.end >= graph.size:
+                    v = self.end
+                else:
+                    v = None
+
+                # edges to positions that are not in the graph are skipped
+                if u is None or v is None:
+                    continue
+
+                src.append(u)
+                dst.append(v)
+                weight.append(0.0 if e.weight is None else float(e.weight))
+
+        # starts and ends are only implied by edges for ancestors
+        for idx in graph.start:
+            if idx in position:
+                src.append(self.start)
+                dst.append(position[idx])
+                weight.append(0.0)
+
+        for idx in graph.end:
+            if idx in position:
+                src.append(position[idx])
+                dst.append(self.end)
+                weight.append(0.0)
+
+        src = np.array(src, dtype=np.int64)
+        dst = np.array(dst, dtype=np.int64)
+        weight = np.array(weight, dtype=np.float64)
+
+        if (src >= dst).any():
+            raise RuntimeError(f"POGraph {self.name} has an edge against alignment order")
+
+        # keep the best supported copy of any repeated edge
+        order = np.lexsort((-weight, dst, src))
+        src, dst, weight = src[order], dst[order], weight[order]
+
+        keep = np.ones(len(src), dtype=bool)
+        keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+
+        self.src = src[keep]
+        self.dst = dst[keep]
+        self.weight = weight[keep]
+        self.symbols = symbols
+
+        # outgoing edges of node u are out_ptr[u]: out_ptr[u + 1]
+        self.out_ptr = np.searchsorted(self.src, np.arange(self.nNodes + 1))
+
+        # incoming edges of node v are in_order[in_ptr[v]: in_ptr[v + 1]]
+        self.in_order = np.argsort(self.dst, kind='stable')
+        self.in_ptr = np.searchsorted(self.dst[self.in_order],
+                                      np.arange(self.nNodes + 1))
+
+    def __str__(self) -> str:
+        return (f"Sequence ID: {self.name}\nNodes: {self.nNodes - 2}\nEdges: {len(self.src)}")
+
+    def _incoming(self):
+        '''Incoming edges of each node as plain lists for the DP loops'''
+
+        in_ptr = self.in_ptr.tolist()
+        srcs = self.src[self.in_order].tolist()
+        weights = self.weight[self.in_order].tolist()
+
+        for v in range(self.nNodes):
+            yield v, srcs[in_ptr[v]: in_ptr[v + 1]], weights[in_ptr[v]: in_ptr[v + 1]]
+
+    def pathIndices(self, path: list[int]) -> NDArray[np.int64]:
+        """Converts a path of node numbers into alignment indices,
+        leaving out the virtual start and end."""
+
+        path = np.asarray(path, dtype=np.int64)
+
+        return self.indices[path[(path != self.start) & (path != self.end)] - 1]
+
+    def pathSequence(self, path: list[int]) -> str:
+        """The sequence spelt out by a path of node numbers"""
+
+        path = np.asarray(path, dtype=np.int64)
+
+        return encoding.decodeSequence(
+            self.symbols[path[(path != self.start) & (path != self.end)]])
+
+    def maxWeightPath(self) -> tuple[float, list[int]]:
+        """Finds the start to end path with the largest total edge weight.
+        Ties are broken towards the closest predecessor, so the path
+        that skips the fewest positions is preferred.
+
+        Returns:
+            float: total weight of the path
+
+            list[int]: node numbers along the path, including the
+            virtual start and end
+        """
+
+        best = [-math.inf] * self.nNodes
+        back = [-1] * self.nNodes
+        best[self.start] = 0.0
+
+        for v, srcs, weights in self._incoming():
+
+            for u, w in zip(srcs, weights):
+                if best[u] + w >= best[v]:
+                    best[v] = best[u] + w
+                    back[v] = u
+
+        if best[self.end] == -math.inf:
+            raise RuntimeError(f"POGraph {self.name} has no path from start to end")
+
+        path = [self.end]
+        while path[-1] != self.start:
+            path.append(back[path[-1]])
+
+        return best[self.end], path[::-1]
+
+    def countPaths(self, log: bool = False):
+        """Counts the start to end paths without listing them.
+
+        Parameters:
+            log(bool): return the natural log of the count as a float
+            instead of an exact Python integer
+
+        Returns:
+            int or float: number of paths through the graph
+        """
+
+        if log:
+            counts = [-math.inf] * self.nNodes
+            counts[self.start] = 0.0
+
+            for v, srcs, _ in self._incoming():
+                if srcs:
+                    counts[v] = float(np.logaddexp.reduce(
+                        [counts[u] for u in srcs] + [counts[v]]))
+        else:
+            counts = [0] * self.nNodes
+            counts[self.start] = 1
+
+            for v, srcs, _ in self._incoming():
+                for u in srcs:
+                    counts[v] += counts[u]
+
+        return counts[self.end]
+
+    def kBestPaths(self, k: int) -> list[tuple[float, list[int]]]:
+        """Finds the k start to end paths with the largest total weight.
+        Every node keeps at most k partial paths, merged from its
+        incoming edges with a bounded heap.
+
+        Parameters:
+            k(int): number of paths to return
+
+        Returns:
+            list: (weight, node numbers) for each path, best first
+        """
+
+        # each entry is (weight, predecessor, rank of the entry at it)
+        best = [[] for _ in range(self.nNodes)]
+        best[self.start] = [(0.0, -1, -1)]
+
+        for v, srcs, weights in self._incoming():
+
+            if not srcs:
+                continue
+
+            candidates = ((entry[0] + w, u, r) for u, w in zip(srcs, weights)
+                          for r, entry in enumerate(best[u]))
+
+            best[v] = heapq.nlargest(k, candidates, key=lambda c: c[0])
+
+        paths = []
+
+        for rank, (weight, _, _) in enumerate(best[self.end]):
+
+            path = [self.end]
+            node, r = self.end, rank
+
+            while node != self.start:
+                _, node, r = best[node][r]
+                path.append(node)
+
+            paths.append((weight, path[::-1]))
+
+        return paths
+
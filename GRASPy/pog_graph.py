@@ -7,8 +7,10 @@
 # how these SymNodes are connected to one another.
 ###############################################################################
 
-from numpy.typing import NDArray
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from numpy.typing import NDArray
 
 
 class Edge(object):
@@ -80,7 +82,7 @@ class POGraph(object):
     Each sequence position is assigned a SymNode with Edges.
     """
 
-    def __init__(self, version: str, indices: NDArray, nodes: list[SymNode],
+    def __init__(self, version: str, indices: "NDArray", nodes: list[SymNode],
                  start: int, end: int, size: int, terminated: bool,
                  directed: bool, name: str, isAncestor: bool) -> None:
         """Constructs instance of POGraph.
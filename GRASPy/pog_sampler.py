@@ -0,0 +1,227 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Draws random sequences from a POGraph using the edge weights as
+# transition probabilities. The outgoing edges of each node are turned into
+# one cumulative table when the sampler is built, then many walkers are
+# advanced through the graph together, one step at a time.
+###############################################################################
+
+import numpy as np
+from numpy.typing import NDArray
+from typing import Iterator, Optional, Union
+from . import encoding
+from . import pog_dag
+from . import pog_graph
+
+# number of sequences drawn together by iterSamples()
+BATCH_SIZE = 1 << 16
+
+
+class POGSampler(object):
+    """Samples start to end paths through a POGraph. Each step follows an
+    outgoing edge with probability proportional to weight ** (1 / temperature),
+    nodes whose edges all have no weight choose uniformly.
+    """
+
+    def __init__(self, graph: Union[pog_graph.POGraph, pog_dag.POGDag],
+                 temperature: float = 1.0,
+                 min_weight: Optional[float] = None) -> None:
+        """Constructs instance of POGSampler.
+
+        Parameters:
+            graph(POGraph or POGDag): the POG to sample from
+
+            temperature(float): values above 1 flatten and values below 1
+            sharpen the transition probabilities
+
+            min_weight(float): edges with less support are never taken
+            unless they are the only way out of a node
+        """
+
+        if temperature <= 0:
+            raise RuntimeError("Temperature must be positive")
+
+        dag = graph if isinstance(graph, pog_dag.POGDag) else pog_dag.POGDag(graph)
+
+        self.dag = dag
+        self.temperature = temperature
+
+        nodes = np.arange(dag.nNodes)
+        weight = np.clip(dag.weight, 0.0, None)
+
+        if min_weight is not None:
+
+            # keep the best edge of a node if every edge is excluded
+            best = np.full(dag.nNodes, -np.inf)
+            np.maximum.at(best, dag.src, weight)
+
+            keep = (weight >= min_weight) | (weight == best[dag.src])
+            self.src, self.dst, weight = dag.src[keep], dag.dst[keep], weight[keep]
+
+        else:
+            self.src, self.dst = dag.src, dag.dst
+
+        self.out_ptr = np.searchsorted(self.src, np.arange(dag.nNodes + 1))
+
+        degree = np.diff(self.out_ptr)
+
+        dead = (degree == 0) & (nodes != dag.end)
+        if dead[np.isin(nodes, self.dst) | (nodes == dag.start)].any():
+            raise RuntimeError(f"POGraph {dag.name} has nodes with no way to the end")
+
+        prob = weight ** (1.0 / temperature)
+
+        # nodes without any support fall back to a uniform choice
+        total = np.zeros(dag.nNodes)
+        np.add.at(total, self.src, prob)
+
+        flat = total[self.src] == 0
+        prob[flat] = 1.0
+        total = np.zeros(dag.nNodes)
+        np.add.at(total, self.src, prob)
+
+        prob /= total[self.src]
+
+        # cumulative probability within each node, offset by the node
+        # number so that one sorted table covers every node
+        within = np.cumsum(prob) - np.repeat(
+            np.concatenate(([0.0], np.cumsum(prob)))[self.out_ptr[:-1]], degree)
+
+        self.table = self.src + within
+        self.table[self.out_ptr[1:][degree > 0] - 1] = nodes[degree > 0] + 1.0
+
+        self.prob = prob
+
+        # the only successor of single edge nodes, -1 where a draw is needed
+        self.forward = np.full(dag.nNodes, -1, dtype=np.int64)
+        single = degree == 1
+        self.forward[single] = self.dst[self.out_ptr[:-1][single]]
+        self.forward[dag.end] = dag.end
+
+    def __str__(self) -> str:
+        return (f"Sequence ID: {self.dag.name}\nEdges: {len(self.src)}\nTemperature: {self.temperature}")
+
+    def sample(self, n: int, seed: Union[int, np.random.Generator, None] = None,
+               aligned: bool = False) -> tuple[NDArray[np.uint8], NDArray[np.int64]]:
+        """Draws n sequences from the graph.
+
+        Parameters:
+            n(int): number of sequences
+
+            seed(int or Generator): seeds the random number generator
+
+            aligned(bool): place each symbol at its alignment column,
+            with gaps elsewhere, instead of packing the sequence to
+            the left and padding the end with zeros
+
+        Returns:
+            np.array: uint8 matrix with one sequence per row
+
+            np.array: number of symbols in each sequence
+        """
+
+        rng = np.random.default_rng(seed)
+        dag = self.dag
+
+        # finished walkers wait at the end, which spells the zero byte
+        symbols = dag.symbols.copy()
+        symbols[dag.end] = 0
+
+        node = np.full(n, dag.start, dtype=np.int64)
+        steps = []
+
+        while True:
+
+            # most nodes only have one way forward and need no draw
+            nxt = self.forward[node]
+            branch = np.flatnonzero(nxt < 0)
+
+            if len(branch) > 0:
+
+                at = node[branch]
+                r = rng.random(len(branch))
+
+                edge = np.searchsorted(self.table, at + r, side='right')
+                edge = np.minimum(edge, self.out_ptr[at + 1] - 1)
+
+                nxt[branch] = self.dst[edge]
+
+            node = nxt
+            steps.append(node)
+
+            if (node == dag.end).all():
+                break
+
+        # the last step has every walker at the end
+        path = np.array(steps[:-1], dtype=np.int64).reshape(len(steps) - 1, n).T
+
+        lengths = np.count_nonzero(path != dag.end, axis=1)
+
+        if not aligned:
+            return np.ascontiguousarray(symbols[path]), lengths
+
+        width = int(dag.indices.max()) + 1 if len(dag.indices) else 0
+        out = np.full((n, width), encoding.GAP, dtype=np.uint8)
+
+        rows, cols = np.nonzero(path != dag.end)
+        nodes = path[rows, cols]
+        out[rows, dag.indices[nodes - 1]] = dag.symbols[nodes]
+
+        return out, lengths
+
+    def iterSamples(self, n: int, seed: Union[int, np.random.Generator, None] = None,
+                    batch_size: int = BATCH_SIZE,
+                    aligned: bool = False) -> Iterator[tuple[NDArray[np.uint8], NDArray[np.int64]]]:
+        """Draws n sequences in batches so that memory stays bounded.
+        Yields the same output as sample() for each batch.
+        """
+
+        rng = np.random.default_rng(seed)
+
+        for start in range(0, n, batch_size):
+            yield self.sample(min(batch_size, n - start), seed=rng, aligned=aligned)
+
+    def writeFasta(self, file_name: str, n: int,
+                   seed: Union[int, np.random.Generator, None] = None,
+                   prefix: Optional[str] = None,
+                   batch_size: int = BATCH_SIZE,
+                   aligned: bool = False) -> None:
+        """Streams n sampled sequences to a FASTA file.
+
+        Parameters:
+            file_name(str): name of fasta file
+
+            n(int): number of sequences
+
+            seed(int or Generator): seeds the random number generator
+
+            prefix(str): sequence IDs are <prefix>_<number>, defaults to
+            the ID of the POGraph
+
+            aligned(bool): write gapped sequences in alignment columns
+        """
+
+        if prefix is None:
+            prefix = self.dag.name
+
+        count = 0
+
+        with open(file_name, 'w') as f:
+
+            for codes, lengths in self.iterSamples(n, seed=seed,
+                                                   batch_size=batch_size,
+                                                   aligned=aligned):
+
+                for row, length in zip(codes, lengths):
+
+                    if not aligned:
+                        row = row[:length]
+
+                    data = encoding.decodeSequence(row)
+
+                    # same layout as Sequence.writeFasta()
+                    lines = [data[i: i + 60] for i in range(0, len(data), 60)] or ['']
+
+                    f.write(f">{prefix}_{count}\n" + '\n'.join(lines) + '\n')
+                    count += 1
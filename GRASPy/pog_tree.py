@@ -10,6 +10,10 @@
 
 from . import pog_graph
 from . import sequence
+from . import encoding
+from . import mutations
+from . import tree_index
+from . import tree_distances
 from typing import Union, Optional
 
 
@@ -91,6 +95,10 @@ class POGTree(object):
         self.distances = distances
         self.graphs = POGraphs
 
+        # built on first use by encodedMatrix() and treeIndex()
+        self._encoded = None
+        self._index = None
+
         # Annotate branchpoints with Sequences
         for key, value in self.graphs.items():
 
@@ -164,3 +172,96 @@ class POGTree(object):
                 if bp.seq is not None]
 
         sequence.writeFastaFile(file_name, seqs)
+
+    def treeIndex(self) -> tree_index.TreeIndex:
+        """Index over the topology of the tree for constant time
+        LCA, ancestor and clade queries. Built once on first use.
+
+        Returns:
+            TreeIndex
+        """
+
+        if self._index is None:
+
+            labels = [None] * self.nBranches
+
+            for name, idx in self.indices.items():
+                labels[idx] = name
+
+            self._index = tree_index.TreeIndex(self.parents, labels)
+
+        return self._index
+
+    def depths(self):
+        """Distance from the root to every branchpoint, ordered by
+        the index of each branchpoint on the tree.
+
+        Returns:
+            np.array: root-to-tip depths
+        """
+
+        return tree_distances.nodeDepths(self.treeIndex(), self.distances)
+
+    def patristicDistances(self, leaves: Optional[list[str]] = None,
+                           path: Optional[str] = None,
+                           block_size: Optional[int] = None):
+        """Pairwise patristic distances between leaves.
+
+        Parameters:
+
+            leaves(list[str]): IDs to include, defaults to every extant
+
+            path(str): write the matrix to this .npy file as a memory
+            map, useful for trees with many thousands of leaves
+
+            block_size(int): number of rows computed at once
+
+        Returns:
+            list[str]: ID of each row and column, in preorder
+
+            np.array: float32 distance matrix
+        """
+
+        index = self.treeIndex()
+
+        order, matrix = tree_distances.patristicDistances(index, self.depths(),
+                                                          leaves=leaves,
+                                                          block_size=block_size,
+                                                          path=path)
+
+        return list(index.labelsOf(order)), matrix
+
+    def encodedMatrix(self):
+        """Encodes the sequences of all branchpoints into a
+        branchpoint x column matrix, see encoding.encodeTree().
+        The matrix is built once and reused by later calls.
+
+        Returns:
+            np.array: uint8 matrix of shape (nBranches, alignment width)
+
+            np.array: True for rows that have a POGraph
+        """
+
+        if self._encoded is None:
+            self._encoded = encoding.encodeTree(self)
+
+        return self._encoded
+
+    def branchMutations(self, clade: Optional[str] = None,
+                        columns: Optional[tuple[int, int]] = None) -> mutations.MutationReport:
+        """Finds the substitutions, insertions and deletions along every
+        branch of the tree at once.
+
+        Parameters:
+
+            clade(str): only report branches below this branchpoint
+            e.g. "N5"
+
+            columns(tuple): only report alignment columns in [start, end)
+
+        Returns:
+            MutationReport: arrays of (branch, column, from, to)
+        """
+
+        return mutations.branchMutations(self, clade=clade, columns=columns,
+                                         matrix=self.encodedMatrix())
@@ -0,0 +1,337 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Checks a tree and an alignment before they are submitted, so that a
+# job does not queue on the server only to fail on its input. Each file is
+# read once: the nwk string is scanned token by token and the FASTA file a
+# line at a time, with residues checked against a byte table of the
+# alphabet. The leaves of the tree and the names in the alignment are then
+# compared as sets. Problems are collected into a Report rather than raised
+# one at a time.
+###############################################################################
+
+import re
+import time
+from typing import Optional
+from . import inputs
+from . import instrument
+from . import seq_sym
+from . import sequence
+
+# messages kept for each check, the rest are only counted
+MAX_MESSAGES = 20
+
+GAP = b'-'
+
+_TOKENS = re.compile(r"[(),;:]|[^(),;:]+")
+
+
+class Report(object):
+    """Outcome of the checks on a tree and/or alignment. errors maps
+    the name of each failed check (e.g. "labels") to its messages and
+    stats holds what was counted along the way.
+    """
+
+    def __init__(self) -> None:
+        """Constructs an empty Report"""
+
+        self.errors = {}
+        self.counts = {}
+        self.stats = {}
+
+    def __str__(self) -> str:
+
+        if self.ok:
+            return f"Preflight passed: {self.stats}"
+
+        lines = [f"Preflight failed: {self.stats}"]
+
+        for check, messages in self.errors.items():
+
+            lines.append(f"{check} ({self.counts[check]}):")
+            lines += [f"    {m}" for m in messages]
+
+            if self.counts[check] > len(messages):
+                lines.append(f"    ... {self.counts[check] - len(messages)} more")
+
+        return '\n'.join(lines)
+
+    @property
+    def ok(self) -> bool:
+        """True if every check passed"""
+
+        return not self.errors
+
+    def add(self, check: str, message: str) -> None:
+        """Records a failed check"""
+
+        self.counts[check] = self.counts.get(check, 0) + 1
+
+        messages = self.errors.setdefault(check, [])
+
+        if len(messages) < MAX_MESSAGES:
+            messages.append(message)
+
+    def raiseIfFailed(self) -> "Report":
+        """Raises a RuntimeError describing every failed check"""
+
+        if not self.ok:
+            raise RuntimeError(str(self))
+
+        return self
+
+
+def checkTree(nwk: str, report: Report) -> set:
+    """Checks that a nwk string is well formed: brackets balance, it
+    ends with ';', every extant has a unique, non-empty label and every
+    branch length is a number.
+
+    Parameters:
+        nwk(str): the nwk string
+
+        report(Report): failed checks are added here
+
+    Returns:
+        set: labels of the extants
+    """
+
+    nwk = nwk.strip()
+
+    if not nwk.endswith(';'):
+        report.add("tree", "nwk string does not end with ';'")
+
+    leaves = set()
+    depth = 0
+    ancestors = 0
+
+    # tokens that are only whitespace separate nothing
+    tokens = [t for t in _TOKENS.findall(nwk) if t.strip()]
+
+    # True after "(" or "," when the next token must start a child
+    child = True
+
+    i = 0
+
+    while i < len(tokens):
+
+        tok = tokens[i]
+
+        # a child with nothing in it
+        if child and tok in (',', ')', ':'):
+            report.add("tree", f"extant without a label at token {i}")
+            child = False
+
+        if tok == '(':
+            depth += 1
+            child = True
+
+        elif tok == ',':
+            child = True
+
+        elif tok == ')':
+            depth -= 1
+            ancestors += 1
+
+            if depth < 0:
+                report.add("tree", f"unmatched ')' at token {i}")
+                depth = 0
+
+        elif tok == ':':
+
+            length = tokens[i + 1] if i + 1 < len(tokens) else ''
+
+            try:
+                float(length)
+            except ValueError:
+                report.add("branch_lengths", f"'{length}' is not a branch length")
+
+            # the length is not a label
+            i += 1
+
+        elif tok == ';':
+            if i != len(tokens) - 1:
+                report.add("tree", f"text after ';' at token {i}")
+
+        elif child:
+
+            label = tok.strip()
+
+            if label in leaves:
+                report.add("duplicates", f"{label} is in the tree more than once")
+
+            leaves.add(label)
+            child = False
+
+        i += 1
+
+    if depth != 0:
+        report.add("tree", f"{depth} unmatched '('")
+
+    report.stats["extants"] = len(leaves)
+    report.stats["ancestors"] = ancestors
+
+    return leaves
+
+
+def _alphabetTable(alphabet: seq_sym.Alphabet) -> bytes:
+    '''Bytes allowed in a sequence of the alphabet, for bytes.translate()'''
+
+    return ''.join(alphabet.symbols).encode() + GAP
+
+
+def _guessAlphabet(residues: bytes) -> Optional[seq_sym.Alphabet]:
+    '''The alphabet alnToJSON() would choose for the first sequence'''
+
+    for name in seq_sym.preferredOrder:
+
+        alphabet = seq_sym.predefAlphabets[name]
+
+        if not residues.translate(None, _alphabetTable(alphabet)):
+            return alphabet
+
+    return None
+
+
+def checkAlignment(file_name: str, report: Report,
+                   alphabet: Optional[str] = None) -> set:
+    """Checks that every sequence of an aligned FASTA file has a unique
+    name, the same width and only symbols of the alphabet (or gaps).
+
+    Parameters:
+        file_name(str): path to the aln file, optionally compressed
+
+        report(Report): failed checks are added here
+
+        alphabet(str): e.g. DNA or Protein, by default the alphabet of
+        the first sequence, as chosen by alnToJSON()
+
+    Returns:
+        set: names of the sequences
+    """
+
+    table = None
+
+    if alphabet in seq_sym.predefAlphabets:
+        table = _alphabetTable(seq_sym.predefAlphabets[alphabet])
+
+    elif alphabet is not None:
+        # the rest is checked against the alphabet of the first sequence
+        report.add("alphabet", f"unknown alphabet '{alphabet}', use one of "
+                               f"{', '.join(seq_sym.predefAlphabets)}")
+
+    names = set()
+    width = None
+    n_seqs = 0
+
+    def finish(name: str, chunks: list) -> None:
+
+        nonlocal table, width
+
+        residues = b''.join(chunks)
+
+        if table is None:
+
+            guessed = _guessAlphabet(residues)
+
+            if guessed is None:
+                # no alphabet to check the others against
+                report.add("alphabet", f"{name} is not in any known alphabet")
+                table = b''
+
+            else:
+                report.stats["alphabet"] = guessed.name
+                table = _alphabetTable(guessed)
+
+        bad = residues.translate(None, table) if table else b''
+
+        if bad:
+            symbols = ''.join(sorted(set(bad.decode(errors='replace'))))
+            report.add("alphabet", f"{name} has symbols not in the alphabet: {symbols}")
+
+        if width is None:
+            width = len(residues)
+
+        elif len(residues) != width:
+            report.add("width", f"{name} has {len(residues)} columns, expected {width}")
+
+    name = None
+    chunks = []
+
+    with inputs.openInput(file_name, 'rb') as f:
+
+        for line in f:
+
+            if line.startswith(b'>'):
+
+                if name is not None:
+                    finish(name, chunks)
+
+                words = line[1:].decode(errors='replace').split()
+                name = sequence.parseDefline(words[0])[0] if words else ''
+                chunks = []
+                n_seqs += 1
+
+                if name == '':
+                    report.add("names", f"sequence {n_seqs} has no name")
+
+                elif name in names:
+                    report.add("duplicates", f"{name} is in the alignment more than once")
+
+                names.add(name)
+
+            elif name is not None:
+                # same clean up as sequence.readFasta()
+                chunks.extend(chunk.strip(b'*') for chunk in line.split())
+
+        if name is not None:
+            finish(name, chunks)
+
+    if n_seqs == 0:
+        report.add("alignment", f"{file_name} has no sequences")
+
+    report.stats["sequences"] = n_seqs
+    report.stats["width"] = width
+
+    return names
+
+
+@instrument.timed("preflight")
+def check(aln: Optional[str] = None, nwk: Optional[str] = None,
+          alphabet: Optional[str] = None) -> Report:
+    """Checks an alignment and/or a tree, and that the extants of the
+    tree are exactly the sequences of the alignment.
+
+    Parameters:
+        aln(str): path to the aln file
+
+        nwk(str): path to the nwk file
+
+        alphabet(str): e.g. DNA or Protein, see checkAlignment()
+
+    Returns:
+        Report: the failed checks, see Report.ok
+    """
+
+    start = time.perf_counter()
+
+    report = Report()
+
+    leaves = names = None
+
+    if nwk is not None:
+        leaves = checkTree(inputs.readNwkFile(nwk), report)
+
+    if aln is not None:
+        names = checkAlignment(aln, report, alphabet)
+
+    if leaves is not None and names is not None:
+
+        for label in sorted(leaves - names):
+            report.add("labels", f"{label} is in the tree but not the alignment")
+
+        for name in sorted(names - leaves):
+            report.add("labels", f"{name} is in the alignment but not the tree")
+
+    report.stats["seconds"] = time.perf_counter() - start
+
+    return report
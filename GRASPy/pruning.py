@@ -0,0 +1,636 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Makes a reconstruction smaller before it is submitted. Alignment
+# columns that are mostly gaps (or that are masked out) and sequences with
+# too few residues are removed, and the tree is pruned to the remaining
+# extants. A Reduction records how the smaller problem maps onto the
+# original one so that POGraphs returned by the server can be put back into
+# the coordinates of the original alignment and the labels of the original
+# tree. A single clade of a tree can be cut out in the same way, together
+# with the rows of the alignment that belong to it, and clades of identical
+# sequences can be sent as a single sequence.
+###############################################################################
+
+import hashlib
+from typing import Iterator, Optional, Union
+import numpy as np
+from . import inputs
+from . import parsers
+from . import pog_tree
+from . import sequence
+from . import tree_index
+
+GAP = ord('-')
+
+
+class Reduction(object):
+    """Maps a reduced alignment and tree back onto the originals.
+    Column i of the reduced alignment is column columns[i] of the
+    original and ancestor N<k> of the pruned tree is ancestor
+    N<ancestors[k]> of the original.
+    """
+
+    def __init__(self, width: int, columns: np.ndarray, names: list[str],
+                 dropped: list[str], tree: Optional[dict] = None,
+                 ancestors: Optional[dict] = None,
+                 duplicates: Optional[dict] = None) -> None:
+        """Constructs instance of Reduction.
+
+        Parameters:
+            width(int): number of columns in the original alignment
+
+            columns(np.array): original column of each kept column
+
+            names(list[str]): sequences that were kept
+
+            dropped(list[str]): sequences that were removed
+
+            tree(dict): the original tree in JSON format, None if the
+            tree was not pruned
+
+            ancestors(dict): label in the pruned tree -> label in the
+            original tree for every ancestor
+
+            duplicates(dict): extant that was not sent -> the identical
+            extant sent in its place
+        """
+
+        self.width = width
+        self.columns = np.asarray(columns, dtype=np.int64)
+        self.names = names
+        self.dropped = dropped
+        self.tree = tree
+        self.ancestors = ancestors if ancestors is not None else {}
+        self.duplicates = duplicates if duplicates is not None else {}
+
+        # reduced index -> original index, the virtual end of the reduced
+        # alignment (its width) becomes the virtual end of the original
+        self._lookup = np.append(self.columns, width)
+
+    def __str__(self) -> str:
+        return (f"Columns: {len(self.columns)} of {self.width}\nSequences: {len(self.names)} of {len(self.names) + len(self.dropped)}")
+
+    def toOriginal(self, idxs):
+        """Converts reduced column indices to original ones, the virtual
+        start (-1) is left as it is.
+
+        Parameters:
+            idxs(list or np.array): reduced indices, any shape
+
+        Returns:
+            the original indices, as a list if idxs was a list
+        """
+
+        arr = np.asarray(idxs, dtype=np.int64)
+
+        out = np.where(arr < 0, arr, self._lookup[np.maximum(arr, 0)])
+
+        return out.tolist() if isinstance(idxs, list) else out
+
+    def remapPOG(self, jpog: dict) -> dict:
+        """Puts a POGraph in JSON format (as sent by the server) into
+        original coordinates. The graph is changed in place.
+
+        Parameters:
+            jpog(dict): serialised POG of an extant or ancestor
+
+        Returns:
+            dict: the same graph
+        """
+
+        for key in ("Indices", "Starts", "Ends", "Edgeindices"):
+            if key in jpog and len(jpog[key]) > 0:
+                jpog[key] = self.toOriginal(jpog[key])
+
+        if "Adjacent" in jpog:
+            jpog["Adjacent"] = [self.toOriginal(adj) if len(adj) > 0 else adj
+                                for adj in jpog["Adjacent"]]
+
+        if "Size" in jpog:
+            jpog["Size"] = self.width
+
+        if "Name" in jpog:
+            jpog["Name"] = self.ancestors.get(jpog["Name"], jpog["Name"])
+
+        return jpog
+
+    def remapResult(self, result: dict) -> dict:
+        """Remaps every POGraph in the result of a job, the tree is
+        replaced with the original tree if it was pruned. Extants that
+        were sent as a duplicate are listed under "Duplicates", see
+        POGTreeFromJointReconstruction().
+
+        Parameters:
+            result(dict): "Result" of a Recon or Pogit job
+
+        Returns:
+            dict: the same result
+        """
+
+        for key in ("Ancestors", "Extants"):
+            for jpog in result.get(key, []):
+                self.remapPOG(jpog)
+
+        if "Tree" in result and self.tree is not None:
+            result["Tree"] = self.tree
+
+        if self.duplicates:
+            result["Duplicates"] = self.duplicates
+
+        if isinstance(result.get("Input"), dict):
+            self.remapResult(result["Input"])
+
+        return result
+
+
+def pruneTree(j_tree: dict, keep) -> tuple[dict, dict]:
+    """Removes every extant not in keep from a tree. Ancestors left
+    with a single child are removed as well and their branch lengths
+    are added to the child's. The new root is the MRCA of the kept
+    extants.
+
+    Parameters:
+        j_tree(dict): tree in JSON format, see nwkToJSON()
+
+        keep(set): labels of the extants to keep
+
+    Returns:
+        dict: the pruned tree in JSON format, ancestors are numbered
+        again in depth first order
+
+        dict: label of each ancestor in the pruned tree -> its label
+        in the original tree
+    """
+
+    index = tree_index.indexFromJSON(j_tree)
+
+    labels = j_tree["Labels"]
+    dists = j_tree["Distances"]
+    n = j_tree["Branchpoints"]
+
+    kept = index.isLeaf & np.array([lab in keep for lab in labels], dtype=bool)
+
+    # kept extants below each node and children that lead to one
+    below = index.upwardPass(kept.astype(np.int64))
+
+    leads = np.flatnonzero(below > 0)
+    branches = np.bincount(index.parents[leads[leads != index.root]], minlength=n)
+
+    if below[index.root] < 2:
+        raise RuntimeError("A pruned tree needs at least two of its extants")
+
+    survive = ((below > 0) & (index.isLeaf | (branches >= 2))).tolist()
+
+    parents = index.parents.tolist()
+    is_leaf = index.isLeaf.tolist()
+
+    # closest surviving ancestor of each node and the distance to it
+    up = [-1] * n
+    length = [0.0] * n
+
+    new_idx = {}
+    ancestors = {}
+
+    Parents, Labels, Distances = [], [], []
+
+    for i in index.preorder.tolist():
+
+        p = parents[i]
+
+        if p >= 0 and survive[p]:
+            up[i], length[i] = p, dists[i]
+        elif p >= 0:
+            up[i], length[i] = up[p], dists[i] + length[p]
+
+        if not survive[i]:
+            continue
+
+        new_idx[i] = len(Labels)
+
+        if is_leaf[i]:
+            Labels.append(labels[i])
+        else:
+            label = str(len(ancestors))
+            ancestors[label] = labels[i]
+            Labels.append(label)
+
+        # only the new root has no surviving ancestor
+        if up[i] == -1:
+            Parents.append(-1)
+            Distances.append(0.0)
+        else:
+            Parents.append(new_idx[up[i]])
+            Distances.append(length[i])
+
+    pruned = dict()
+    pruned["Parents"] = Parents
+    pruned["Labels"] = Labels
+    pruned["Distances"] = Distances
+    pruned["Branchpoints"] = len(Labels)
+
+    return pruned, ancestors
+
+
+def _rows(file_name: str) -> Iterator[tuple[sequence.Sequence, np.ndarray]]:
+    '''Each sequence of an alignment with its residues as bytes'''
+
+    for seq in sequence.iterFastaFile(file_name, gappy=True):
+        yield seq, np.frombuffer(''.join(seq.sequence).encode(), dtype=np.uint8)
+
+
+def reduceAlignment(file_name: str, max_gap_fraction: Optional[float] = None,
+                    min_occupancy: Optional[float] = None,
+                    column_mask=None, data_type: Optional[str] = None,
+                    lazy: bool = False,
+                    exclude: Optional[set] = None) -> tuple[dict, Reduction]:
+    """Reads an alignment into JSON format (see alnToJSON()) without the
+    sequences and columns that carry little information. Sequences are
+    removed first, then columns are removed based on the sequences
+    that are left. The file is read twice, one sequence at a time.
+
+    Parameters:
+        file_name(str): path to aln file
+
+        max_gap_fraction(float): remove columns where more than this
+        fraction of the sequences have a gap
+
+        min_occupancy(float): remove sequences where less than this
+        fraction of the columns have a residue
+
+        column_mask(list[bool]): only columns that are True are kept
+
+        data_type(str): e.g. DNA or Protein, guessed if not given
+
+        lazy(bool): "Sequences" is a generator, for use with
+        streaming.iterRequest()
+
+        exclude(set): sequences to remove whatever their occupancy
+
+    Returns:
+        dict: the reduced alignment in JSON format
+
+        Reduction: maps the reduced alignment onto the original
+    """
+
+    names, dropped = [], []
+    gaps = None
+    width = None
+
+    for seq, row in _rows(file_name):
+
+        if width is None:
+            width = len(row)
+            gaps = np.zeros(width, dtype=np.int64)
+
+            if data_type is None:
+                data_type = seq.alphabet.name
+
+        elif len(row) != width:
+            raise RuntimeError(f"{seq.name} has {len(row)} columns, expected {width}")
+
+        is_gap = row == GAP
+
+        if (exclude is not None and seq.name in exclude) or \
+                (min_occupancy is not None and 1 - is_gap.mean() < min_occupancy):
+            dropped.append(seq.name)
+            continue
+
+        names.append(seq.name)
+        gaps += is_gap
+
+    if width is None:
+        raise RuntimeError(f"{file_name} has no sequences")
+
+    if not names:
+        raise RuntimeError(f"Every sequence in {file_name} is below the occupancy threshold")
+
+    keep = np.ones(width, dtype=bool)
+
+    if column_mask is not None:
+
+        column_mask = np.asarray(column_mask, dtype=bool)
+
+        if len(column_mask) != width:
+            raise RuntimeError(f"Column mask has {len(column_mask)} columns, expected {width}")
+
+        keep &= column_mask
+
+    if max_gap_fraction is not None:
+        keep &= gaps / len(names) <= max_gap_fraction
+
+    columns = np.flatnonzero(keep)
+    cols = columns.tolist()
+
+    kept = set(names)
+
+    def j_seqs():
+        for seq in sequence.iterFastaFile(file_name, gappy=True):
+            if seq.name in kept:
+                residues = seq.sequence
+                yield {"Name": seq.name,
+                       "Seq": [None if residues[c] == "-" else residues[c] for c in cols]}
+
+    alignments = dict()
+    alignments["Sequences"] = j_seqs() if lazy else list(j_seqs())
+
+    alignments["Datatype"] = {"Predef": data_type}
+
+    return alignments, Reduction(width, columns, names, dropped)
+
+
+def reduceInputs(aln: str, nwk: str, max_gap_fraction: Optional[float] = None,
+                 min_occupancy: Optional[float] = None, column_mask=None,
+                 data_type: Optional[str] = None, lazy: bool = False,
+                 deduplicate: bool = False) -> tuple[dict, dict, Reduction]:
+    """Reduces an alignment (see reduceAlignment()) and prunes the tree
+    to the sequences that are left.
+
+    Parameters:
+        aln(str): path to aln file
+
+        nwk(str): path to nwk file
+
+        deduplicate(bool): send each clade of identical sequences as
+        one sequence, see findDuplicates()
+
+        see reduceAlignment() for the others
+
+    Returns:
+        dict: the tree in JSON format
+
+        dict: the alignment in JSON format
+
+        Reduction: maps both onto the originals
+    """
+
+    j_tree = parsers.nwkToJSON(inputs.readNwkFile(nwk))
+
+    duplicates = findDuplicates(aln, j_tree) if deduplicate else {}
+
+    j_aln, reduction = reduceAlignment(aln, max_gap_fraction, min_occupancy,
+                                       column_mask, data_type, lazy,
+                                       exclude=set(duplicates))
+
+    reduction.duplicates = duplicates
+
+    if reduction.dropped:
+
+        pruned, ancestors = pruneTree(j_tree, set(reduction.names))
+
+        reduction.tree = j_tree
+        reduction.ancestors = ancestors
+        j_tree = pruned
+
+    return j_tree, j_aln, reduction
+
+
+def findDuplicates(file_name: str, j_tree: dict) -> dict[str, str]:
+    """Finds clades whose extants all have the same aligned sequence.
+    Rows are compared by a hash of their bytes, read one sequence at a
+    time. Only the first extant (in preorder) of each largest such clade
+    needs to be reconstructed, identical sequences elsewhere in the tree
+    are kept as they are.
+
+    Parameters:
+        file_name(str): path to aln file
+
+        j_tree(dict): tree in JSON format, see nwkToJSON()
+
+    Returns:
+        dict: every other extant of such a clade -> the first extant
+    """
+
+    digests = {seq.name: hashlib.blake2b(row.tobytes(), digest_size=16).digest()
+               for seq, row in _rows(file_name)}
+
+    index = tree_index.indexFromJSON(j_tree)
+
+    labels = j_tree["Labels"]
+
+    # each distinct row gets a code, extants without a row get one of
+    # their own so they never match
+    codes = {}
+    leaf_codes = np.array([codes.setdefault(digests.get(lab, i), len(codes))
+                           for i, lab in enumerate(labels)], dtype=np.int64)
+
+    # every extant below a node has the same row when the smallest and
+    # largest code below it are equal
+    lowest = index.upwardPass(np.where(index.isLeaf, leaf_codes, len(codes)), np.minimum)
+    highest = index.upwardPass(np.where(index.isLeaf, leaf_codes, -1), np.maximum)
+
+    same = lowest == highest
+
+    # largest such clades, the parent of each has extants with other rows
+    has_parent = index.parents >= 0
+
+    parent_same = np.zeros(len(labels), dtype=bool)
+    parent_same[has_parent] = same[index.parents[has_parent]]
+
+    duplicates = {}
+
+    for i in np.flatnonzero(same & ~index.isLeaf & ~parent_same):
+
+        leaves = [labels[j] for j in index.cladeLeaves(i)]
+
+        duplicates.update((leaf, leaves[0]) for leaf in leaves[1:])
+
+    return duplicates
+
+
+def _cladeRoot(index: tree_index.TreeIndex, clade) -> int:
+    '''Tree index of a clade given by the ID of its root or by a list
+    of IDs whose MRCA is the root'''
+
+    if isinstance(clade, (str, int)):
+        return int(index.resolve(clade)[0])
+
+    return index.mrca(clade)
+
+
+def cladeTree(tree: Union[str, pog_tree.POGTree], clade) -> tuple[dict, dict]:
+    """Cuts the clade below one branchpoint out of a tree.
+
+    Parameters:
+        tree(str or POGTree): path to a nwk file or a POGTree, whose
+        subtree is written with _parseToNwk()
+
+        clade(str or list): ID of the root of the clade (e.g. "N5") or
+        a list of IDs whose MRCA is the root
+
+    Returns:
+        dict: the clade in JSON format, ancestors numbered from 0
+
+        dict: label of each ancestor in the clade -> its label in the
+        whole tree
+    """
+
+    if isinstance(tree, str):
+
+        j_tree = parsers.nwkToJSON(inputs.readNwkFile(tree))
+        index = tree_index.indexFromJSON(j_tree)
+
+        root = _cladeRoot(index, clade)
+
+        return pruneTree(j_tree, set(index.labelsOf(index.cladeLeaves(root))))
+
+    index = tree.treeIndex()
+    root = index.labels[_cladeRoot(index, clade)]
+
+    j_tree = parsers.nwkToJSON(tree._parseToNwk(root) + ';')
+
+    # nwkToJSON() numbers ancestors in the order they are written, which
+    # is a preorder over the children of each branchpoint
+    order = []
+    stack = [root]
+
+    while stack:
+
+        bp = tree.branchpoints[stack.pop()]
+
+        if None not in bp.children:
+            order.append(bp.id[1:] if bp.id[1:].isdigit() else bp.id)
+            stack.extend(reversed(bp.children))
+
+    return j_tree, {str(i): label for i, label in enumerate(order)}
+
+
+def subsetRows(names: list[str], rows: dict, width: int,
+               data_type: str) -> tuple[dict, Reduction]:
+    """Builds an alignment in JSON format (see alnToJSON()) from some of
+    its rows, without the columns that are gaps in all of them.
+
+    Parameters:
+        names(list[str]): sequences to include, in order
+
+        rows(dict): name -> residues of the row as uint8
+
+        width(int): number of columns in the whole alignment
+
+        data_type(str): e.g. DNA or Protein
+
+    Returns:
+        dict: the rows in JSON format
+
+        Reduction: maps the columns onto the whole alignment
+    """
+
+    matrix = np.vstack([rows[name] for name in names])
+
+    columns = np.flatnonzero((matrix != GAP).any(axis=0))
+
+    alignments = dict()
+    alignments["Sequences"] = [{"Name": name,
+                                "Seq": [None if s == "-" else s for s in row.tobytes().decode()]}
+                               for name, row in zip(names, matrix[:, columns])]
+
+    alignments["Datatype"] = {"Predef": data_type}
+
+    return alignments, Reduction(width, columns, list(names), [])
+
+
+def cladeAlignment(file_name: str, names: list[str],
+                   data_type: Optional[str] = None) -> tuple[dict, Reduction]:
+    """Reads the rows of an alignment that belong to a set of sequences
+    in one pass, dropping the columns that are gaps in all of them.
+
+    Parameters:
+        file_name(str): path to aln file
+
+        names(list[str]): sequences to keep
+
+        data_type(str): e.g. DNA or Protein, guessed if not given
+
+    Returns:
+        dict: the rows in JSON format, in the order of the file
+
+        Reduction: maps the columns onto the whole alignment
+    """
+
+    width, data_type, rows = readRows(file_name, set(names), data_type)
+
+    return subsetRows(list(rows), rows, width, data_type)
+
+
+def readRows(file_name: str, names: set,
+             data_type: Optional[str] = None) -> tuple[int, str, dict]:
+    """Reads the rows of some sequences of an alignment in one pass.
+
+    Parameters:
+        file_name(str): path to aln file
+
+        names(set): sequences to keep
+
+        data_type(str): e.g. DNA or Protein, guessed from the first
+        sequence kept if not given
+
+    Returns:
+        int: number of columns
+
+        str: the data type
+
+        dict: name -> residues of the row as uint8, in file order
+    """
+
+    rows = {}
+    width = None
+
+    for seq, row in _rows(file_name):
+
+        if width is None:
+            width = len(row)
+
+        elif len(row) != width:
+            raise RuntimeError(f"{seq.name} has {len(row)} columns, expected {width}")
+
+        if seq.name in names:
+
+            if data_type is None:
+                data_type = seq.alphabet.name
+
+            rows[seq.name] = row
+
+    missing = names - rows.keys()
+
+    if missing:
+        raise RuntimeError(f"{', '.join(sorted(missing))} not found in {file_name}")
+
+    return width, data_type, rows
+
+
+def cladeInputs(aln: str, tree: Union[str, pog_tree.POGTree], clade,
+                data_type: Optional[str] = None) -> tuple[dict, dict, Reduction]:
+    """The tree and alignment of one clade, ready to be submitted on
+    their own, see cladeTree() and cladeAlignment().
+
+    Parameters:
+        aln(str): path to aln file
+
+        tree(str or POGTree): path to nwk file or a POGTree
+
+        clade(str or list): root of the clade or IDs whose MRCA it is
+
+        data_type(str): e.g. DNA or Protein, guessed if not given
+
+    Returns:
+        dict: the clade in JSON format
+
+        dict: its alignment in JSON format
+
+        Reduction: maps columns and ancestors onto the whole problem,
+        its tree is the clade with the labels of the whole tree
+    """
+
+    j_tree, ancestors = cladeTree(tree, clade)
+
+    n_children = np.bincount([p for p in j_tree["Parents"] if p >= 0],
+                             minlength=j_tree["Branchpoints"])
+
+    leaves = [lab for lab, n in zip(j_tree["Labels"], n_children) if n == 0]
+
+    j_aln, reduction = cladeAlignment(aln, leaves, data_type)
+
+    reduction.ancestors = ancestors
+    reduction.tree = dict(j_tree, Labels=[ancestors.get(lab, lab) for lab in j_tree["Labels"]])
+
+    return j_tree, j_aln, reduction
@@ -0,0 +1,216 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Spreads jobs over several bnkit servers. New jobs are sent to the
+# server with the shortest queue, found with ViewQueue(), and the server
+# that accepted each job is remembered so that later requests about that
+# job (status, place in queue, output, cancel) are sent to the same server.
+# Servers number their jobs independently, so the router hands out its own
+# job ids and translates them in both directions.
+###############################################################################
+
+import itertools
+import re
+import threading
+from typing import Optional
+from . import client
+from . import codec
+from . import g_requests
+
+# commands that create a job on the server
+JOB_COMMANDS = ("Recon", "Train", "Infer", "Pogit")
+
+# job states that no longer take up a place in a queue
+FINISHED = ("completed", "cancelled", "failed", "error")
+
+Endpoint = tuple[str, int]
+
+# the top level "Job" of a response, when it is the first or last key
+_FIRST_JOB = re.compile(r'^\s*\{\s*"Job"\s*:\s*(-?\d+)')
+_LAST_JOB = re.compile(r'[,{]\s*"Job"\s*:\s*(-?\d+)\s*\}\s*$')
+
+
+def swapJob(response: str, server_id: int, job_id: int) -> str:
+    """Replaces the server's id for a job in a response with the
+    router's. Only the id is rewritten when it is the first or last key,
+    so that a large output is not decoded here as well as by JobOutput().
+
+    Parameters:
+        response(str): the response of the server
+
+        server_id(int): the job id on the server
+
+        job_id(int): the job id given out by the router
+
+    Returns:
+        str: the response with the router's id
+    """
+
+    match = _FIRST_JOB.match(response) or \
+        _LAST_JOB.search(response, max(len(response) - 256, 0))
+
+    if match is not None and int(match.group(1)) == server_id:
+        return response[:match.start(1)] + str(job_id) + response[match.end(1):]
+
+    decoded = codec.loads(response)
+
+    if decoded.get("Job") == server_id:
+        decoded["Job"] = job_id
+
+    return codec.dumps(decoded)
+
+
+def queueDepth(response: dict) -> Optional[int]:
+    """Reads the number of unfinished jobs from a ViewQueue() response.
+
+    Parameters:
+        response(dict): decoded response to a "Status" request
+
+    Returns:
+        int: jobs waiting or running, None if the response does not
+        describe the queue
+    """
+
+    jobs = response.get("Jobs")
+
+    if isinstance(jobs, list):
+        return sum(1 for j in jobs
+                   if str(j.get("Status", "")).lower() not in FINISHED)
+
+    for key in ("Queue", "Queued", "Place"):
+        if isinstance(response.get(key), int):
+            return response[key]
+
+    return None
+
+
+class Router(object):
+    """Routes requests between several servers. Install a Router with
+    g_requests.setRouter() (or use it as a context manager) and every
+    request made through g_requests goes through it.
+    """
+
+    def __init__(self, endpoints: list[Endpoint]) -> None:
+        """Constructs instance of Router.
+
+        Parameters:
+            endpoints(list): (host, port) of each server, the first is
+            used for requests that do not concern a job
+        """
+
+        if len(endpoints) == 0:
+            raise RuntimeError("Router needs at least one endpoint")
+
+        self.endpoints = [tuple(e) for e in endpoints]
+
+        # router job id -> (server, job id on that server)
+        self.jobs = dict()
+        self._ids = itertools.count(1)
+
+        # jobs submitted through this router, used when a server does
+        # not report its queue
+        self.submitted = {e: 0 for e in self.endpoints}
+
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "Router":
+
+        self._previous = g_requests.setRouter(self)
+
+        return self
+
+    def __exit__(self, *exc) -> None:
+
+        g_requests.setRouter(self._previous)
+
+    def queueDepths(self) -> dict[Endpoint, int]:
+        """Asks every server for its queue with ViewQueue().
+
+        Returns:
+            dict: number of unfinished jobs on each endpoint
+        """
+
+        depths = dict()
+
+        for e in self.endpoints:
+
+            with client.endpoint(*e):
+                depth = queueDepth(g_requests.ViewQueue())
+
+            depths[e] = self.submitted[e] if depth is None else depth
+
+        return depths
+
+    def leastLoaded(self) -> Endpoint:
+        """The endpoint with the fewest unfinished jobs, ties go to the
+        earliest endpoint in the list."""
+
+        depths = self.queueDepths()
+
+        return min(self.endpoints, key=lambda e: depths[e])
+
+    def owner(self, job_id: int) -> Endpoint:
+        """The endpoint that accepted a job"""
+
+        return self._lookup(job_id)[0]
+
+    def _lookup(self, job_id: int) -> tuple[Endpoint, int]:
+        '''Server and server job id of a router job id'''
+
+        with self._lock:
+            if job_id not in self.jobs:
+                raise RuntimeError(f"Job {job_id} was not submitted through this router")
+
+            return self.jobs[job_id]
+
+    def send(self, request: dict, message) -> str:
+        """Sends an encoded request to the right server.
+
+        Jobs go to the least loaded server, requests naming a job go to
+        the server that owns it and anything else goes to the endpoint
+        selected with client.endpoint() or the first endpoint. Job ids
+        in requests and responses are the ids given out by the router.
+
+        Parameters:
+            request(dict): the request, used to choose the server
+
+            message: the encoded request, see client.sendRequest()
+
+        Returns:
+            str: the response of the server
+        """
+
+        command = request.get("Command")
+
+        if command in JOB_COMMANDS:
+
+            target = self.leastLoaded()
+            response = client.sendRequest(message, *target)
+
+            decoded = codec.loads(response)
+
+            if decoded.get("Job") is None:
+                return response
+
+            with self._lock:
+                job_id = next(self._ids)
+                self.jobs[job_id] = (target, decoded["Job"])
+                self.submitted[target] += 1
+
+            decoded["Job"] = job_id
+
+            return codec.dumps(decoded)
+
+        if "Job" in request:
+
+            job_id = request["Job"]
+            target, server_id = self._lookup(job_id)
+
+            # the server only knows its own number for the job
+            message = codec.dumps(dict(request, Job=server_id)) + '\n'
+
+            return swapJob(client.sendRequest(message, *target), server_id, job_id)
+
+        target = client.currentEndpoint() or self.endpoints[0]
+
+        return client.sendRequest(message, *target)
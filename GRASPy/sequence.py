@@ -8,6 +8,7 @@
 ###############################################################################
 
 import re
+from . import inputs
 from . import seq_sym
 import math
 
@@ -317,6 +318,27 @@ def parseDefline(string):
         return (s, '', '', '')
 
 
+def iterFastaFile(filename, alphabet=None, ignore=False, gappy=False,
+                  parse_defline=True):
+    """ Reads the given FASTA formatted file one entry at a time and yields
+        each sequence as soon as it is complete, so that only one entry is
+        held in memory. Compressed files are read directly, see
+        inputs.openInput(). Arguments are the same as for readFastaFile()."""
+    with inputs.openInput(filename) as fh:
+        batch = []  # rows of the current FASTA entry
+        for row in fh:
+            row = row.strip()
+            if len(row) > 0:
+                if row.startswith('>') and len(batch) > 0:
+                    yield from readFasta('\n'.join(batch) + '\n', alphabet,
+                                         ignore, gappy, parse_defline)
+                    batch = []
+                batch.append(row)
+        if len(batch) > 0:
+            yield from readFasta('\n'.join(batch) + '\n', alphabet, ignore,
+                                 gappy, parse_defline)
+
+
 def readFastaFile(filename, alphabet=None, ignore=False, gappy=False,
                   parse_defline=True):
     """ Read the given FASTA formatted file and return the list of sequences
@@ -328,27 +350,7 @@ def readFastaFile(filename, alphabet=None, ignore=False, gappy=False,
         if True gaps are accepted and included in the resulting sequences.
         If parse_defline is False, the name will be set to everything before
         the first space, else parsing will be attempted."""
-    fh = open(filename)
-    seqlist = []
-    batch = ''  # a batch of rows including one or more complete FASTA entries
-    rowcnt = 0
-    for row in fh:
-        row = row.strip()
-        if len(row) > 0:
-            if row.startswith('>') and rowcnt > 0:
-                more = readFasta(batch, alphabet, ignore, gappy, parse_defline)
-                if len(more) > 0:
-                    seqlist.extend(more)
-                batch = ''
-                rowcnt = 0
-            batch += row + '\n'
-            rowcnt += 1
-    if len(batch) > 0:
-        more = readFasta(batch, alphabet, ignore, gappy, parse_defline)
-        if len(more) > 0:
-            seqlist.extend(more)
-    fh.close()
-    return seqlist
+    return list(iterFastaFile(filename, alphabet, ignore, gappy, parse_defline))
 
 
 def writeFastaFile(filename, seqs):
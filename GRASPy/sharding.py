@@ -0,0 +1,260 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Splits the reconstruction of a very large tree into independent jobs.
+# The tree is cut into clades (shards) of a bounded number of extants. Each
+# shard also carries a few extants from every clade cut off below it, so
+# that all of its own ancestors remain in its pruned tree with the context
+# of their descendants. The results of the shards are stitched back into
+# one POGTree, each ancestor taken from the shard that owns it and named as
+# in the original tree.
+###############################################################################
+
+from typing import Optional
+import numpy as np
+from . import parsers
+from . import pog_tree
+from . import pruning
+from . import tree_index
+
+
+class Shard(object):
+    """A clade of the tree reconstructed as one job. The extants of a
+    shard are the ones below its root that are not in a shard further
+    down, its context extants stand in for those lower shards.
+    """
+
+    def __init__(self, root: str, leaves: list[str], context: list[str],
+                 owned: list[str]) -> None:
+        """Constructs instance of Shard.
+
+        Parameters:
+            root(str): label of the root of the clade in the tree
+
+            leaves(list[str]): extants that belong to this shard
+
+            context(list[str]): extants borrowed from lower shards
+
+            owned(list[str]): labels of the ancestors taken from the
+            result of this shard
+        """
+
+        self.root = root
+        self.leaves = leaves
+        self.context = context
+        self.owned = owned
+
+    def __str__(self) -> str:
+        return (f"Root: {self.root}\nExtants: {len(self.leaves)}\nContext: {len(self.context)}\nAncestors: {len(self.owned)}")
+
+    def names(self) -> list[str]:
+        """Every extant sent with the shard"""
+
+        return self.leaves + self.context
+
+
+def planShards(j_tree: dict, max_leaves: int, overlap: int = 1) -> list[Shard]:
+    """Cuts a tree into shards of at most max_leaves extants (plus
+    context). Clades are cut bottom up, largest first, as soon as an
+    ancestor has too many extants below it that are not in a shard.
+    Ancestors whose children are all extants cannot be split further
+    and may give a larger shard.
+
+    Parameters:
+        j_tree(dict): tree in JSON format, see nwkToJSON()
+
+        max_leaves(int): largest number of extants in a shard, at
+        least 2
+
+        overlap(int): context extants taken from each clade cut off
+        directly below a shard, at least 1 so that an ancestor whose
+        children are all cut off keeps them in the shard's tree
+
+    Returns:
+        list[Shard]: the shards, lowest first, the last one is rooted
+        at the root of the tree
+    """
+
+    if max_leaves < 2:
+        raise RuntimeError("A shard needs room for at least two extants")
+
+    if overlap < 1:
+        raise RuntimeError("Shards need at least one context extant from each clade cut off below them")
+
+    index = tree_index.indexFromJSON(j_tree)
+
+    labels = j_tree["Labels"]
+    n = j_tree["Branchpoints"]
+
+    parents = index.parents.tolist()
+    is_leaf = index.isLeaf.tolist()
+    child_ptr = index.child_ptr.tolist()
+    child_nodes = index.child_nodes.tolist()
+
+    # extants below each node that are not yet in a shard
+    pending = index.isLeaf.astype(np.int64).tolist()
+    cut = [False] * n
+    roots = []
+
+    for i in index.postorder.tolist():
+
+        if pending[i] > max_leaves:
+
+            children = child_nodes[child_ptr[i]: child_ptr[i + 1]]
+
+            for c in sorted(children, key=lambda c: -pending[c]):
+
+                if pending[i] <= max_leaves or pending[c] < 2:
+                    break
+
+                cut[c] = True
+                roots.append(c)
+                pending[i] -= pending[c]
+
+        if parents[i] >= 0:
+            pending[parents[i]] += pending[i]
+
+    roots.append(index.root)
+
+    leaves = {r: [] for r in roots}
+    owned = {r: [] for r in roots}
+    context = {r: [] for r in roots}
+
+    # shard each node belongs to
+    owner = [index.root] * n
+
+    for i in index.preorder.tolist():
+
+        if parents[i] >= 0:
+            owner[i] = i if cut[i] else owner[parents[i]]
+
+        if is_leaf[i]:
+            leaves[owner[i]].append(labels[i])
+            continue
+
+        owned[owner[i]].append(labels[i])
+
+        # the first extants of each clade cut off below
+        for c in child_nodes[child_ptr[i]: child_ptr[i + 1]]:
+            if cut[c]:
+                context[owner[i]] += [labels[j] for j in index.cladeLeaves(c)[:overlap]]
+
+    return [Shard(labels[r], leaves[r], context[r], owned[r]) for r in roots]
+
+
+def shardInput(j_tree: dict, shard: Shard, rows: dict, width: int,
+               data_type: str) -> tuple[dict, dict, pruning.Reduction]:
+    """The tree and alignment of one shard.
+
+    Parameters:
+        j_tree(dict): the whole tree in JSON format
+
+        shard(Shard): see planShards()
+
+        rows(dict): name -> residues as uint8 of at least the extants
+        of the shard, see pruning.readRows()
+
+        width(int): number of columns in the whole alignment
+
+        data_type(str): e.g. DNA or Protein
+
+    Returns:
+        tuple: (tree, alignment, Reduction) of the shard, the Reduction
+        maps columns and ancestors onto the whole problem
+    """
+
+    s_tree, ancestors = pruning.pruneTree(j_tree, set(shard.names()))
+
+    s_aln, reduction = pruning.subsetRows(shard.names(), rows, width, data_type)
+
+    reduction.ancestors = ancestors
+    reduction.tree = dict(s_tree, Labels=[ancestors.get(lab, lab) for lab in s_tree["Labels"]])
+
+    return s_tree, s_aln, reduction
+
+
+def readShardRows(aln: str, shards: list[Shard],
+                  data_type: Optional[str] = None) -> tuple[int, str, dict]:
+    """Reads the rows of every extant sent with a shard in one pass
+    over the alignment, see pruning.readRows()"""
+
+    names = set()
+    for shard in shards:
+        names.update(shard.names())
+
+    return pruning.readRows(aln, names, data_type)
+
+
+def shardInputs(aln: str, j_tree: dict, shards: list[Shard],
+                data_type: Optional[str] = None) -> list[tuple[dict, dict, pruning.Reduction]]:
+    """The tree and alignment of every shard, see shardInput(). The
+    alignment is read once for all of them.
+
+    Parameters:
+        aln(str): path to aln file
+
+        j_tree(dict): the whole tree in JSON format
+
+        shards(list[Shard]): see planShards()
+
+        data_type(str): e.g. DNA or Protein, guessed if not given
+
+    Returns:
+        list: (tree, alignment, Reduction) of each shard
+    """
+
+    width, data_type, rows = readShardRows(aln, shards, data_type)
+
+    return [shardInput(j_tree, shard, rows, width, data_type) for shard in shards]
+
+
+def stitch(j_tree: dict, shards: list[Shard], results: list[dict]) -> pog_tree.POGTree:
+    """Combines the results of the shards into one POGTree over the
+    whole tree. Results must already be in the coordinates and labels
+    of the whole problem (JobOutput() does this).
+
+    Parameters:
+        j_tree(dict): the whole tree in JSON format
+
+        shards(list[Shard]): see planShards()
+
+        results(list[dict]): "Result" of the job of each shard
+
+    Returns:
+        POGTree
+    """
+
+    graphs = dict()
+
+    for shard, result in zip(shards, results):
+
+        owned = set(shard.owned)
+        leaves = set(shard.leaves)
+
+        for jpog in result["Ancestors"]:
+            if jpog["Name"] in owned:
+                g = parsers.POGraphFromJSON(jpog, isAncestor=True)
+                graphs[g.name] = g
+
+        # extants are taken from the shard they belong to
+        for jpog in result.get("Input", {}).get("Extants", []):
+            if jpog["Name"] in leaves:
+                g = parsers.POGraphFromJSON(jpog, isAncestor=False)
+                graphs[g.name] = g
+
+    missing = [name for shard in shards
+               for name in (parsers.make_anc_label(shard.owned, i) for i in range(len(shard.owned)))
+               if name not in graphs]
+
+    if missing:
+        raise RuntimeError(f"No reconstruction returned for {', '.join(missing[:10])}")
+
+    tree = parsers.TreeFromJSON(j_tree)
+
+    return pog_tree.POGTree(nBranches=tree['nBranches'],
+                            branchpoints=tree['branchpoints'],
+                            parents=tree['parents'],
+                            children=tree['children'],
+                            indices=tree['indices'],
+                            distances=tree['distances'],
+                            POGraphs=graphs)
@@ -0,0 +1,303 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Shares an encoded alignment and the arrays of a tree between
+# processes without copying them. The owner packs the arrays into a single
+# multiprocessing.shared_memory block and hands workers a small handle;
+# workers attach to the block by name and get read only NumPy views of the
+# same memory. The block is removed when the owner closes it, leaves a with
+# statement, is garbage collected or exits.
+###############################################################################
+
+import os
+import sys
+import weakref
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+from typing import Optional, Union
+import numpy as np
+from . import encoding
+from . import inputs
+from . import parsers
+from . import pog_tree
+
+# arrays in a block start on a multiple of this many bytes
+ALIGNMENT = 64
+
+
+def packLabels(labels: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Stores strings as one byte array and the offset where each
+    string starts, so they can be shared like any other array.
+
+    Parameters:
+        labels(list[str]): e.g. sequence names or tree labels
+
+    Returns:
+        np.array: uint8 UTF-8 bytes of every label joined together
+
+        np.array: int64 offsets, label i is bytes[offsets[i]: offsets[i + 1]]
+    """
+
+    encoded = [lab.encode() for lab in labels]
+
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def unpackLabels(data: np.ndarray, offsets: np.ndarray) -> list[str]:
+    """Reverses packLabels()"""
+
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+
+    return [raw[a: b].decode() for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def alignmentArrays(file_name: str) -> dict[str, np.ndarray]:
+    """Encodes an aligned FASTA file, see encoding.encodeAlignment().
+
+    Returns:
+        dict: "matrix" (sequence x column uint8), "names" and
+        "name_offsets" (see packLabels())
+    """
+
+    names, matrix = encoding.encodeAlignment(file_name)
+
+    data, offsets = packLabels(names)
+
+    return {"matrix": matrix, "names": data, "name_offsets": offsets}
+
+
+def treeArrays(tree: Union[str, dict, pog_tree.POGTree]) -> dict[str, np.ndarray]:
+    """The topology of a tree as flat arrays in tree index order.
+
+    Parameters:
+        tree: path to a nwk file, a tree in JSON format (see
+        nwkToJSON()) or a POGTree
+
+    Returns:
+        dict: "parents" (int64, -1 for the root), "distances" (float64),
+        "labels" and "label_offsets" (see packLabels())
+    """
+
+    if isinstance(tree, str):
+        tree = parsers.nwkToJSON(inputs.readNwkFile(tree))
+
+    if isinstance(tree, dict):
+        parents = tree["Parents"]
+        distances = tree["Distances"]
+        labels = [parsers.make_anc_label(tree["Labels"], i) for i in range(tree["Branchpoints"])]
+
+    else:
+        parents = tree.parents
+        distances = tree.distances
+        labels = [None] * tree.nBranches
+
+        for name, idx in tree.indices.items():
+            labels[idx] = name
+
+    data, offsets = packLabels(labels)
+
+    return {"parents": np.asarray(parents, dtype=np.int64),
+            "distances": np.asarray(distances, dtype=np.float64),
+            "labels": data, "label_offsets": offsets}
+
+
+def _release(shm: shared_memory.SharedMemory, unlink: bool) -> None:
+    '''Closes a block, and removes it if this process owns it'''
+
+    try:
+        shm.close()
+    except BufferError:
+        # views are still held elsewhere, the mapping goes with them
+        pass
+
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _trackerPid() -> Optional[int]:
+    '''Process that removes blocks left behind when this process exits,
+    None if it was started by another process'''
+
+    return getattr(resource_tracker._resource_tracker, "_pid", None)
+
+
+def _sharesTracker(owner: Optional[int]) -> bool:
+    '''Whether this process reports to the resource tracker of the
+    process that made a block. Workers started by multiprocessing (fork,
+    spawn or forkserver) are handed the tracker of their parent.'''
+
+    tracker = resource_tracker._resource_tracker
+
+    if getattr(tracker, "_fd", None) is None:
+        # attaching will start a tracker of its own
+        return False
+
+    # a process that started its own tracker knows its pid
+    return _trackerPid() in (None, owner)
+
+
+class SharedArrays(object):
+    """Named NumPy arrays stored in one shared memory block. Created by
+    publish() in the owning process and by attach() in workers, which
+    pass handle between them (it is a small picklable dict).
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, handle: dict,
+                 owner: bool) -> None:
+        """Use publish() or attach() rather than this directly.
+
+        Parameters:
+            shm(SharedMemory): the block
+
+            handle(dict): name of the block and where each array is
+
+            owner(bool): the block is removed when this object closes
+        """
+
+        self.handle = handle
+        self.owner = owner
+
+        self.arrays = {}
+
+        for key, (dtype, shape, offset) in handle["arrays"].items():
+
+            view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            view.flags.writeable = False
+
+            self.arrays[key] = view
+
+        self._shm = shm
+        self._finalizer = weakref.finalize(self, _release, shm, owner)
+
+    def __str__(self) -> str:
+        return (f"Block: {self.handle['name']}\nOwner: {self.owner}\nArrays: {', '.join(self.arrays)}")
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.arrays[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.arrays
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def labels(self, key: str = "labels") -> list[str]:
+        """Unpacks strings stored with packLabels(), e.g. "labels" for
+        the tree or "names" for the alignment"""
+
+        offsets = "label_offsets" if key == "labels" else "name_offsets"
+
+        return unpackLabels(self.arrays[key], self.arrays[offsets])
+
+    def close(self) -> None:
+        """Drops the views and detaches from the block, which is also
+        removed if this is the owner. Views taken from arrays must not
+        be used afterwards."""
+
+        self.arrays = {}
+        self._finalizer()
+
+
+def publish(arrays: dict[str, np.ndarray], name: Optional[str] = None) -> SharedArrays:
+    """Copies arrays into a new shared memory block.
+
+    Parameters:
+        arrays(dict): name -> array, e.g. from alignmentArrays() or
+        treeArrays()
+
+        name(str): name of the block, chosen by the system if None
+
+    Returns:
+        SharedArrays: read only views of the copies, pass its handle
+        to workers
+    """
+
+    layout = {}
+    size = 0
+
+    for key, arr in arrays.items():
+
+        arr = np.ascontiguousarray(arr)
+
+        size = -(-size // ALIGNMENT) * ALIGNMENT
+        layout[key] = (arr.dtype.str, arr.shape, size)
+        size += arr.nbytes
+
+    shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+
+    try:
+        for key, arr in arrays.items():
+
+            dtype, shape, offset = layout[key]
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = arr
+
+    except BaseException:
+        _release(shm, True)
+        raise
+
+    handle = {"name": shm.name, "arrays": layout, "tracker": _trackerPid()}
+
+    return SharedArrays(shm, handle, owner=True)
+
+
+def attach(handle: dict) -> SharedArrays:
+    """Attaches to a block made by publish() in another process.
+
+    Parameters:
+        handle(dict): SharedArrays.handle of the owner
+
+    Returns:
+        SharedArrays: read only views of the owner's arrays, close()
+        detaches without removing the block
+    """
+
+    # before Python 3.13 attaching registers the block with the resource
+    # tracker of this process, which removes it when this process exits.
+    # That is only wanted when the tracker is the owner's, which forgets
+    # the block once the owner removes it.
+    untrack = os.name == "posix" and sys.version_info < (3, 13) and \
+        not _sharesTracker(handle.get("tracker"))
+
+    shm = shared_memory.SharedMemory(name=handle["name"])
+
+    if untrack:
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+    return SharedArrays(shm, handle, owner=False)
+
+
+def publishInputs(aln: Optional[str] = None, tree=None,
+                  name: Optional[str] = None) -> SharedArrays:
+    """Encodes an alignment and/or a tree once and shares the arrays,
+    see alignmentArrays() and treeArrays().
+
+    Parameters:
+        aln(str): path to aln file
+
+        tree: path to nwk file, tree in JSON format or POGTree
+
+        name(str): name of the block
+
+    Returns:
+        SharedArrays: owner of the block
+    """
+
+    arrays = {}
+
+    if aln is not None:
+        arrays.update(alignmentArrays(aln))
+
+    if tree is not None:
+        arrays.update(treeArrays(tree))
+
+    return publish(arrays, name)
@@ -0,0 +1,93 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Serialises requests for the server piece by piece. The request is
+# walked depth first and JSON text is produced as it goes, so that sections
+# given as generators (such as the sequences of an alignment) or as NumPy
+# matrices (such as a trait dataset) are never held as one string. The text
+# is handed to the socket in bounded chunks of UTF-8 bytes.
+###############################################################################
+
+import json
+from typing import Iterator
+from . import codec
+
+# bytes collected before a chunk is passed on to the socket
+BUFFER_SIZE = 1 << 16
+
+
+def iterEncode(obj) -> Iterator[str]:
+    """Yields the JSON text of obj in pieces. Dicts, lists, tuples and
+    any other iterable (e.g. a generator) are encoded one item at a
+    time. Float matrices are written a block of rows at a time with
+    NaN as null, other values are encoded with json.dumps().
+
+    Parameters:
+        obj: the value to encode
+
+    Returns:
+        Iterator[str]: pieces of JSON text that join to the whole value
+    """
+
+    if isinstance(obj, dict):
+
+        yield '{'
+
+        for i, (key, value) in enumerate(obj.items()):
+            yield (', ' if i > 0 else '') + json.dumps(str(key)) + ': '
+            yield from iterEncode(value)
+
+        yield '}'
+
+    elif codec.isArray(obj) and obj.dtype.kind == 'f' and obj.ndim == 2:
+
+        yield '['
+        yield from codec.iterArrayJSON(obj)
+        yield ']'
+
+    elif isinstance(obj, (str, bytes)) or codec.isArray(obj) or not hasattr(obj, '__iter__'):
+
+        yield json.dumps(obj, default=codec.jsonDefault)
+
+    else:
+
+        yield '['
+
+        for i, item in enumerate(obj):
+            if i > 0:
+                yield ', '
+            yield from iterEncode(item)
+
+        yield ']'
+
+
+def iterRequest(request: dict, buffer_size: int = BUFFER_SIZE) -> Iterator[bytes]:
+    """Encodes a request as newline terminated UTF-8, yielding chunks
+    of roughly buffer_size bytes as they fill.
+
+    Parameters:
+        request(dict): the request, values may be generators or arrays
+
+        buffer_size(int): number of bytes buffered before yielding
+
+    Returns:
+        Iterator[bytes]: the request, ready for socket.sendall()
+    """
+
+    buffer = []
+    filled = 0
+
+    for piece in iterEncode(request):
+
+        data = piece.encode()
+        buffer.append(data)
+        filled += len(data)
+
+        if filled >= buffer_size:
+            yield b''.join(buffer)
+            buffer = []
+            filled = 0
+
+    buffer.append(b'\n')
+
+    yield b''.join(buffer)
@@ -0,0 +1,122 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Root-to-tip depths and pairwise patristic distances for a tree.
+# Depths are accumulated one level of the tree at a time and the distance
+# between two leaves is found from the depth of their LCA, so a full
+# distance matrix is filled block by block without any Python loops over
+# pairs of leaves.
+###############################################################################
+
+import numpy as np
+from numpy.typing import NDArray
+from typing import Optional
+from .tree_index import TreeIndex, Nodes
+
+# number of leaf pairs resolved per block when no block size is given
+PAIRS_PER_BLOCK = 1 << 22
+
+
+def nodeDepths(index: TreeIndex, distances: list[float]) -> NDArray[np.float64]:
+    """Cumulative distance from the root to every branchpoint.
+
+    Parameters:
+        index(TreeIndex): topology of the tree
+
+        distances(list[float]): maps the branchpoint to the distance to
+        its parent
+
+    Returns:
+        np.array: distance from the root to each branchpoint
+    """
+
+    dists = np.array(distances, dtype=np.float64)
+
+    # the distance above the root is not part of the tree
+    dists[index.root] = 0.0
+
+    return index.downwardPass(dists, np.add)
+
+
+def patristicDistances(index: TreeIndex, depths: NDArray,
+                       leaves: Optional[Nodes] = None,
+                       block_size: Optional[int] = None,
+                       path: Optional[str] = None) -> tuple[NDArray[np.int64], NDArray[np.float32]]:
+    """Pairwise patristic distances between leaves, computed as
+    depth[a] + depth[b] - 2 * depth[lca(a, b)].
+
+    Once the leaves are in preorder, the LCA of leaves i < j is the
+    first in preorder of the LCAs of each neighbouring pair between
+    them, so every row is two running minimums over the neighbouring
+    LCAs rather than one LCA query per pair. Rows are still visited one
+    at a time: resolving a whole block of pairs at once with
+    TreeIndex.lca(), or with a sparse table over the neighbouring LCAs,
+    gives the same matrix but is two to six times slower, as it gathers
+    from the table once per pair instead of streaming over each row.
+
+    Parameters:
+        index(TreeIndex): topology of the tree
+
+        depths(np.array): output of nodeDepths()
+
+        leaves(list): branchpoints to include, defaults to all leaves
+
+        block_size(int): number of rows computed at once, defaults to
+        keeping roughly four million distances in memory
+
+        path(str): if given, the matrix is written to this .npy file
+        as a memory map instead of being held in RAM
+
+    Returns:
+        np.array: tree index of each row and column, in preorder
+
+        np.array: float32 distance matrix
+    """
+
+    if leaves is None:
+        leaves = index.leaves
+
+    leaves = index.resolve(leaves)
+    leaves = leaves[np.argsort(index.tin[leaves], kind='stable')]
+
+    n = len(leaves)
+
+    if path is not None:
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                        shape=(n, n))
+    else:
+        out = np.empty((n, n), dtype=np.float32)
+
+    if block_size is None:
+        block_size = max(1, PAIRS_PER_BLOCK // max(n, 1))
+
+    leaf_depths = depths[leaves]
+
+    # preorder position of the LCA of each pair of neighbouring leaves
+    neighbours = index.tin[index.lca(leaves[:-1], leaves[1:])]
+
+    block = np.empty((min(block_size, n), n), dtype=np.int64)
+
+    for start in range(0, n, block_size):
+
+        stop = min(start + block_size, n)
+
+        for i in range(start, stop):
+
+            row = block[i - start]
+
+            row[i] = index.tin[leaves[i]]
+            np.minimum.accumulate(neighbours[i:], out=row[i + 1:])
+
+            if i > 0:
+                row[:i] = np.minimum.accumulate(neighbours[:i][::-1])[::-1]
+
+        shared = depths[index.preorder[block[: stop - start]]]
+
+        out[start: stop] = leaf_depths[start: stop, None] + \
+            leaf_depths[None, :] - 2 * shared
+
+    if path is not None:
+        out.flush()
+
+    return leaves, out
@@ -0,0 +1,407 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: An index over the topology of a tree that is built once and then
+# answers ancestry questions in constant time. An Euler tour with a sparse
+# table gives the lowest common ancestor (LCA) of any two branchpoints,
+# preorder intervals give ancestor tests and the leaves of every clade are
+# stored contiguously so they can be sliced out directly. Traversal orders
+# are also stored so values can be passed up or down the tree one level at
+# a time.
+###############################################################################
+
+import numpy as np
+from numpy.typing import NDArray
+from typing import Union
+
+# labels or tree indices of branchpoints, either one or many
+Nodes = Union[str, int, list, NDArray]
+
+
+class TreeIndex(object):
+    """Constant time queries on the topology of a tree. Branchpoints
+    can be given by ID (e.g. "N57") or by their index on the tree and
+    all queries accept batches, returning NumPy arrays.
+    """
+
+    def __init__(self, parents: list[int], labels: list[str]) -> None:
+        """Constructs instance of TreeIndex.
+
+        Parameters:
+            parents(list[int]): maps the index of the child to the index
+            of the parent, -1 for the root
+
+            labels(list[str]): maps the index on the tree to the ID
+        """
+
+        self.parents = np.asarray(parents, dtype=np.int64)
+        self.labels = np.asarray(labels, dtype=object)
+        self.indices = {lab: i for i, lab in enumerate(labels)}
+
+        n = len(self.parents)
+
+        roots = np.flatnonzero(self.parents == -1)
+
+        if len(roots) != 1:
+            raise RuntimeError(f"Tree must have a single root, found {len(roots)}")
+
+        self.root = int(roots[0])
+
+        # children of each node are stored contiguously, ordered by index
+        has_parent = self.parents >= 0
+        child_nodes = np.flatnonzero(has_parent)
+        child_nodes = child_nodes[np.argsort(self.parents[child_nodes], kind='stable')]
+        counts = np.bincount(self.parents[has_parent], minlength=n)
+
+        self.child_ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.child_ptr[1:])
+        self.child_nodes = child_nodes
+
+        self.isLeaf = counts == 0
+
+        self._buildTour()
+
+        # built by the first LCA query, traversals do not need it
+        self._table = None
+
+        # breadth first order, levelBounds[l] is where level l begins
+        self.levelorder = np.argsort(self.level, kind='stable')
+        self.levelBounds = np.searchsorted(self.level[self.levelorder],
+                                           np.arange(self.level.max() + 2))
+
+        # leaves in preorder, every clade owns a contiguous slice
+        self.leaves = self.preorder[self.isLeaf[self.preorder]]
+        leaf_rank = np.concatenate(
+            ([0], np.cumsum(self.isLeaf[self.preorder])))
+        self.leafStart = leaf_rank[self.tin]
+        self.leafEnd = leaf_rank[self.tout + 1]
+
+    def __str__(self) -> str:
+        return (f"Number of branchpoints: {len(self.parents)}\nNumber of leaves: {len(self.leaves)}\nRoot: {self.labels[self.root]}")
+
+    def _buildTour(self) -> None:
+        '''Single depth first walk recording the preorder, the interval
+        of preorder positions each subtree covers and the Euler tour'''
+
+        n = len(self.parents)
+
+        self.tin = np.zeros(n, dtype=np.int64)
+        self.tout = np.zeros(n, dtype=np.int64)
+        self.level = np.zeros(n, dtype=np.int64)
+
+        preorder = []
+        postorder = []
+        euler = []
+
+        child_ptr = self.child_ptr.tolist()
+        child_nodes = self.child_nodes.tolist()
+        level = self.level
+
+        # stack holds the node and the position of its next child
+        stack = [[self.root, child_ptr[self.root]]]
+        preorder.append(self.root)
+        euler.append(self.root)
+
+        while stack:
+
+            top = stack[-1]
+            node, nxt = top
+
+            if nxt < child_ptr[node + 1]:
+
+                child = child_nodes[nxt]
+                top[1] += 1
+
+                level[child] = level[node] + 1
+                preorder.append(child)
+                euler.append(child)
+                stack.append([child, child_ptr[child]])
+
+            else:
+
+                stack.pop()
+                postorder.append(node)
+                self.tout[node] = len(preorder) - 1
+
+                if stack:
+                    euler.append(stack[-1][0])
+
+        if len(preorder) != n:
+            raise RuntimeError("Tree contains branchpoints unreachable from the root")
+
+        self.preorder = np.array(preorder, dtype=np.int64)
+        self.postorder = np.array(postorder, dtype=np.int64)
+        self.tin[self.preorder] = np.arange(n)
+
+        self.euler = np.array(euler, dtype=np.int64)
+        self.first = np.zeros(n, dtype=np.int64)
+        # reversed so the first occurrence is the value that sticks
+        self.first[self.euler[::-1]] = np.arange(len(self.euler))[::-1]
+
+    @property
+    def table(self) -> list[NDArray[np.int64]]:
+        """table[k][i] is the shallowest node in euler[i: i + 2**k]"""
+
+        if self._table is None:
+            self._buildSparseTable()
+
+        return self._table
+
+    def _buildSparseTable(self) -> None:
+        '''Fills the sparse table over the Euler tour'''
+
+        table = [self.euler]
+
+        k = 1
+        while (1 << k) <= len(self.euler):
+
+            prev = table[-1]
+            half = 1 << (k - 1)
+
+            left = prev[:-half]
+            right = prev[half:]
+
+            table.append(np.where(self.level[left] <= self.level[right],
+                                  left, right))
+            k += 1
+
+        self._table = table
+
+    def levels(self, reverse: bool = False):
+        """Iterates over the branchpoints one level of the tree at a
+        time, starting at the root unless reverse is True.
+        """
+
+        depths = range(len(self.levelBounds) - 1)
+
+        if reverse:
+            depths = reversed(depths)
+
+        for lvl in depths:
+            yield self.levelorder[self.levelBounds[lvl]: self.levelBounds[lvl + 1]]
+
+    def upwardPass(self, values: NDArray, reducer: np.ufunc = np.add) -> NDArray:
+        """Aggregates values from the leaves towards the root. Each
+        branchpoint ends up with its own value reduced with the
+        aggregated values of all of its children, e.g. np.add with
+        a value of one at each leaf gives the size of every clade.
+
+        Parameters:
+            values(np.array): one value (or row of values) per branchpoint
+
+            reducer(np.ufunc): binary ufunc such as np.add, np.maximum
+            or np.bitwise_or
+
+        Returns:
+            np.array: aggregated value of each subtree
+        """
+
+        out = np.array(values, copy=True)
+
+        for nodes in self.levels(reverse=True):
+
+            nodes = nodes[nodes != self.root]
+
+            if len(nodes) > 0:
+                reducer.at(out, self.parents[nodes], out[nodes])
+
+        return out
+
+    def downwardPass(self, values: NDArray, combiner: np.ufunc = np.add) -> NDArray:
+        """Accumulates values from the root towards the leaves. Each
+        branchpoint ends up with the value of its parent combined with
+        its own, e.g. np.add over branch lengths gives root-to-tip depths.
+
+        Parameters:
+            values(np.array): one value (or row of values) per branchpoint
+
+            combiner(np.ufunc): binary ufunc such as np.add or np.maximum
+
+        Returns:
+            np.array: accumulated value along the path from the root
+        """
+
+        out = np.array(values, copy=True)
+
+        for nodes in self.levels():
+
+            nodes = nodes[nodes != self.root]
+
+            if len(nodes) > 0:
+                out[nodes] = combiner(out[self.parents[nodes]], out[nodes])
+
+        return out
+
+    def resolve(self, nodes: Nodes) -> NDArray[np.int64]:
+        """Converts IDs and/or tree indices into an array of tree indices.
+
+        Parameters:
+            nodes(str, int or list): branchpoints to look up
+
+        Returns:
+            np.array: index of each branchpoint on the tree
+        """
+
+        if isinstance(nodes, (str, int, np.integer)):
+            nodes = [nodes]
+
+        if isinstance(nodes, np.ndarray) and nodes.dtype.kind in 'iu':
+            return nodes.astype(np.int64)
+
+        try:
+            return np.array([n if isinstance(n, (int, np.integer))
+                             else self.indices[n] for n in nodes], dtype=np.int64)
+
+        except KeyError as err:
+            raise RuntimeError(f"{err.args[0]} is not a branchpoint in the tree")
+
+    def labelsOf(self, idxs: NDArray) -> NDArray:
+        """Maps tree indices back to the IDs of the branchpoints"""
+
+        return self.labels[idxs]
+
+    def lca(self, a: Nodes, b: Nodes) -> NDArray[np.int64]:
+        """Finds the lowest common ancestor of each pair (a[i], b[i]).
+
+        Parameters:
+            a(list): first branchpoint of each pair
+
+            b(list): second branchpoint of each pair
+
+        Returns:
+            np.array: tree index of the LCA of each pair
+        """
+
+        left = self.first[self.resolve(a)]
+        right = self.first[self.resolve(b)]
+
+        lo = np.minimum(left, right)
+        hi = np.maximum(left, right) + 1
+
+        # two overlapping power of two windows cover [lo, hi)
+        k = np.floor(np.log2(hi - lo)).astype(np.int64)
+
+        out = np.empty(len(lo), dtype=np.int64)
+
+        for level in np.unique(k):
+
+            sel = k == level
+            table = self.table[level]
+
+            x = table[lo[sel]]
+            y = table[hi[sel] - (1 << level)]
+
+            out[sel] = np.where(self.level[x] <= self.level[y], x, y)
+
+        return out
+
+    def mrca(self, nodes: Nodes) -> int:
+        """Finds the most recent common ancestor of a set of branchpoints.
+        Only the first and last of the set in preorder are needed.
+
+        Parameters:
+            nodes(list): branchpoints e.g. a list of extant IDs
+
+        Returns:
+            int: tree index of the common ancestor
+        """
+
+        idxs = self.resolve(nodes)
+
+        if len(idxs) == 0:
+            raise RuntimeError("At least one branchpoint is required")
+
+        order = self.tin[idxs]
+
+        return int(self.lca([idxs[np.argmin(order)]], [idxs[np.argmax(order)]])[0])
+
+    def isAncestor(self, a: Nodes, b: Nodes) -> NDArray[np.bool_]:
+        """Tests if each a[i] is an ancestor of (or equal to) b[i].
+
+        Parameters:
+            a(list): candidate ancestors
+
+            b(list): candidate descendants
+
+        Returns:
+            np.array: True where a[i] is on the path from b[i] to the root
+        """
+
+        a = self.resolve(a)
+        b = self.resolve(b)
+
+        return (self.tin[a] <= self.tin[b]) & (self.tout[b] <= self.tout[a])
+
+    def cladeLeaves(self, node: Union[str, int]) -> NDArray[np.int64]:
+        """All leaves under a branchpoint as tree indices.
+
+        Parameters:
+            node(str or int): root of the clade e.g. "N57"
+
+        Returns:
+            np.array: tree indices of the leaves in preorder
+        """
+
+        idx = self.resolve(node)[0]
+
+        return self.leaves[self.leafStart[idx]: self.leafEnd[idx]]
+
+    def cladeNodes(self, node: Union[str, int]) -> NDArray[np.int64]:
+        """All branchpoints in the clade, including its root, in preorder"""
+
+        idx = self.resolve(node)[0]
+
+        return self.preorder[self.tin[idx]: self.tout[idx] + 1]
+
+    def cladeSize(self, nodes: Nodes) -> NDArray[np.int64]:
+        """Number of leaves under each branchpoint"""
+
+        idxs = self.resolve(nodes)
+
+        return self.leafEnd[idxs] - self.leafStart[idxs]
+
+    def path(self, a: Union[str, int], b: Union[str, int]) -> NDArray[np.int64]:
+        """The branchpoints visited going from a to b through their LCA.
+
+        Parameters:
+            a(str or int): first branchpoint e.g. "N0"
+
+            b(str or int): last branchpoint
+
+        Returns:
+            np.array: tree indices from a to b, inclusive
+        """
+
+        a = int(self.resolve(a)[0])
+        b = int(self.resolve(b)[0])
+        top = int(self.lca([a], [b])[0])
+
+        up = [a]
+        while up[-1] != top:
+            up.append(int(self.parents[up[-1]]))
+
+        down = [b]
+        while down[-1] != top:
+            down.append(int(self.parents[down[-1]]))
+
+        return np.array(up + down[-2::-1], dtype=np.int64)
+
+
+def indexFromJSON(serial: dict) -> TreeIndex:
+    """Creates a TreeIndex from the JSON form of an IdxTree
+    e.g. the output of parsers.nwkToJSON()
+
+    Parameters:
+        serial(dict): JSON form of an IdxTree
+
+    Returns:
+        TreeIndex
+    """
+
+    # parsers imports pog_tree, which imports this module
+    from . import parsers
+
+    labels = [parsers.make_anc_label(serial["Labels"], i)
+              for i in range(serial["Branchpoints"])]
+
+    return TreeIndex(serial["Parents"], labels)
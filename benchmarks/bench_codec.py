@@ -0,0 +1,61 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Compares the JSON backends available to GRASPy.codec on the bundled
+# example outputs. Run from the top of the repository with
+# python benchmarks/bench_codec.py [files...]
+###############################################################################
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from GRASPy import codec
+
+DEFAULT_FILES = ["example_data/joint_recon/ASR_big.json"]
+
+
+def bench(raw: bytes, repeat: int, number: int) -> list[tuple[str, str, float]]:
+    '''Best time per call for decoding and encoding with every backend'''
+
+    rows = []
+
+    for backend in codec.BACKENDS:
+
+        for arrays in (False, True):
+            t = min(timeit.repeat(lambda: codec.loads(raw, backend, arrays),
+                                  repeat=repeat, number=number)) / number
+            rows.append((backend, "loads(arrays=True)" if arrays else "loads", t))
+
+        obj = codec.loads(raw, backend)
+        t = min(timeit.repeat(lambda: codec.dumps(obj, backend),
+                              repeat=repeat, number=number)) / number
+        rows.append((backend, "dumps", t))
+
+    return rows
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Compare the GRASPy JSON backends")
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    for file_name in args.files:
+
+        with open(file_name, 'rb') as f:
+            raw = f.read()
+
+        print(f"{file_name} ({len(raw) / 1e6:.1f} MB)")
+
+        for backend, op, t in bench(raw, args.repeat, args.number):
+            print(f"  {backend:<8}{op:<20}{t * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
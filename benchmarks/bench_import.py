@@ -0,0 +1,142 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Tracks the start up cost of GRASPy. Each scenario is run in a fresh
+# interpreter with python -X importtime and the time spent importing every
+# module is added up. The run fails if a scenario loads a module it should
+# not (e.g. pandas for a status request) or is slower than its baseline,
+# scaled by the calibration workload of run_benchmarks.py, by more than the
+# threshold in baselines.json.
+#
+# python benchmarks/bench_import.py            compare with baselines
+# python benchmarks/bench_import.py --update   store new baselines
+###############################################################################
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+sys.path.insert(0, ROOT)
+
+from benchmarks import run_benchmarks
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# name -> (code to run, modules that must not be imported)
+SCENARIOS = {
+    "import": ("import GRASPy", ["numpy", "pandas"]),
+    "status": ("import GRASPy; GRASPy.JobStatus", ["numpy", "pandas"]),
+    "parsers": ("import GRASPy; GRASPy.nwkToJSON", ["pandas"]),
+    "tables": ("import GRASPy; GRASPy.treeTables", []),
+}
+
+DEFAULT_THRESHOLD = 2.0
+
+
+def importTimes(code: str) -> dict[str, int]:
+    """Runs code in a new interpreter with -X importtime.
+
+    Parameters:
+        code(str): Python statements to run
+
+    Returns:
+        dict: microseconds spent importing each module, not counting
+        the modules it imports
+    """
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+
+    times = {}
+
+    for line in result.stderr.splitlines():
+
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, _, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(self_us)
+
+    return times
+
+
+def measure(code: str, repeat: int) -> dict:
+    """Fastest total import time of repeat runs and the modules loaded"""
+
+    runs = [importTimes(code) for _ in range(repeat)]
+    best = min(runs, key=lambda t: sum(t.values()))
+
+    slowest = sorted(best, key=best.get, reverse=True)[:5]
+
+    return {"seconds": sum(best.values()) / 1e6, "modules": sorted(best),
+            "slowest": {name: best[name] for name in slowest}}
+
+
+def main() -> int:
+
+    parser = argparse.ArgumentParser(description="Benchmark the import time of GRASPy")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--update", action="store_true",
+                        help="store the results as the new baselines")
+    parser.add_argument("--baselines", default=BASELINES)
+    args = parser.parse_args()
+
+    stored = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            stored = json.load(f)
+
+    threshold = stored.get("thresholds", {}).get("import_seconds", DEFAULT_THRESHOLD)
+    baselines = stored.get("import", {})
+
+    failed = []
+    results = {}
+
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        run_benchmarks.calibrate()
+        times.append(time.perf_counter() - start)
+
+    results[run_benchmarks.CALIBRATION] = {"seconds": min(times)}
+    ratio = run_benchmarks.speedRatio(results, baselines)
+
+    for name, (code, forbidden) in SCENARIOS.items():
+
+        now = measure(code, args.repeat)
+        results[name] = {"seconds": now["seconds"]}
+
+        print(f"{name:<10}{now['seconds'] * 1e3:10.1f} ms   slowest: "
+              + ", ".join(f"{m} {us / 1e3:.1f} ms" for m, us in now["slowest"].items()))
+
+        for module in forbidden:
+            if module in now["modules"]:
+                failed.append(f"{name}: imports {module}")
+
+        base = baselines.get(name)
+        if base is not None and now["seconds"] > base["seconds"] * ratio * threshold:
+            failed.append(f"{name}: {now['seconds'] * 1e3:.1f} ms, "
+                          f"baseline {base['seconds'] * ratio * 1e3:.1f} ms")
+
+    if args.update:
+
+        stored.setdefault("thresholds", {})["import_seconds"] = threshold
+        stored["import"] = results
+
+        with open(args.baselines, 'w') as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    for message in failed:
+        print(f"REGRESSION {message}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Seeded generators of synthetic inputs for the benchmarks. Trees are
+# written as nwk strings, alignments as FASTA files, trait data as CSV and
+# joint reconstructions as server style JSON scaled up from ASR_big.json.
+# The same seed always gives the same input.
+###############################################################################
+
+import copy
+import json
+import os
+import numpy as np
+
+ASR_BIG = os.path.join(os.path.dirname(__file__), '..', 'example_data',
+                       'joint_recon', 'ASR_big.json')
+
+PROTEIN = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def _distances(rng: np.random.Generator, n: int) -> list[str]:
+    '''Random branch lengths formatted for a nwk string'''
+
+    return [f"{d:.4f}" for d in rng.uniform(0.01, 1.0, n)]
+
+
+def balancedNwk(n_leaves: int, seed: int = 0) -> str:
+    """A nwk string for a tree where every ancestor splits its leaves in
+    half, so the depth grows with log(n_leaves).
+
+    Parameters:
+        n_leaves(int): number of extants, at least 2
+
+        seed(int): seeds the branch lengths
+
+    Returns:
+        str: nwk string with extants named S0, S1, ...
+    """
+
+    rng = np.random.default_rng(seed)
+    dists = iter(_distances(rng, 2 * n_leaves))
+
+    # merge neighbouring subtrees until one is left
+    level = [f"S{i}:{next(dists)}" for i in range(n_leaves)]
+
+    while len(level) > 1:
+
+        merged = [f"({level[i]},{level[i + 1]}):{next(dists)}"
+                  for i in range(0, len(level) - 1, 2)]
+
+        if len(level) % 2 == 1:
+            merged.append(level[-1])
+
+        level = merged
+
+    # the root has no branch length
+    return level[0].rsplit(':', 1)[0] + ";"
+
+
+def caterpillarNwk(n_leaves: int, seed: int = 0) -> str:
+    """A nwk string for a tree where every ancestor has one extant
+    child, so the depth grows with n_leaves.
+
+    Parameters:
+        n_leaves(int): number of extants, at least 2
+
+        seed(int): seeds the branch lengths
+
+    Returns:
+        str: nwk string with extants named S0, S1, ...
+    """
+
+    rng = np.random.default_rng(seed)
+    dists = _distances(rng, 2 * n_leaves)
+
+    nwk = f"S{n_leaves - 1}:{dists[0]}"
+
+    for i in range(n_leaves - 2, -1, -1):
+        nwk = f"(S{i}:{dists[2 * i + 1]},{nwk}):{dists[2 * i + 2]}"
+
+    return nwk.rsplit(':', 1)[0] + ";"
+
+
+def alignment(n_seqs: int, width: int, seed: int = 0,
+              gap_rate: float = 0.1) -> list[tuple[str, str]]:
+    """Random aligned protein sequences. Wide alignments have few long
+    sequences and tall alignments many short ones.
+
+    Parameters:
+        n_seqs(int): number of sequences
+
+        width(int): number of columns
+
+        seed(int): seeds the residues and gaps
+
+        gap_rate(float): chance of a gap at each position
+
+    Returns:
+        list: (name, gapped sequence) for each sequence
+    """
+
+    rng = np.random.default_rng(seed)
+
+    letters = np.frombuffer((PROTEIN + '-').encode(), dtype=np.uint8)
+
+    codes = rng.integers(0, len(PROTEIN), size=(n_seqs, width))
+    codes[rng.random((n_seqs, width)) < gap_rate] = len(PROTEIN)
+
+    rows = letters[codes]
+
+    return [(f"S{i}", rows[i].tobytes().decode()) for i in range(n_seqs)]
+
+
+def writeFasta(file_name: str, seqs: list[tuple[str, str]]) -> None:
+    """Writes (name, sequence) pairs with 60 residues per line"""
+
+    with open(file_name, 'w') as f:
+        for name, seq in seqs:
+            lines = [seq[i: i + 60] for i in range(0, len(seq), 60)]
+            f.write(f">{name}\n" + '\n'.join(lines) + '\n')
+
+
+def writeTraitCsv(file_name: str, n_rows: int, max_obs: int = 3,
+                  seed: int = 0) -> None:
+    """Writes a "Headers"/"Data" CSV for csvDataToJSON() with between
+    zero and max_obs whitespace separated observations per row."""
+
+    rng = np.random.default_rng(seed)
+
+    n_obs = rng.integers(0, max_obs + 1, n_rows)
+    values = np.round(rng.normal(5.0, 2.0, int(n_obs.sum())), 3).astype(str)
+
+    with open(file_name, 'w') as f:
+
+        f.write("Headers,Data\n")
+
+        start = 0
+        for i, n in enumerate(n_obs):
+            f.write(f"S{i},{' '.join(values[start: start + n])}\n")
+            start += n
+
+
+def scaledReconstruction(copies: int) -> dict:
+    """The joint reconstruction in ASR_big.json repeated copies times.
+    The copies of the tree are joined under a new root and every extant
+    and ancestor POGraph is renamed to match its copy.
+
+    Parameters:
+        copies(int): number of copies of the tree and its POGraphs
+
+    Returns:
+        dict: in the same format as ASR_big.json
+    """
+
+    with open(ASR_BIG) as f:
+        base = json.load(f)
+
+    tree = base["Input"]["Tree"]
+    n = tree["Branchpoints"]
+
+    ancestors = {lab for lab in tree["Labels"] if lab.isdigit()}
+    n_anc = len(ancestors)
+
+    def rename(name: str, c: int) -> str:
+        # ancestors are numbered after the new root, extants get a suffix
+        return str(int(name) + 1 + c * n_anc) if name in ancestors else f"{name}_{c}"
+
+    labels, parents, dists = ["0"], [-1], [0.0]
+
+    for c in range(copies):
+        labels += [rename(lab, c) for lab in tree["Labels"]]
+        parents += [0 if p == -1 else p + 1 + c * n for p in tree["Parents"]]
+        dists += tree["Distances"]
+
+    scaled = copy.deepcopy(base)
+
+    scaled["Input"]["Tree"] = {"Parents": parents, "Labels": labels,
+                               "Distances": dists, "Branchpoints": len(labels)}
+
+    scaled["Ancestors"] = [dict(g, Name=rename(g["Name"], c)) for c in range(copies)
+                           for g in base["Ancestors"]]
+    scaled["Input"]["Extants"] = [dict(g, Name=rename(g["Name"], c)) for c in range(copies)
+                                  for g in base["Input"]["Extants"]]
+
+    return scaled
@@ -0,0 +1,246 @@
+###############################################################################
+# Date: 19/10/26
+# Author: Sebastian Porras
+# Aims: Times the parsing stages of GRASPy on synthetic inputs and compares
+# the results with stored baselines. Each stage is timed (best of a few
+# runs) and its peak memory is measured in a separate traced run. Timings
+# are compared relative to a fixed calibration workload timed in the same
+# run, so that baselines stored on one machine hold on another. The run
+# fails when a stage is slower or uses more memory than its baseline by
+# more than the configured threshold.
+#
+# python benchmarks/run_benchmarks.py                 compare with baselines
+# python benchmarks/run_benchmarks.py --update        store new baselines
+# python benchmarks/run_benchmarks.py --profile full  1k - 1M leaf trees
+###############################################################################
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks import generators
+from GRASPy import instrument
+from GRASPy import parsers
+from GRASPy import sequence
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# sizes used by each profile
+PROFILES = {
+    "quick": {"leaves": [1000], "caterpillar": [500], "wide": (10, 20000),
+              "tall": (2000, 300), "csv": [100000], "copies": [4]},
+    "full": {"leaves": [1000, 10000, 100000, 1000000], "caterpillar": [1000, 10000],
+             "wide": (100, 1000000), "tall": (1000000, 300), "csv": [1000000, 5000000],
+             "copies": [40, 400]},
+}
+
+# a stage regresses when it is this many times its baseline, timings
+# below min_seconds are too noisy to compare
+DEFAULT_THRESHOLDS = {"seconds": 2.0, "peak_bytes": 1.5, "min_seconds": 0.01}
+
+# stage that measures the speed of the machine rather than of GRASPy
+CALIBRATION = "calibration"
+
+
+def calibrate() -> None:
+    """A fixed workload of the kind the parsers do (building, encoding,
+    decoding and sorting small Python objects), timed with every run
+    to scale the baselines to the machine."""
+
+    data = [{"Name": f"S{i}", "Values": list(range(i % 50))} for i in range(20000)]
+
+    json.loads(json.dumps(data))
+
+    sorted(str(i)[::-1] for i in range(200000))
+
+
+def speedRatio(results: dict, baselines: dict) -> float:
+    """How many times slower this machine is than the one that stored the
+    baselines, 1.0 if either run has no calibration stage"""
+
+    if CALIBRATION not in results or CALIBRATION not in baselines:
+        return 1.0
+
+    return results[CALIBRATION]["seconds"] / baselines[CALIBRATION]["seconds"]
+
+
+def _treeStages(kind: str, n: int) -> list:
+    '''Stages parsing one synthetic tree'''
+
+    nwk = generators.balancedNwk(n) if kind == "balanced" else generators.caterpillarNwk(n)
+
+    # nwk_split() recurses once per ancestor
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * n + 1000))
+
+    j_tree = parsers.nwkToJSON(nwk)
+
+    return [(f"nwkToJSON/{kind}/{n}", lambda: parsers.nwkToJSON(nwk)),
+            (f"TreeFromJSON/{kind}/{n}", lambda: parsers.TreeFromJSON(j_tree))]
+
+
+def buildStages(profile: dict, tmp: str) -> list:
+    """Generates the inputs of every stage.
+
+    Parameters:
+        profile(dict): sizes, see PROFILES
+
+        tmp(str): directory for generated files
+
+    Returns:
+        list: (stage name, function to time)
+    """
+
+    stages = [(CALIBRATION, calibrate)]
+
+    for n in profile["leaves"]:
+        stages += _treeStages("balanced", n)
+
+    for n in profile["caterpillar"]:
+        stages += _treeStages("caterpillar", n)
+
+    for shape in ("wide", "tall"):
+
+        n_seqs, width = profile[shape]
+        path = os.path.join(tmp, f"{shape}.fa")
+        generators.writeFasta(path, generators.alignment(n_seqs, width))
+
+        stages.append((f"readFastaFile/{shape}/{n_seqs}x{width}",
+                       lambda path=path: sequence.readFastaFile(path, gappy=True)))
+
+    for n in profile["csv"]:
+
+        path = os.path.join(tmp, f"traits_{n}.csv")
+        generators.writeTraitCsv(path, n)
+
+        stages.append((f"csvDataToJSON/{n}",
+                       lambda path=path: parsers.csvDataToJSON(path, as_array=True)))
+
+    for copies in profile["copies"]:
+
+        recon = generators.scaledReconstruction(copies)
+
+        stages.append((f"POGraphFromJSON/{copies}x",
+                       lambda recon=recon: parsers.POGTreeFromJointReconstruction(
+                           {"Result": recon["Input"]}, {"Result": recon})))
+
+    return stages
+
+
+def measure(func, repeat: int) -> dict:
+    """Best time of repeat runs and the peak memory of one traced run"""
+
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    sink = instrument.MemorySink()
+    instrument.enable(sink, memory=True)
+
+    try:
+        with instrument.span("stage"):
+            func()
+    finally:
+        instrument.disable()
+
+    return {"seconds": min(times), "peak_bytes": sink.spans("stage")[0]["peak_bytes"]}
+
+
+def regressions(results: dict, baselines: dict, thresholds: dict) -> list[str]:
+    """Describes every stage that is worse than its baseline. Baseline
+    timings are first scaled by speedRatio().
+
+    Parameters:
+        results(dict): stage -> measurements
+
+        baselines(dict): stage -> stored measurements
+
+        thresholds(dict): allowed ratios, see DEFAULT_THRESHOLDS
+
+    Returns:
+        list[str]: one message per regression
+    """
+
+    failed = []
+
+    ratio = speedRatio(results, baselines)
+
+    for stage, now in results.items():
+
+        base = baselines.get(stage)
+        if base is None or stage == CALIBRATION:
+            continue
+
+        seconds = base["seconds"] * ratio
+
+        if now["seconds"] > thresholds["min_seconds"] and \
+                now["seconds"] > seconds * thresholds["seconds"]:
+            failed.append(f"{stage}: {now['seconds']:.3f}s, baseline {seconds:.3f}s")
+
+        if now["peak_bytes"] > base["peak_bytes"] * thresholds["peak_bytes"]:
+            failed.append(f"{stage}: {now['peak_bytes']} bytes, baseline {base['peak_bytes']} bytes")
+
+    return failed
+
+
+def main() -> int:
+
+    parser = argparse.ArgumentParser(description="Benchmark the GRASPy parsers")
+    parser.add_argument("--profile", choices=list(PROFILES), default="quick")
+    parser.add_argument("--stages", default=".*", help="regex of stages to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--update", action="store_true",
+                        help="store the results as the new baselines")
+    parser.add_argument("--baselines", default=BASELINES)
+    args = parser.parse_args()
+
+    stored = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            stored = json.load(f)
+
+    thresholds = dict(DEFAULT_THRESHOLDS, **stored.get("thresholds", {}))
+
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        for stage, func in buildStages(PROFILES[args.profile], tmp):
+
+            if not re.search(args.stages, stage):
+                continue
+
+            results[stage] = measure(func, args.repeat)
+
+            print(f"{stage:<40}{results[stage]['seconds']:10.4f} s"
+                  f"{results[stage]['peak_bytes'] / 1e6:12.1f} MB")
+
+    if args.update:
+
+        stored["thresholds"] = thresholds
+        stored.setdefault(args.profile, {}).update(results)
+
+        with open(args.baselines, 'w') as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+        return 0
+
+    failed = regressions(results, stored.get(args.profile, {}), thresholds)
+
+    for message in failed:
+        print(f"REGRESSION {message}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import pytest
+import json
+import socketserver
+import threading
+import GRASPy as gp
+from GRASPy import pog_tree
+from GRASPy import router
+
+# a small tree and an alignment of its extants
+NWK = "((A:0.1,B:0.2):0.3,(C:0.1,D:0.2):0.4);"
+
+ALN = ">A\nAC-GT\n>B\nACAGT\n>C\nAC--T\n>D\nTCAGA\n"
+
+
+class StandIn(socketserver.ThreadingTCPServer):
+    """A stand-in for a bnkit server that queues every job it is sent"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, name, queued=0):
+
+        super().__init__(("127.0.0.1", 0), Handler)
+
+        self.name = name
+        self.jobs = {i: "Queued" for i in range(1, queued + 1)}
+        self.requests = {}
+        self.received = []
+        self.results = {}
+        self.reconstruct = None
+        # status given to new jobs, only "Queued" jobs have an output
+        self.status = "Queued"
+        self.lock = threading.Lock()
+
+
+class Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+
+        server = self.server
+        request = json.loads(self.rfile.readline())
+        server.received.append(request)
+
+        command = request["Command"]
+
+        if command == "Status" and "Job" not in request:
+            response = {"Jobs": [{"Job": j, "Status": s} for j, s in server.jobs.items()]}
+
+        elif command in router.JOB_COMMANDS:
+            with server.lock:
+                job = len(server.jobs) + 1
+                server.jobs[job] = server.status
+                server.requests[job] = request
+            response = {"Message": "Queued", "Job": job}
+
+        elif command == "Output" and server.jobs.get(request["Job"]) != "Queued":
+            response = {"Job": request["Job"], "Message": "Job is not complete"}
+
+        elif command == "Output":
+            job = request["Job"]
+            params = server.requests.get(job, {}).get("Params", {})
+            result = server.results.get(job, {"Server": server.name,
+                                              "Ancestor": params.get("Ancestor")})
+            if server.reconstruct is not None and job not in server.results:
+                result = server.reconstruct(params)
+            response = {"Job": job, "Result": result}
+
+        elif request["Job"] not in server.jobs:
+            response = {"Error": f"Job {request['Job']} does not exist"}
+
+        else:
+            response = {"Job": request["Job"], "Status": server.jobs[request["Job"]]}
+
+        self.wfile.write(json.dumps(response).encode())
+
+
+@pytest.fixture
+def write(tmp_path):
+    """Writes text to a file in tmp_path and returns its path"""
+
+    def write(name, text):
+
+        path = tmp_path / name
+        path.write_text(text)
+
+        return str(path)
+
+    return write
+
+
+@pytest.fixture
+def files(write):
+    """Paths of ALN and NWK, modules with their own inputs override this"""
+
+    return write("aln.fa", ALN), write("tree.nwk", NWK)
+
+
+def _linearGraph(name, seq):
+    '''Builds the JSON of a linear POGraph, gaps are left out of the graph'''
+
+    indices = [i for i, s in enumerate(seq) if s != '-']
+
+    return {"Name": name, "Indices": indices,
+            "Adjacent": [[j] for j in indices[1:]] + [[]],
+            "Nodes": [{"Value": seq[i]} for i in indices],
+            "GRASP_version": "test", "Starts": [indices[0]], "Ends": [indices[-1]],
+            "Size": len(seq), "Terminated": True, "Directed": True}
+
+
+@pytest.fixture
+def pog_seqs():
+    """Sequence of each branchpoint of the tree built by make_tree"""
+
+    return {'N0': 'ACDE', 'N1': 'ACD-', 'A': 'AKD-', 'B': 'ACDW', 'C': 'GCDE'}
+
+
+@pytest.fixture
+def make_tree():
+    """Builds a POGTree over ((A,B)N1,C)N0 with a linear POGraph for
+    each sequence given"""
+
+    def make_tree(seqs):
+
+        tree = gp.TreeFromJSON({'Parents': [-1, 0, 1, 1, 0], 'Labels': ['0', '1', 'A', 'B', 'C'],
+                                'Distances': [0.0, 0.3, 1.2, 1.0, 2.5], 'Branchpoints': 5})
+
+        graphs = {name: gp.POGraphFromJSON(_linearGraph(name, s))
+                  for name, s in seqs.items()}
+
+        return pog_tree.POGTree(POGraphs=graphs, **tree)
+
+    return make_tree
+
+
+@pytest.fixture
+def servers():
+
+    stand_ins = [StandIn("a", queued=2), StandIn("b", queued=0), StandIn("c", queued=1)]
+
+    for s in stand_ins:
+        threading.Thread(target=s.serve_forever, daemon=True).start()
+
+    yield stand_ins
+
+    for s in stand_ins:
+        s.shutdown()
+        s.server_close()
@@ -0,0 +1,72 @@
+import pytest
+import GRASPy as gp
+from GRASPy import client
+from GRASPy import router
+
+from .conftest import NWK
+
+CSV_DATA = "Headers,Data\nA,1.0\nB,2.0 3.0\nC,\nD,4.0\n"
+
+
+@pytest.fixture
+def inputs(files, write):
+
+    return files[1], write("data.csv", CSV_DATA)
+
+
+@pytest.mark.parametrize("ancestors, clade, expected", [
+    (None, None, [0, 1, 2]),
+    ([2, 0], None, [2, 0]),
+    (None, "N1", [1]),
+    (None, ["C", "D"], [2]),
+])
+def test_MarginaliseDistOnAncestors(servers, inputs, ancestors, clade, expected):
+
+    nwk, csv = inputs
+
+    with client.endpoint(*servers[1].server_address):
+        table = gp.MarginaliseDistOnAncestors(nwk, ["A", "B"], csv, {"Means": [0.5]},
+                                              ancestors=ancestors, clade=clade)
+
+    assert table.index.name == "Ancestor"
+    assert table.index.tolist() == expected
+
+    sent = {r["Params"]["Ancestor"]: r for r in servers[1].received}
+    assert sorted(sent) == sorted(expected)
+
+    # the shared part of every request is the same as a single request
+    for anc, request in sent.items():
+        params = request["Params"]
+        assert request["Command"] == "Infer"
+        assert params["Tree"] == gp.nwkToJSON(NWK)
+        assert params["Dataset"]["Data"] == [[1.0, None], [2.0, 3.0],
+                                             [None, None], [4.0, None]]
+        assert params["Distrib"] == {"Means": [0.5]}
+
+
+def test_MarginaliseDistOnAncestors_router(servers, inputs):
+
+    nwk, csv = inputs
+
+    with router.Router([s.server_address for s in servers]):
+        table = gp.MarginaliseDistOnAncestors(nwk, ["A", "B"], csv, {}, max_workers=3,
+                                              wait=True, poll=0.01)
+
+    assert [r["Ancestor"] for r in table["Result"]] == [0, 1, 2]
+
+
+@pytest.mark.parametrize("status, message", [
+    ("Failed", "Failed"),
+    ("Cancelled", "Cancelled"),
+    ("Running", "did not finish"),
+])
+def test_MarginaliseDistOnAncestors_unfinished(servers, inputs, status, message):
+
+    nwk, csv = inputs
+
+    servers[1].status = status
+
+    with client.endpoint(*servers[1].server_address):
+        with pytest.raises(RuntimeError, match=message):
+            gp.MarginaliseDistOnAncestors(nwk, ["A", "B"], csv, {}, ancestors=[0],
+                                          wait=True, poll=0.01, timeout=0.1)
@@ -0,0 +1,47 @@
+import pytest
+import GRASPy as gp
+from benchmarks import generators
+from benchmarks import run_benchmarks
+
+
+@pytest.mark.parametrize("make, n", [
+    (generators.balancedNwk, 7),
+    (generators.caterpillarNwk, 5),
+])
+def test_tree_generators(make, n):
+
+    assert make(n, seed=1) == make(n, seed=1)
+
+    j_tree = gp.nwkToJSON(make(n))
+
+    assert j_tree["Branchpoints"] == 2 * n - 1
+    assert sum(not lab.isdigit() for lab in j_tree["Labels"]) == n
+
+
+def test_regressions():
+
+    base = {"a": {"seconds": 1.0, "peak_bytes": 100},
+            "b": {"seconds": 0.001, "peak_bytes": 100}}
+
+    now = {"a": {"seconds": 2.5, "peak_bytes": 100},
+           "b": {"seconds": 0.005, "peak_bytes": 200},
+           "c": {"seconds": 9.0, "peak_bytes": 999}}
+
+    failed = run_benchmarks.regressions(now, base, run_benchmarks.DEFAULT_THRESHOLDS)
+
+    assert failed == ["a: 2.500s, baseline 1.000s", "b: 200 bytes, baseline 100 bytes"]
+
+
+def test_regressions_calibrated():
+
+    base = {"calibration": {"seconds": 0.1}, "a": {"seconds": 1.0, "peak_bytes": 100}}
+
+    # a machine three times slower is not a regression
+    now = {"calibration": {"seconds": 0.3}, "a": {"seconds": 3.5, "peak_bytes": 100}}
+
+    assert run_benchmarks.regressions(now, base, run_benchmarks.DEFAULT_THRESHOLDS) == []
+
+    now["a"]["seconds"] = 6.5
+
+    assert run_benchmarks.regressions(now, base, run_benchmarks.DEFAULT_THRESHOLDS) == \
+        ["a: 6.500s, baseline 3.000s"]
@@ -0,0 +1,48 @@
+import pytest
+import numpy as np
+import GRASPy as gp
+from GRASPy import codec
+from GRASPy import export
+
+ASR = "example_data/joint_recon/ASR_big.json"
+
+
+@pytest.mark.parametrize("backend", codec.BACKENDS)
+def test_roundtrip(backend):
+
+    obj = {"Command": "Output", "Job": 3, "Data": np.array([[1.0, np.nan]]),
+           "Index": np.int64(4)}
+
+    assert codec.loads(codec.dumps(obj, backend), backend) == \
+        {"Command": "Output", "Job": 3, "Data": [[1.0, None]], "Index": 4}
+
+
+def test_setBackend():
+
+    current = codec.getBackend()
+
+    codec.setBackend("json")
+    assert codec.getBackend() == "json"
+
+    with pytest.raises(RuntimeError):
+        codec.setBackend("missing")
+
+    codec.setBackend(current)
+
+
+@pytest.mark.parametrize("backend", codec.BACKENDS)
+def test_load_arrays(backend):
+
+    d = codec.load(ASR, backend, arrays=True)
+
+    anc = d["Ancestors"][0]
+    assert isinstance(anc["Indices"], np.ndarray)
+    assert anc["Edgeindices"].shape[1] == 2
+    assert isinstance(anc["Adjacent"], list)
+
+    plain = codec.load(ASR, "json")
+
+    tree = gp.POGTreeFromJointReconstruction({'Result': d['Input']}, {'Result': d})
+    ref = gp.POGTreeFromJointReconstruction({'Result': plain['Input']}, {'Result': plain})
+
+    assert export.treeTables(tree)[0].equals(export.treeTables(ref)[0])
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+from GRASPy import export
+
+
+def test_treeTables(make_tree, pog_seqs):
+
+    edges, nodes = export.treeTables(make_tree(pog_seqs))
+
+    assert list(edges.columns) == export.EDGE_COLUMNS
+    assert edges.groupby("Graph", observed=True).size().to_dict() == \
+        {'N0': 4, 'N1': 3, 'A': 3, 'B': 4, 'C': 4}
+    assert nodes[nodes.Graph == 'A'][["Column", "Symbol"]].values.tolist() == \
+        [[0, 'A'], [1, 'K'], [2, 'D']]
+
+
+def test_writeTreeTables(tmp_path, make_tree, pog_seqs):
+
+    tree = make_tree(pog_seqs)
+    prefix = str(tmp_path / "tree")
+
+    files = export.writeTreeTables(tree, prefix, chunk_size=2)
+
+    assert files == [prefix + "_edges.csv", prefix + "_nodes.csv"]
+    assert len(pd.read_csv(files[0])) == len(export.treeTables(tree)[0])
+
+    files = export.writeTreeTables(tree, prefix, fmt="npz", chunk_size=3)
+
+    assert sum(len(np.load(f)["Start"]) for f in files if "edges" in f) == 18
@@ -0,0 +1,122 @@
+import pytest
+import gzip
+import os
+import GRASPy as gp
+from GRASPy import fasta_index
+
+ALIGNMENTS = ["./tests/files/aln_dna.fa", "./tests/files/aln_protein.fa",
+              "./tests/files/aln_rna.fa"]
+
+SEQS = {"A": "ACGT-ACGTA" * 13, "B": "--GTTACG" * 7, "sp|P1|C": "ACG"}
+
+
+def write(path, width, line_end='\n'):
+
+    text = ''
+    for name, seq in SEQS.items():
+        text += f">{name} some info{line_end}"
+        for i in range(0, len(seq), width):
+            text += seq[i: i + width] + line_end
+
+    path.write_bytes(text.encode())
+
+    return str(path)
+
+
+@pytest.mark.parametrize("file_name", ALIGNMENTS)
+def test_fetch_matches_readFastaFile(tmp_path, file_name):
+
+    copy = tmp_path / "aln.fa"
+    copy.write_bytes(open(file_name, 'rb').read())
+
+    seqs = gp.readFastaFile(str(copy), gappy=True)
+
+    with gp.FastaIndex(str(copy)) as index:
+
+        assert index.names == [s.name for s in seqs]
+
+        for s in seqs:
+            assert index.fetch(s.name) == ''.join(s.sequence)
+            assert index.fetch(s.name, 2, 7) == ''.join(s.sequence[2:7])
+
+
+@pytest.mark.parametrize("width", [1, 7, 60, 1000])
+@pytest.mark.parametrize("line_end", ['\n', '\r\n'])
+@pytest.mark.parametrize("start,end", [(0, None), (0, 1), (5, 66), (59, 61), (64, 200)])
+def test_fetch_columns(tmp_path, width, line_end, start, end):
+
+    path = write(tmp_path / "aln.fa", width, line_end)
+
+    with fasta_index.FastaIndex(path) as index:
+
+        assert "P1" in index and len(index) == 3
+
+        for name, seq in zip(index.names, SEQS.values()):
+            assert index.fetch(name, start, end) == seq[start: end]
+
+
+def test_irregular_lines(tmp_path):
+
+    path = tmp_path / "aln.fa"
+    path.write_text(">A\nACG\nTTTTT\nA C\n>B\nAC\nGT\n\nT\n>C\nACGT*\n")
+
+    with fasta_index.FastaIndex(str(path)) as index:
+
+        assert index.linebases == [0, 0, 0]
+        assert [index.fetch(n) for n in "ABC"] == ["ACGTTTTTAC", "ACGTT", "ACGT"]
+        assert index.fetch("A", 2, 5) == "GTT"
+
+
+def test_index_reused_and_rebuilt(tmp_path, monkeypatch):
+
+    path = write(tmp_path / "aln.fa", 60)
+
+    with fasta_index.FastaIndex(path):
+        pass
+
+    assert os.path.exists(fasta_index.indexPath(path))
+
+    def build(self):
+        raise AssertionError("index was rebuilt")
+
+    # a stored index is read instead of the FASTA file
+    with monkeypatch.context() as m:
+        m.setattr(fasta_index.FastaIndex, "_build", build)
+        with fasta_index.FastaIndex(path) as index:
+            assert index.fetch("P1") == "ACG"
+
+    # changing the file invalidates the index
+    with open(path, 'a') as f:
+        f.write(">D\nTTT\n")
+
+    with fasta_index.FastaIndex(path) as index:
+        assert index.names[-1] == "D" and index.fetch("D") == "TTT"
+
+
+def test_readFastaRecords(tmp_path):
+
+    path = write(tmp_path / "aln.fa", 60)
+
+    seqs = gp.readFastaRecords(path, ["B", "A"], 0, 4)
+
+    assert [s.name for s in seqs] == ["B", "A"]
+    assert [''.join(s.sequence) for s in seqs] == ["--GT", "ACGT"]
+
+
+def test_errors(tmp_path):
+
+    path = tmp_path / "aln.fa.gz"
+    path.write_bytes(gzip.compress(b">A\nACGT\n"))
+
+    with pytest.raises(RuntimeError):
+        fasta_index.FastaIndex(str(path))
+
+    path = tmp_path / "dup.fa"
+    path.write_text(">A\nACGT\n>A\nACGT\n")
+
+    with pytest.raises(RuntimeError):
+        fasta_index.FastaIndex(str(path))
+
+    with fasta_index.FastaIndex(write(tmp_path / "aln.fa", 60)) as index:
+        with pytest.raises(RuntimeError):
+            index.fetch("missing")
@@ -0,0 +1,54 @@
+import pytest
+import bz2
+import gzip
+import lzma
+import GRASPy as gp
+from GRASPy import inputs
+
+COMPRESS = {"gzip": gzip.compress, "bz2": bz2.compress, "xz": lzma.compress}
+
+NWK = "((A:0.1,B:0.2)\n:0.3,(C:0.1,D:0.2):0.4);\n"
+
+CSV_DATA = "Headers,Data\nA,7.0 3.3\nB,\nC,2\n"
+
+
+def write(path, data, kind):
+
+    if kind is not None:
+        data = COMPRESS[kind](data)
+
+    path.write_bytes(data)
+
+    return str(path)
+
+
+@pytest.mark.parametrize("kind", [None, "gzip", "bz2", "xz"])
+def test_detectCompression(tmp_path, kind):
+
+    path = write(tmp_path / "file", b">A\nATG\n", kind)
+
+    assert inputs.detectCompression(path) == kind
+
+    with inputs.openInput(path, 'rb') as f:
+        assert f.read() == b">A\nATG\n"
+
+
+@pytest.mark.parametrize("kind", [None, "gzip", "bz2", "xz"])
+def test_parsers(tmp_path, kind):
+
+    # misleading extensions, formats are found from the content
+    with open("tests/files/aln_dna.fa", 'rb') as f:
+        aln = write(tmp_path / "aln.txt", f.read(), kind)
+
+    nwk = write(tmp_path / "tree.txt", NWK.encode(), kind)
+    csv = write(tmp_path / "data.txt", CSV_DATA.encode(), kind)
+
+    assert gp.alnToJSON(aln) == gp.alnToJSON("tests/files/aln_dna.fa")
+    assert gp.readNwkFile(nwk) == "((A:0.1,B:0.2):0.3,(C:0.1,D:0.2):0.4);"
+    assert gp.csvDataToJSON(csv)["Data"] == [[7.0, 3.3], [None, None], [2.0, None]]
+
+
+def test_write_mode(tmp_path):
+
+    with pytest.raises(RuntimeError):
+        inputs.openInput(str(tmp_path / "out"), 'w')
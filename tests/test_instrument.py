@@ -0,0 +1,93 @@
+import pytest
+import json
+import tracemalloc
+import GRASPy as gp
+from GRASPy import client
+from GRASPy import codec
+from GRASPy import instrument
+
+
+@pytest.fixture
+def sink():
+
+    memory = instrument.MemorySink()
+    instrument.enable(memory, memory=True)
+
+    yield memory
+
+    instrument.disable()
+
+
+def test_request_spans(servers, sink):
+
+    with client.endpoint(*servers[0].server_address):
+        gp.ViewQueue()
+
+    request = sink.spans("request")[0]
+
+    assert request["command"] == "Status"
+    assert request["depth"] == 0
+    assert request["counters"]["bytes_sent"] == len(b'{"Command": "Status"}\n')
+    assert request["counters"]["bytes_received"] > 0
+    assert request["peak_bytes"] >= 0
+
+    names = [r["name"] for r in sink.spans()]
+    assert set(names) == {"request", "connect", "send", "receive", "decode"}
+    assert all(r["depth"] == 1 for r in sink.spans() if r["name"] != "request")
+
+
+def test_counters(sink):
+
+    d = codec.load("example_data/joint_recon/ASR_big.json")
+
+    with instrument.span("build"):
+        gp.POGTreeFromJointReconstruction({'Result': d['Input']}, {'Result': d})
+
+    build = sink.spans("build")[0]
+
+    assert build["counters"]["graphs_built"] == 45
+    assert sink.spans("POGTreeFromJointReconstruction")[0]["depth"] == 1
+
+    instrument.count("loose")
+    assert sink.records[-1] == {"type": "counter", "name": "loose", "value": 1}
+
+
+def test_disabled(tmp_path):
+
+    path = tmp_path / "metrics.jsonl"
+    lines = instrument.JsonLinesSink(str(path))
+
+    with instrument.span("off"):
+        instrument.count("off")
+
+    assert not instrument.enabled()
+    assert not path.exists()
+
+    instrument.enable(lines)
+
+    with instrument.span("on", stage=1):
+        instrument.count("items", 3)
+
+    instrument.disable()
+
+    record = json.loads(path.read_text())
+    assert record["name"] == "on"
+    assert record["stage"] == 1
+    assert record["counters"] == {"items": 3}
+
+
+@pytest.mark.parametrize("started", [False, True])
+def test_disable_tracemalloc(started):
+
+    if started:
+        tracemalloc.start()
+
+    try:
+        instrument.enable(instrument.MemorySink(), memory=True)
+        instrument.disable()
+
+        # tracing started outside is left running
+        assert tracemalloc.is_tracing() == started
+
+    finally:
+        tracemalloc.stop()
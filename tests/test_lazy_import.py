@@ -0,0 +1,31 @@
+import pytest
+import subprocess
+import sys
+import GRASPy as gp
+
+
+@pytest.mark.parametrize("name", gp.__all__)
+def test_exports(name):
+
+    assert getattr(gp, name) is not None
+
+
+@pytest.mark.parametrize("code, unloaded", [
+    ("import GRASPy", ["numpy", "pandas"]),
+    ("import GRASPy; GRASPy.JobStatus", ["numpy", "pandas"]),
+    ("import GRASPy; GRASPy.nwkToJSON", ["pandas"]),
+])
+def test_lazy(code, unloaded):
+
+    check = f"{code}; import sys; print(*[m in sys.modules for m in {unloaded!r}])"
+
+    out = subprocess.run([sys.executable, "-c", check], capture_output=True,
+                         text=True, check=True).stdout.split()
+
+    assert out == ["False"] * len(unloaded)
+
+
+def test_missing():
+
+    with pytest.raises(AttributeError):
+        gp.notAFunction
@@ -0,0 +1,25 @@
+import pytest
+
+
+@pytest.mark.parametrize("clade, columns, subs, ins, dels", [
+    (None, None, [(2, 1, b'C', b'K'), (4, 0, b'A', b'G')],
+     [(3, 3, b'-', b'W')], [(1, 3, b'E', b'-')]),
+    ("N1", None, [(2, 1, b'C', b'K')], [(3, 3, b'-', b'W')], []),
+    (None, (0, 1), [(4, 0, b'A', b'G')], [], []),
+])
+def test_branchMutations(make_tree, pog_seqs, clade, columns, subs, ins, dels):
+
+    report = make_tree(pog_seqs).branchMutations(clade=clade, columns=columns)
+
+    assert (report.substitutions.tolist(), report.insertions.tolist(),
+            report.deletions.tolist()) == (subs, ins, dels)
+
+
+def test_branchMutations_missing_graph(make_tree, pog_seqs):
+
+    del pog_seqs['N1']
+
+    report = make_tree(pog_seqs).branchMutations()
+
+    # only the branch from N0 to C has both sequences
+    assert report.substitutions.tolist() == [(4, 0, b'A', b'G')]
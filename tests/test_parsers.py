@@ -1,4 +1,5 @@
 import pytest
+import json
 import GRASPy as gp
 import numpy as np
 
@@ -127,6 +128,13 @@ def test_alnToJSON(path, json):
     assert gp.alnToJSON(path) == json
 
 
+@pytest.mark.parametrize("text", ["", "ACGT\n"])
+def test_alnToJSON_empty(write, text):
+
+    with pytest.raises(RuntimeError, match="has no sequences"):
+        gp.alnToJSON(write("aln.fa", text), lazy=True)
+
+
 @pytest.mark.parametrize("input, edge", [
     # end of sequence
     ([[485], [[]], 0], [485, -999]),
@@ -147,3 +155,47 @@ def test_locateEdgeIndex(input, location):
 
     assert gp.locateEdgeIndex(
         input["Edges"], input["Idx"], input["indices"]) == location
+
+
+CSV_DATA = "Headers,Data\nA,7.0 3.3\nB,\nC,2\nD,1 2 3\n"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 100])
+def test_csvDataToJSON(tmp_path, chunk_size):
+
+    path = tmp_path / "data.csv"
+    path.write_text(CSV_DATA)
+
+    j_data = gp.csvDataToJSON(str(path), chunk_size=chunk_size)
+
+    assert j_data["Headers"] == ["A", "B", "C", "D"]
+    assert j_data["Data"] == [[7.0, 3.3, None], [None, None, None],
+                              [2.0, None, None], [1.0, 2.0, 3.0]]
+
+    j_array = gp.csvDataToJSON(str(path), as_array=True, chunk_size=chunk_size)
+
+    assert j_array["Data"].shape == (4, 3)
+    assert np.isnan(j_array["Data"][1]).all()
+
+    # null is only written when serialised
+    text = '[' + ''.join(gp.iterArrayJSON(j_array["Data"], chunk_size)) + ']'
+    assert json.loads(text) == j_data["Data"]
+    assert json.loads(json.dumps(j_array, default=gp.jsonDefault)) == j_data
+
+
+@pytest.mark.parametrize("text, headers", [
+    ("Headers,Data\n1,7.0\n2,3.3\n3,2\n", [1, 2, 3]),
+    ("Headers,Data\n1.5,7.0\n,3.3\n3,2\n", [1.5, None, 3.0]),
+    ("Headers,Data\n1,7.0\n2,3.3\nA,2\n", ["1", "2", "A"]),
+])
+def test_csvDataToJSON_headers(tmp_path, text, headers):
+
+    path = tmp_path / "data.csv"
+    path.write_text(text)
+
+    # the type is the same however the rows are chunked
+    for chunk_size in [1, 2, 100]:
+        j_data = gp.csvDataToJSON(str(path), chunk_size=chunk_size)
+
+        assert j_data["Headers"] == headers
+        assert [type(h) for h in j_data["Headers"]] == [type(h) for h in headers]
@@ -0,0 +1,46 @@
+import pytest
+import GRASPy as gp
+
+
+@pytest.fixture
+def inputs(tmp_path):
+
+    aln = tmp_path / "aln.fa"
+    aln.write_text(">A\nACG-\n>B\nACGT\n>C\nGCTT\n>D\nGTTT\n>E\nGTT-\n")
+
+    nwk = tmp_path / "tree.nwk"
+    nwk.write_text("((A:0.1,B:0.2):0.3,((C:0.1,D:0.1):0.2,E:0.4):0.1);")
+
+    return str(aln), str(nwk)
+
+
+def test_FitchReconstruction(inputs):
+
+    tree = gp.FitchReconstruction(*inputs, alphabet="DNA")
+
+    seqs = {name: ''.join(bp.seq.sequence)
+            for name, bp in tree.branchpoints.items()}
+
+    assert seqs == {'N0': 'ACGT', 'N1': 'ACGT', 'N2': 'GTTT', 'N3': 'GTTT',
+                    'A': 'ACG', 'B': 'ACGT', 'C': 'GCTT', 'D': 'GTTT', 'E': 'GTT'}
+
+
+def test_FitchReconstruction_graphs(inputs):
+
+    tree = gp.FitchReconstruction(*inputs)
+
+    graph = tree.graphs['A']
+
+    assert (list(graph.indices), graph.start, graph.end, graph.isAncestor) == \
+        ([0, 1, 2], [0], [2], False)
+    assert [(e.start, e.end) for n in graph.nodes for e in n.edges] == \
+        [(0, 1), (1, 2), (2, -999)]
+
+
+def test_FitchReconstruction_missing_extant(inputs, tmp_path):
+
+    aln = tmp_path / "short.fa"
+    aln.write_text(">A\nACG-\n>B\nACGT\n")
+
+    with pytest.raises(RuntimeError):
+        gp.FitchReconstruction(str(aln), inputs[1])
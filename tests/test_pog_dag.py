@@ -0,0 +1,87 @@
+import pytest
+import GRASPy as gp
+from GRASPy import encoding, pog_dag, pog_automaton, pog_sampler
+
+
+def make_ancestor():
+    '''A-C-G-T with edges that can skip C or G'''
+
+    edges = [[-1, 0], [0, 1], [0, 2], [1, 2], [1, 3], [2, 3], [3, 4]]
+    weights = [1.0, 0.5, 2.0, 0.5, 0.1, 1.0, 1.0]
+
+    return gp.POGraphFromJSON({
+        "Name": "3", "Indices": [0, 1, 2, 3],
+        "Adjacent": [[1], [2], [3], []],
+        "Nodes": [{"Value": s} for s in "ACGT"],
+        "Edgeindices": edges,
+        "Edges": [{"Recip": True, "Backward": True, "Forward": True, "Weight": w}
+                  for w in weights],
+        "Edgetype": "class dat.pog.POGraph$BidirEdge",
+        "GRASP_version": "test", "Starts": [0], "Ends": [3], "Size": 4,
+        "Terminated": True, "Directed": True}, isAncestor=True)
+
+
+@pytest.fixture
+def dag():
+    return pog_dag.POGDag(make_ancestor())
+
+
+def test_edges(dag):
+
+    assert list(zip(dag.src.tolist(), dag.dst.tolist())) == \
+        [(0, 1), (1, 2), (1, 3), (2, 3), (2, 4), (3, 4), (4, 5)]
+
+
+def test_maxWeightPath(dag):
+
+    weight, path = dag.maxWeightPath()
+
+    assert (weight, dag.pathSequence(path), list(dag.pathIndices(path))) == \
+        (5.0, "AGT", [0, 2, 3])
+
+
+def test_countPaths(dag):
+
+    assert dag.countPaths() == 3
+    assert dag.countPaths(log=True) == pytest.approx(1.0986122886681098)
+
+
+def test_kBestPaths(dag):
+
+    assert [(w, dag.pathSequence(p)) for w, p in dag.kBestPaths(2)] == \
+        [(5.0, "AGT"), (4.0, "ACGT")]
+
+
+@pytest.mark.parametrize("candidates, accepted, weights", [
+    (["AGT", "ACGT", "ACT", "A-G-T", "AGTT", "AG", "CGT"],
+     [True, True, True, True, False, False, False],
+     [5.0, 4.0, 2.6, 5.0, float('-inf'), float('-inf'), float('-inf')])
+])
+def test_POGAutomaton(candidates, accepted, weights):
+
+    automaton = pog_automaton.POGAutomaton(make_ancestor())
+
+    acc, w = automaton.run(candidates)
+
+    assert (acc.tolist(), w.tolist()) == (accepted, pytest.approx(weights))
+
+
+def test_POGSampler():
+
+    sampler = pog_sampler.POGSampler(make_ancestor())
+
+    codes, lengths = sampler.sample(1000, seed=7)
+    again, _ = sampler.sample(1000, seed=7)
+
+    assert (codes == again).all()
+    assert pog_automaton.POGAutomaton(make_ancestor()).run(codes)[0].all()
+    assert set(lengths.tolist()) == {3, 4}
+
+
+def test_POGSampler_min_weight():
+
+    sampler = pog_sampler.POGSampler(make_ancestor(), min_weight=1.5)
+
+    codes, _ = sampler.sample(100, seed=1, aligned=True)
+
+    assert {encoding.decodeSequence(row) for row in codes} == {"A-GT"}
@@ -0,0 +1,102 @@
+import pytest
+import gzip
+import GRASPy as gp
+from GRASPy import client
+from GRASPy import preflight
+
+from .conftest import ALN, NWK
+
+
+@pytest.mark.parametrize("nwk, errors, extants", [
+    (NWK, set(), {"A", "B", "C", "D"}),
+    ("((A:0.1,B:0.2)N1:0.3,(C:0.1,D:0.2)N2:0.4)N0;", set(), {"A", "B", "C", "D"}),
+    ("((A:0.1,B:0.2):0.3,(C:0.1,D:0.2):0.4)", {"tree"}, {"A", "B", "C", "D"}),
+    ("((A:0.1,B:0.2):0.3,(C:0.1,D:0.2):0.4;", {"tree"}, {"A", "B", "C", "D"}),
+    ("((A:0.1,B:0.2)):0.3,(C:0.1,D:0.2):0.4);", {"tree"}, {"A", "B", "C", "D"}),
+    ("((A:0.1,:0.2):0.3,(C:0.1,D:0.2):0.4);", {"tree"}, {"A", "C", "D"}),
+    ("((A:0.1,B:0.2):0.3,(C:0.1,D:0.2e):0.4);", {"branch_lengths"}, {"A", "B", "C", "D"}),
+    ("((A:0.1,B:0.2):0.3,(C:0.1,A:0.2):0.4);", {"duplicates"}, {"A", "B", "C"}),
+])
+def test_checkTree(nwk, errors, extants):
+
+    report = gp.Report()
+
+    assert gp.checkTree(nwk, report) == extants
+    assert set(report.errors) == errors
+
+
+@pytest.mark.parametrize("aln, alphabet, errors", [
+    (ALN, None, set()),
+    (ALN, "Protein", set()),
+    (ALN, "RNA", {"alphabet"}),
+    (ALN + ">E\nACGWT\n", None, {"alphabet"}),
+    (ALN + ">E\nACWT\n", "Protein", {"width"}),
+    (ALN + ">A\nACGTT\n", None, {"duplicates"}),
+    (">A\nAC GT*\n>B\nAC\nGT\n", None, set()),
+])
+def test_checkAlignment(write, aln, alphabet, errors):
+
+    report = gp.Report()
+    names = gp.checkAlignment(write("aln.fa", aln), report, alphabet)
+
+    assert set(report.errors) == errors
+    assert names == {line[1:] for line in aln.split('\n') if line.startswith('>')}
+
+
+def test_checkAlignment_unknown_alphabet(files):
+
+    aln, _ = files
+
+    with pytest.raises(RuntimeError, match="unknown alphabet 'protein', use one of .*Protein"):
+        gp.check(aln, alphabet="protein").raiseIfFailed()
+
+
+def test_check(tmp_path, files):
+
+    _, nwk = files
+
+    aln = tmp_path / "aln.fa.gz"
+    aln.write_bytes(gzip.compress((ALN + ">E\nACAGT\n").replace(">D\nTCAGA\n", "").encode()))
+
+    report = gp.check(str(aln), nwk)
+
+    assert not report.ok
+    assert report.errors["labels"] == ["D is in the tree but not the alignment",
+                                       "E is in the alignment but not the tree"]
+    assert report.stats["sequences"] == 4 and report.stats["width"] == 5
+
+    with pytest.raises(RuntimeError, match="labels"):
+        report.raiseIfFailed()
+
+
+def test_messages_capped():
+
+    report = gp.Report()
+
+    for i in range(preflight.MAX_MESSAGES + 5):
+        report.add("width", f"sequence {i}")
+
+    assert len(report.errors["width"]) == preflight.MAX_MESSAGES
+    assert "... 5 more" in str(report)
+
+
+def test_submission_checked(servers, files, write):
+
+    aln, _ = files
+    nwk = write("tree.nwk", NWK.replace("D", "X"))
+
+    with client.endpoint(*servers[1].server_address):
+
+        with pytest.raises(RuntimeError, match="Preflight failed"):
+            gp.JointReconstruction(aln, nwk)
+
+        assert servers[1].received == []
+
+        previous = gp.setPreflight(False)
+
+        try:
+            gp.JointReconstruction(aln, nwk)
+        finally:
+            gp.setPreflight(previous)
+
+    assert len(servers[1].received) == 1
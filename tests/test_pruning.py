@@ -0,0 +1,290 @@
+import pytest
+import numpy as np
+import GRASPy as gp
+from GRASPy import client
+from GRASPy import g_requests
+from GRASPy import pruning
+
+NWK = "((A:0.1,B:0.2):0.3,(C:0.1,(D:0.2,E:0.5):0.6):0.4);"
+
+# columns 1 and 4 are gaps everywhere but E, E has one residue
+ALN = ">A\nA-CG-T\n>B\nA-C--T\n>C\nA-CGT-\n>D\nG-CG-T\n>E\n-T----\n"
+
+
+@pytest.fixture
+def files(write):
+
+    return write("aln.fa", ALN), write("tree.nwk", NWK)
+
+
+def ancestorPOG(indices, name="0"):
+    '''A linear ancestor POG over the given (reduced) columns'''
+
+    size = max(indices) + 1
+
+    return {"Indices": indices, "Adjacent": [[j] for j in indices[1:]] + [[]],
+            "Nodes": [{"Value": "A"} for _ in indices], "Starts": [indices[0]],
+            "Ends": [indices[-1]], "Size": size, "Terminated": True,
+            "Directed": True, "Name": name, "GRASP_version": "test",
+            "Edgeindices": [[-1, indices[0]], [indices[-1], size]],
+            "Edges": [{"Recip": True, "Backward": True, "Forward": True,
+                       "Weight": 0}] * 2, "Edgetype": "BidirEdge"}
+
+
+@pytest.mark.parametrize("keep, labels, parents, dists, ancestors", [
+    ({"A", "B", "C", "D", "E"}, None, None, None, None),
+    ({"A", "C", "D"}, ["0", "A", "1", "C", "D"], [-1, 0, 0, 2, 2],
+     [0.0, 0.4, 0.4, 0.1, 0.8], {"0": "0", "1": "2"}),
+    ({"D", "E"}, ["0", "D", "E"], [-1, 0, 0], [0.0, 0.2, 0.5], {"0": "3"}),
+    ({"B", "E"}, ["0", "B", "E"], [-1, 0, 0], [0.0, 0.5, 1.5], {"0": "0"}),
+])
+def test_pruneTree(keep, labels, parents, dists, ancestors):
+
+    j_tree = gp.nwkToJSON(NWK)
+
+    pruned, mapping = gp.pruneTree(j_tree, keep)
+
+    if labels is None:
+        assert pruned["Labels"] == j_tree["Labels"]
+        assert pruned["Parents"] == j_tree["Parents"]
+        return
+
+    assert pruned["Labels"] == labels
+    assert pruned["Parents"] == parents
+    assert pruned["Distances"] == pytest.approx(dists)
+    assert pruned["Branchpoints"] == len(labels)
+    assert mapping == ancestors
+
+    # the pruned tree can be used like any other
+    assert set(gp.TreeFromJSON(pruned)["indices"]) == {"N" + a for a in ancestors} | keep
+
+
+def test_pruneTree_too_small():
+
+    with pytest.raises(RuntimeError):
+        gp.pruneTree(gp.nwkToJSON(NWK), {"A"})
+
+
+@pytest.mark.parametrize("kwargs, columns, dropped", [
+    ({}, [0, 1, 2, 3, 4, 5], []),
+    ({"max_gap_fraction": 0.5}, [0, 2, 3, 5], []),
+    ({"min_occupancy": 0.5}, [0, 1, 2, 3, 4, 5], ["E"]),
+    ({"min_occupancy": 0.5, "max_gap_fraction": 0.0}, [0, 2], ["E"]),
+    ({"column_mask": [True, False, True, True, False, False]}, [0, 2, 3], []),
+])
+def test_reduceAlignment(files, kwargs, columns, dropped):
+
+    aln, _ = files
+
+    j_aln, reduction = gp.reduceAlignment(aln, **kwargs)
+
+    assert reduction.columns.tolist() == columns
+    assert reduction.dropped == dropped
+    assert reduction.width == 6
+
+    full = {s["Name"]: s["Seq"] for s in gp.alnToJSON(aln)["Sequences"]}
+
+    assert [s["Name"] for s in j_aln["Sequences"]] == reduction.names
+    for s in j_aln["Sequences"]:
+        assert s["Seq"] == [full[s["Name"]][c] for c in columns]
+
+    assert j_aln["Datatype"] == gp.alnToJSON(aln)["Datatype"]
+
+
+def test_reduceAlignment_errors(files, write):
+
+    aln, _ = files
+
+    with pytest.raises(RuntimeError):
+        gp.reduceAlignment(aln, column_mask=[True])
+
+    with pytest.raises(RuntimeError):
+        gp.reduceAlignment(aln, min_occupancy=1.0)
+
+    ragged = write("ragged.fa", ">A\nACG\n>B\nAC\n")
+
+    with pytest.raises(RuntimeError):
+        gp.reduceAlignment(ragged)
+
+
+@pytest.mark.parametrize("arrays", [False, True])
+def test_remapPOG(arrays):
+
+    reduction = pruning.Reduction(10, [1, 4, 5, 8], ["A"], [], ancestors={"0": "3"})
+
+    jpog = ancestorPOG([0, 1, 3])
+
+    if arrays:
+        for key in ("Indices", "Starts", "Ends", "Edgeindices"):
+            jpog[key] = np.array(jpog[key])
+
+    reduction.remapPOG(jpog)
+
+    assert np.array_equal(jpog["Indices"], [1, 4, 8])
+    assert jpog["Adjacent"] == [[4], [8], []]
+    assert np.array_equal(jpog["Edgeindices"], [[-1, 1], [8, 10]])
+    assert jpog["Size"] == 10 and jpog["Name"] == "3"
+
+    graph = gp.POGraphFromJSON(jpog, isAncestor=True)
+
+    assert graph.name == "N3"
+    assert [n.name for n in graph.nodes] == [1, 4, 8]
+    assert graph.nodes[0].edges[0].end == 4
+
+
+def test_JointReconstruction_reduced(servers, files):
+
+    aln, nwk = files
+    server = servers[1]
+
+    with client.endpoint(*server.server_address):
+
+        response = gp.JointReconstruction(aln, nwk, min_occupancy=0.5,
+                                          max_gap_fraction=0.0)
+
+        params = server.received[-1]["Params"]
+
+        assert [s["Name"] for s in params["Alignment"]["Sequences"]] == ["A", "B", "C", "D"]
+        assert params["Tree"]["Labels"] == ["0", "1", "A", "B", "2", "C", "D"]
+
+        # the server answers in reduced coordinates
+        server.results[response["Job"]] = {"Ancestors": [ancestorPOG([0, 1], "2")]}
+
+        assert response["Job"] in g_requests._reductions
+
+        output = gp.JobOutput(response["Job"])
+
+    assert response["Job"] not in g_requests._reductions
+
+    anc = output["Result"]["Ancestors"][0]
+
+    assert anc["Indices"] == [0, 2] and anc["Size"] == 6
+    assert anc["Name"] == "2"
+
+    tree = gp.POGTreeFromJointReconstruction(nwk, output)
+
+    assert tree.graphs["N2"].nodes[1].name == 2
+
+
+@pytest.mark.parametrize("source", ["nwk", "POGTree"])
+@pytest.mark.parametrize("clade, labels, ancestors", [
+    ("N2", ["0", "C", "1", "D", "E"], {"0": "2", "1": "3"}),
+    (["D", "E"], ["0", "D", "E"], {"0": "3"}),
+    (["A", "D"], ["0", "1", "A", "B", "2", "C", "3", "D", "E"],
+     {"0": "0", "1": "1", "2": "2", "3": "3"}),
+])
+def test_cladeTree(files, source, clade, labels, ancestors):
+
+    _, nwk = files
+
+    tree = nwk if source == "nwk" else \
+        gp.POGTreeFromJointReconstruction(nwk, {"Result": {"Ancestors": []}})
+
+    j_tree, mapping = gp.cladeTree(tree, clade)
+
+    assert j_tree["Labels"] == labels
+    assert j_tree["Distances"][0] == 0.0
+    assert mapping == ancestors
+
+
+def test_cladeAlignment(files):
+
+    aln, _ = files
+
+    # column 1 is a gap in both C and D
+    j_aln, reduction = gp.cladeAlignment(aln, ["D", "C"])
+
+    assert [s["Name"] for s in j_aln["Sequences"]] == ["C", "D"]
+    assert reduction.columns.tolist() == [0, 2, 3, 4, 5]
+    assert j_aln["Sequences"][1]["Seq"] == ["G", "C", "G", None, "T"]
+
+    with pytest.raises(RuntimeError):
+        gp.cladeAlignment(aln, ["C", "X"])
+
+
+def test_CladeReconstruction(servers, files):
+
+    aln, nwk = files
+    server = servers[1]
+
+    with client.endpoint(*server.server_address):
+
+        response = gp.CladeReconstruction(aln, nwk, ["D", "E"])
+
+        params = server.received[-1]["Params"]
+
+        assert params["Tree"]["Labels"] == ["0", "D", "E"]
+        assert [s["Seq"] for s in params["Alignment"]["Sequences"]] == \
+            [["G", None, "C", "G", "T"], [None, "T", None, None, None]]
+
+        server.results[response["Job"]] = {"Ancestors": [ancestorPOG([0, 2, 4], "0")],
+                                           "Input": {"Tree": params["Tree"]}}
+
+        output = gp.JobOutput(response["Job"])
+
+    anc = output["Result"]["Ancestors"][0]
+
+    assert anc["Name"] == "3" and anc["Indices"] == [0, 2, 5]
+    assert output["Result"]["Input"]["Tree"]["Labels"] == ["3", "D", "E"]
+
+
+# A and B are identical, C matches them but is not in their clade, D and
+# E are identical
+DUPLICATES = ">A\nAC-GT\n>B\nAC-GT\n>C\nAC-GT\n>D\nTTAGT\n>E\nTTAGT\n"
+
+
+@pytest.mark.parametrize("nwk, expected", [
+    (NWK, {"B": "A", "E": "D"}),
+    ("((A:0.1,C:0.2):0.3,(B:0.1,(D:0.2,E:0.5):0.6):0.4);", {"C": "A", "E": "D"}),
+    ("((A:0.1,D:0.2):0.3,(B:0.1,(C:0.2,E:0.5):0.6):0.4);", {}),
+    ("(((A:0.1,B:0.2):0.1,C:0.2):0.3,(D:0.2,E:0.5):0.6);", {"B": "A", "C": "A", "E": "D"}),
+])
+def test_findDuplicates(write, nwk, expected):
+
+    aln = write("aln.fa", DUPLICATES)
+
+    assert gp.findDuplicates(aln, gp.nwkToJSON(nwk)) == expected
+
+
+def test_JointReconstruction_deduplicate(servers, files, write, tmp_path):
+
+    _, nwk = files
+    aln = write("aln.fa", DUPLICATES)
+    server = servers[1]
+
+    with client.endpoint(*server.server_address):
+
+        response = gp.JointReconstruction(aln, nwk, deduplicate=True)
+
+        params = server.received[-1]["Params"]
+
+        assert [s["Name"] for s in params["Alignment"]["Sequences"]] == ["A", "C", "D"]
+        assert params["Tree"]["Labels"] == ["0", "A", "1", "C", "D"]
+
+        extants = [dict(ancestorPOG([0, 1, 3, 4], name), Edgeindices=[])
+                   for name in ("A", "C", "D")]
+
+        server.results[response["Job"]] = {"Ancestors": [ancestorPOG([0, 1], "1")],
+                                           "Input": {"Tree": params["Tree"],
+                                                     "Extants": extants}}
+
+        output = gp.JobOutput(response["Job"])
+
+    result = output["Result"]
+
+    assert result["Duplicates"] == {"B": "A", "E": "D"}
+    assert result["Input"]["Tree"]["Labels"] == gp.nwkToJSON(NWK)["Labels"]
+
+    tree = gp.POGTreeFromJointReconstruction({"Result": result["Input"]}, output)
+
+    assert tree.graphs["B"] is tree.graphs["A"]
+    assert tree.graphs["E"] is tree.graphs["D"]
+    assert "N2" in tree.graphs and "N3" not in tree.graphs
+
+    # shared graphs are exported under each of their labels
+    edges, nodes = gp.treeTables(tree)
+
+    assert set(nodes.Graph) == set(tree.graphs)
+    assert nodes[nodes.Graph == "B"]["Column"].tolist() == \
+        nodes[nodes.Graph == "A"]["Column"].tolist()
+    assert len(gp.writeTreeTables(tree, str(tmp_path / "tree"))) == 2
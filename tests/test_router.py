@@ -0,0 +1,60 @@
+import pytest
+import json
+import GRASPy as gp
+from GRASPy import client
+from GRASPy import router
+
+
+def submit():
+
+    return gp.send_and_recieve({"Command": "Recon", "Params": {}})["Job"]
+
+
+def test_router(servers):
+
+    endpoints = [s.server_address for s in servers]
+
+    with router.Router(endpoints) as r:
+
+        assert r.queueDepths() == dict(zip(endpoints, [2, 0, 1]))
+
+        # b is empty, then b ties with c and is listed first, then c
+        # has the fewest jobs
+        jobs = [submit() for _ in range(3)]
+
+        assert jobs == [1, 2, 3]
+        assert [r.owner(j) for j in jobs] == [endpoints[1], endpoints[1], endpoints[2]]
+
+        # requests about a job reach the server that owns it, with the
+        # server's own job id
+        assert gp.JobOutput(3)["Result"]["Server"] == "c"
+        assert servers[2].received[-1] == {"Command": "Output", "Job": 2}
+        assert gp.JobOutput(3)["Job"] == 3
+
+        with pytest.raises(RuntimeError):
+            gp.JobStatus(99)
+
+    assert gp.setRouter(None) is None
+
+
+def test_endpoint(servers):
+
+    host, port = servers[0].server_address
+
+    with client.endpoint(host, port):
+        assert client.currentEndpoint() == (host, port)
+        assert len(gp.ViewQueue()["Jobs"]) == 2
+
+    assert client.currentEndpoint() is None
+
+
+@pytest.mark.parametrize("response, expected", [
+    ('{"Job": 3, "Result": {"Job": 3}}', '{"Job": 12, "Result": {"Job": 3}}'),
+    ('{"Result": {"Job": 3}, "Job": 3}\n', '{"Result": {"Job": 3}, "Job": 12}\n'),
+    ('{"Result": {"Job": 3}, "Job": 3, "Message": "Done"}',
+     '{"Result": {"Job": 3}, "Job": 12, "Message": "Done"}'),
+    ('{"Result": {"Job": 3}}', '{"Result": {"Job": 3}}'),
+])
+def test_swapJob(response, expected):
+
+    assert json.loads(router.swapJob(response, 3, 12)) == json.loads(expected)
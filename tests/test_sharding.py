@@ -0,0 +1,144 @@
+import pytest
+import GRASPy as gp
+from GRASPy import client
+from GRASPy import pruning
+from GRASPy import router
+from GRASPy import sharding
+
+
+def balanced(names):
+    '''nwk of a balanced tree over names'''
+
+    if len(names) == 1:
+        return f"{names[0]}:0.1"
+
+    half = len(names) // 2
+
+    return f"({balanced(names[:half])},{balanced(names[half:])}):0.2"
+
+
+def caterpillar(names):
+    '''nwk of a tree where every ancestor has one extant child'''
+
+    nwk = f"{names[-1]}:0.1"
+
+    for name in reversed(names[:-1]):
+        nwk = f"({name}:0.1,{nwk}):0.2"
+
+    return nwk
+
+
+NAMES = [f"S{i}" for i in range(16)]
+
+TREES = {"balanced": balanced(NAMES)[:-4] + ";",
+         "caterpillar": caterpillar(NAMES)[:-4] + ";"}
+
+
+@pytest.mark.parametrize("shape", list(TREES))
+@pytest.mark.parametrize("max_leaves", [2, 3, 5, 16])
+@pytest.mark.parametrize("overlap", [1, 2])
+def test_planShards(shape, max_leaves, overlap):
+
+    j_tree = gp.nwkToJSON(TREES[shape])
+
+    shards = gp.planShards(j_tree, max_leaves, overlap)
+
+    ancestors = [lab for lab in j_tree["Labels"] if lab not in NAMES]
+
+    # every extant and ancestor belongs to exactly one shard
+    assert sorted(n for s in shards for n in s.leaves) == sorted(NAMES)
+    assert sorted(a for s in shards for a in s.owned) == sorted(ancestors)
+    assert shards[-1].root == "0"
+
+    for shard in shards:
+
+        assert len(shard.leaves) <= max_leaves
+        assert not set(shard.leaves) & set(shard.context)
+
+        # owned ancestors are not collapsed away by pruning
+        _, mapping = pruning.pruneTree(j_tree, set(shard.names()))
+
+        assert set(shard.owned) <= set(mapping.values())
+
+    if max_leaves >= 16:
+        assert len(shards) == 1 and shards[0].context == []
+
+
+@pytest.mark.parametrize("max_leaves, overlap", [(1, 1), (4, 0)])
+def test_planShards_errors(max_leaves, overlap):
+
+    with pytest.raises(RuntimeError):
+        gp.planShards(gp.nwkToJSON(TREES["balanced"]), max_leaves, overlap)
+
+
+def reconstruct(params):
+    '''Stand-in joint reconstruction, one POG over every column'''
+
+    width = len(params["Alignment"]["Sequences"][0]["Seq"])
+    columns = list(range(width))
+    tree = params["Tree"]
+
+    def pog(name):
+        return {"Indices": columns, "Adjacent": [[j] for j in columns[1:]] + [[]],
+                "Nodes": [{"Value": "A"} for _ in columns], "Starts": [0],
+                "Ends": [width - 1], "Size": width, "Terminated": True,
+                "Directed": True, "Name": name, "GRASP_version": "test"}
+
+    ancestors = [dict(pog(lab), Edgeindices=[], Edges=[], Edgetype="BidirEdge")
+                 for lab in tree["Labels"] if lab.isdigit()]
+
+    extants = [pog(s["Name"]) for s in params["Alignment"]["Sequences"]]
+
+    return {"Ancestors": ancestors, "Input": {"Tree": tree, "Extants": extants}}
+
+
+@pytest.fixture
+def files(write):
+
+    # the first 8 sequences have a gap in column 0 and the last 8 in
+    # column 5, so shards on either side see different columns
+    aln = write("aln.fa", ''.join(f">{name}\n{'-' if i < 8 else 'A'}CGTA{'-' if i >= 8 else 'C'}\n"
+                                  for i, name in enumerate(NAMES)))
+
+    return aln, write("tree.nwk", TREES["balanced"])
+
+
+@pytest.mark.parametrize("routed", [False, True])
+def test_ShardedReconstruction(servers, files, routed):
+
+    aln, nwk = files
+
+    for s in servers:
+        s.reconstruct = reconstruct
+
+    if routed:
+        with router.Router([s.server_address for s in servers]):
+            tree = gp.ShardedReconstruction(aln, nwk, max_leaves=4, max_workers=3, poll=0)
+        used = [s for s in servers if s.received]
+        assert len(used) > 1
+    else:
+        with client.endpoint(*servers[1].server_address):
+            tree = gp.ShardedReconstruction(aln, nwk, max_leaves=4, max_workers=3, poll=0)
+        used = [servers[1]]
+
+    recons = [r for s in used for r in s.received if r["Command"] == "Recon"]
+    assert len(recons) == len(gp.planShards(gp.nwkToJSON(TREES["balanced"]), 4))
+
+    j_tree = gp.nwkToJSON(TREES["balanced"])
+    ancestors = {"N" + lab for lab in j_tree["Labels"] if lab.isdigit()}
+
+    assert set(tree.graphs) == ancestors | set(NAMES)
+
+    # the shard of S0 - S3 drops column 0, the root sees every column
+    assert [n.name for n in tree.graphs["N2"].nodes] == [1, 2, 3, 4, 5]
+    assert [n.name for n in tree.graphs["N0"].nodes] == list(range(6))
+    assert tree.graphs["S0"].size == 6
+
+
+def test_stitch_missing():
+
+    j_tree = gp.nwkToJSON(TREES["balanced"])
+    shards = gp.planShards(j_tree, 4)
+
+    with pytest.raises(RuntimeError):
+        gp.stitch(j_tree, shards, [{"Ancestors": []} for _ in shards])
@@ -0,0 +1,145 @@
+import pytest
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import numpy as np
+from multiprocessing import shared_memory
+import GRASPy as gp
+from GRASPy import parsers
+from GRASPy import pog_tree
+from GRASPy import shared
+
+from .conftest import NWK
+
+
+def _worker(handle, queue):
+
+    shares = shared._sharesTracker(handle["tracker"])
+
+    with shared.attach(handle) as arrays:
+        queue.put((shares, arrays.labels("names"), arrays["matrix"].sum(axis=1).tolist(),
+                   arrays["parents"].tolist(), arrays.labels()))
+
+
+@pytest.mark.parametrize("labels", [
+    [],
+    ["A"],
+    ["seq_1", "", "N0", "ü"],
+])
+def test_packLabels(labels):
+
+    data, offsets = shared.packLabels(labels)
+
+    assert len(offsets) == len(labels) + 1
+    assert shared.unpackLabels(data, offsets) == labels
+
+
+def test_treeArrays(files):
+
+    _, nwk = files
+
+    arrays = gp.treeArrays(nwk)
+
+    assert arrays["parents"].tolist() == [-1, 0, 1, 1, 0, 4, 4]
+    assert arrays["distances"].tolist() == [0.0, 0.3, 0.1, 0.2, 0.4, 0.1, 0.2]
+    assert shared.unpackLabels(arrays["labels"], arrays["label_offsets"]) == \
+        ["N0", "N1", "A", "B", "N2", "C", "D"]
+
+    # a POGTree gives the same arrays
+    tree = parsers.TreeFromJSON(parsers.nwkToJSON(NWK))
+    tree = pog_tree.POGTree(nBranches=tree['nBranches'], branchpoints=tree['branchpoints'],
+                            parents=tree['parents'], children=tree['children'],
+                            indices=tree['indices'], distances=tree['distances'],
+                            POGraphs={})
+
+    for key, arr in gp.treeArrays(tree).items():
+        assert np.array_equal(arr, arrays[key])
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int64, np.float64])
+def test_publish(dtype):
+
+    data = {"a": np.arange(7, dtype=dtype), "b": np.ones((3, 5), dtype=dtype)}
+
+    with gp.publish(data) as owner:
+
+        for key, arr in data.items():
+            assert np.array_equal(owner[key], arr)
+            assert owner[key].dtype == arr.dtype
+            assert owner[key].ctypes.data % shared.ALIGNMENT == 0
+
+        with pytest.raises(ValueError):
+            owner["a"][0] = 1
+
+        with gp.attach(owner.handle) as worker:
+            assert worker.handle["name"] == owner.handle["name"]
+            assert np.array_equal(worker["b"], data["b"])
+
+        # a worker closing does not remove the block
+        shared_memory.SharedMemory(name=owner.handle["name"]).close()
+
+        name = owner.handle["name"]
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def test_publish_gc():
+
+    owner = gp.publish({"a": np.arange(3)})
+    name = owner.handle["name"]
+
+    del owner
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+@pytest.mark.parametrize("method", ["fork", "spawn", "forkserver"])
+def test_publishInputs_process(files, method):
+
+    aln, nwk = files
+
+    context = multiprocessing.get_context(method)
+
+    with gp.publishInputs(aln, nwk) as owner:
+
+        queue = context.Queue()
+        proc = context.Process(target=_worker, args=(owner.handle, queue))
+        proc.start()
+        shares, names, sums, parents, labels = queue.get(timeout=60)
+        proc.join(timeout=60)
+
+        assert proc.exitcode == 0
+        # so the worker leaves the block registered with the owner's tracker
+        assert shares
+        assert names == ["A", "B", "C", "D"]
+        assert sums == owner["matrix"].sum(axis=1).tolist()
+        assert parents == [-1, 0, 1, 1, 0, 4, 4]
+        assert labels == ["N0", "N1", "A", "B", "N2", "C", "D"]
+
+        # the block outlives the worker
+        shared_memory.SharedMemory(name=owner.handle["name"]).close()
+
+
+def test_attach_unrelated_process():
+
+    with gp.publish({"a": np.arange(5)}) as owner:
+
+        script = ("import json, sys\n"
+                  "from GRASPy import shared\n"
+                  "handle = json.loads(sys.argv[1])\n"
+                  "print(shared._sharesTracker(handle['tracker']))\n"
+                  "with shared.attach(handle) as arrays:\n"
+                  "    print(arrays['a'].sum())\n")
+
+        out = subprocess.run([sys.executable, "-c", script, json.dumps(owner.handle)],
+                             capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.dirname(__file__)))
+
+        assert out.stdout.split() == ["False", "10"]
+
+        # the process had a tracker of its own, which must not remove the block
+        shared_memory.SharedMemory(name=owner.handle["name"]).close()
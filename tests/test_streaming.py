@@ -0,0 +1,37 @@
+import pytest
+import json
+import numpy as np
+import GRASPy as gp
+from GRASPy import streaming
+
+
+@pytest.mark.parametrize("request_", [
+    {"Command": "Status"},
+    {"Command": "Recon", "Auth": "Guest",
+     "Params": {"Tree": {"Parents": [-1, 0, 0], "Labels": ["0", "A", "B"],
+                         "Distances": [0.0, 0.1, 0.2], "Branchpoints": 3},
+                "Inference": "Joint", "Empty": [], "Flag": None}},
+])
+def test_iterEncode(request_):
+
+    assert ''.join(streaming.iterEncode(request_)) == json.dumps(request_)
+
+
+@pytest.mark.parametrize("buffer_size", [1, 16, 1 << 16])
+def test_iterRequest(buffer_size):
+
+    data = np.array([[1.0, np.nan], [2.5, 3.0]])
+
+    request = {"Params": {"Alignment": gp.alnToJSON("tests/files/aln_dna.fa", lazy=True),
+                          "Dataset": {"Headers": ["A", "B"], "Data": data}}}
+
+    chunks = list(streaming.iterRequest(request, buffer_size))
+
+    assert all(len(c) < buffer_size + 100 for c in chunks[:-1])
+
+    text = b''.join(chunks).decode()
+    assert text.endswith('\n')
+
+    decoded = json.loads(text)
+    assert decoded["Params"]["Alignment"] == gp.alnToJSON("tests/files/aln_dna.fa")
+    assert decoded["Params"]["Dataset"]["Data"] == [[1.0, None], [2.5, 3.0]]
@@ -0,0 +1,86 @@
+import pytest
+import GRASPy as gp
+import numpy as np
+from GRASPy import tree_index, tree_distances
+
+NWK = "((A:0.6,((B:3.3,(C:1.0,D:2.5)cd:1.8)bcd:5,((E:3.9,F:4.5)ef:2.5,G:0.3)efg:7)X:3.2)Y:0.5,H:1.1)I;"
+
+
+@pytest.fixture
+def index():
+    return tree_index.indexFromJSON(gp.nwkToJSON(NWK))
+
+
+@pytest.mark.parametrize("a, b, lca", [
+    (['C', 'E', 'A', 'H', 'N4', 'N0'], ['D', 'G', 'B', 'A', 'C', 'N0'],
+     ['N4', 'N5', 'N1', 'N0', 'N4', 'N0'])
+])
+def test_lca(index, a, b, lca):
+
+    assert list(index.labelsOf(index.lca(a, b))) == lca
+
+
+def test_mrca(index):
+
+    assert index.labels[index.mrca(['B', 'C', 'F'])] == 'N2'
+
+
+def test_isAncestor(index):
+
+    assert list(index.isAncestor(['N2', 'N5', 'C'], ['F', 'B', 'C'])) == [True, False, True]
+
+
+@pytest.mark.parametrize("clade, leaves", [
+    ('N3', ['B', 'C', 'D']),
+    ('N5', ['E', 'F', 'G']),
+    ('H', ['H'])
+])
+def test_cladeLeaves(index, clade, leaves):
+
+    assert list(index.labelsOf(index.cladeLeaves(clade))) == leaves
+
+
+def test_path(index):
+
+    assert list(index.labelsOf(index.path('C', 'G'))) == ['C', 'N4', 'N3', 'N2', 'N5', 'G']
+
+
+def test_nodeDepths(index):
+
+    depths = tree_distances.nodeDepths(index, gp.nwkToJSON(NWK)["Distances"])
+
+    assert depths[index.resolve(['N0', 'A', 'C', 'G'])] == pytest.approx([0.0, 1.1, 11.5, 11.0])
+
+
+def test_patristicDistances(index):
+
+    depths = tree_distances.nodeDepths(index, gp.nwkToJSON(NWK)["Distances"])
+
+    order, matrix = tree_distances.patristicDistances(index, depths,
+                                                      leaves=['H', 'C', 'A'],
+                                                      block_size=2)
+
+    assert list(index.labelsOf(order)) == ['A', 'C', 'H']
+    assert matrix.ravel().tolist() == pytest.approx([0.0, 11.6, 2.2,
+                                                     11.6, 0.0, 12.6,
+                                                     2.2, 12.6, 0.0])
+
+
+def test_traversal_orders(index):
+
+    assert list(index.labelsOf(index.postorder[:5])) == ['A', 'B', 'C', 'D', 'N4']
+    assert list(index.labelsOf(index.levelorder[:4])) == ['N0', 'N1', 'H', 'A']
+
+
+def test_upwardPass(index):
+
+    sizes = index.upwardPass(index.isLeaf.astype(int), np.add)
+
+    assert list(sizes[index.resolve(['N0', 'N2', 'N6', 'E'])]) == [8, 6, 2, 1]
+
+
+def test_downwardPass(index):
+
+    levels = index.downwardPass(np.ones(len(index.parents), dtype=int), np.add)
+
+    assert list(levels - 1) == list(index.level)